@@ -0,0 +1,74 @@
+"""
+Benchmark of swap-to-candle price alignment on a synthetic year of data.
+
+Compares the previous merge_asof + ffill join against PriceIndex (built
+per call, prebuilt and reused, and with float32 prices), reporting wall
+time and peak traced memory of each. The synthetic candles have no NaN
+closes, the only case where the two give different prices (see PriceIndex).
+
+Usage: python -m benchmarks.alignment [--swaps 2000000] [--timeframe 900] [--repeat 5]
+"""
+import argparse
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from src.alignment import PriceIndex
+from src.synthetic import generate_candles, generate_swaps
+
+SECONDS_PER_YEAR = 365 * 24 * 3600
+
+def merge_asof_ffill(df_pool: pd.DataFrame, df_eth: pd.DataFrame) -> np.ndarray:
+    candles = df_eth[['timestamp', 'close']].astype({'timestamp': df_pool['timestamp'].dtype})
+    df_merged = pd.merge_asof(
+        df_pool.sort_values('timestamp', kind='stable'),
+        candles.sort_values('timestamp'),
+        on='timestamp',
+        direction='backward'
+    )
+    return df_merged['close'].ffill().to_numpy()
+
+def measure(fn, repeat: int):
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    tracemalloc.start()
+    result = fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak, result
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--swaps', type=int, default=2_000_000, help='Swaps in the synthetic year')
+    parser.add_argument('--timeframe', type=int, default=900, help='Candle length in seconds')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    candles = generate_candles(SECONDS_PER_YEAR // args.timeframe, timeframe_seconds=args.timeframe)
+    swaps = generate_swaps(args.swaps, candles, as_strings=False)[['timestamp']]
+    index = PriceIndex.from_candles(candles)
+    index32 = PriceIndex.from_candles(candles, price_dtype=np.float32)
+    print(f"{len(swaps)} swaps, {len(candles)} candles; index {index.nbytes / 1e6:.2f} MB "
+          f"(float32: {index32.nbytes / 1e6:.2f} MB)")
+
+    cases = [
+        ('merge_asof + ffill', lambda: merge_asof_ffill(swaps, candles)),
+        ('PriceIndex (build + lookup)', lambda: PriceIndex.from_candles(candles).lookup(swaps['timestamp'])),
+        ('PriceIndex (prebuilt)', lambda: index.lookup(swaps['timestamp'])),
+        ('PriceIndex float32 (prebuilt)', lambda: index32.lookup(swaps['timestamp'])),
+    ]
+    reference = None
+    print(f"{'method':<32}{'seconds':>10}{'peak MB':>10}{'speedup':>10}")
+    for name, fn in cases:
+        seconds, peak, prices = measure(fn, args.repeat)
+        if reference is None:
+            reference = (seconds, prices)
+        elif prices.dtype == np.float64:
+            assert np.array_equal(prices, reference[1], equal_nan=True)
+        print(f"{name:<32}{seconds:>10.4f}{peak / 1e6:>10.1f}{reference[0] / seconds:>9.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""
+Microbenchmarks for the valuation kernels in src.calculations.
+
+Compares calc_position_metrics (blocked, in place, with and without
+preallocated outputs) against the equivalent naive NumPy expressions.
+
+Usage: python -m benchmarks.calculations [--min-exp 3] [--max-exp 7] [--repeat 5]
+"""
+import argparse
+import time
+import numpy as np
+from src.calculations import calc_position_metrics
+from src.config import INITIAL_ETH, INITIAL_USDC
+
+def naive_metrics(prices: np.ndarray, eth_amount: float, usdc_amount: float):
+    k = eth_amount * usdc_amount
+    v_lp = 2 * np.sqrt(k * prices)
+    v_hold = eth_amount * prices + usdc_amount
+    il_pct = ((v_hold - v_lp) / v_hold) * 100
+    lp_eth = np.sqrt(k / prices)
+    return v_lp, v_hold, il_pct, lp_eth, lp_eth - eth_amount
+
+def best_of(fn, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--min-exp', type=int, default=3)
+    parser.add_argument('--max-exp', type=int, default=7, help='1e8 needs about 5 GB of RAM')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'n':>12}{'naive ns/el':>14}{'fused ns/el':>14}{'fused+out ns/el':>17}{'scalar ns':>12}")
+    for exp in range(args.min_exp, args.max_exp + 1):
+        n = 10 ** exp
+        prices = rng.uniform(1500, 4000, n)
+        out = tuple(np.empty_like(prices) for _ in range(5))
+        t_naive = best_of(lambda: naive_metrics(prices, INITIAL_ETH, INITIAL_USDC), args.repeat)
+        t_fused = best_of(lambda: calc_position_metrics(prices, INITIAL_ETH, INITIAL_USDC), args.repeat)
+        t_out = best_of(lambda: calc_position_metrics(prices, INITIAL_ETH, INITIAL_USDC, out=out), args.repeat)
+        assert all(np.array_equal(a, b) for a, b in zip(out, naive_metrics(prices, INITIAL_ETH, INITIAL_USDC)))
+        price = float(prices[0])
+        t_scalar = best_of(lambda: [calc_position_metrics(price) for _ in range(1000)], args.repeat) / 1000
+        print(f"{n:>12d}{t_naive / n * 1e9:>14.2f}{t_fused / n * 1e9:>14.2f}"
+              f"{t_out / n * 1e9:>17.2f}{t_scalar * 1e9:>12.0f}")
+
+if __name__ == '__main__':
+    main()
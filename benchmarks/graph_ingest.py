@@ -0,0 +1,85 @@
+"""
+Benchmark sequential vs sharded swap ingestion against a local mock GraphQL server.
+
+Usage: python -m benchmarks.graph_ingest [--days 30] [--interval 60] [--latency 0.05]
+"""
+import argparse
+import json
+import logging
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.data_fetcher import fetch_uniswap_pool_data_paginated, fetch_uniswap_pool_data_sharded
+
+POOL = "0xb4e16d0168e52d35cacd2c6185b44281ec28c9dc"
+START = 1704067200  # 2024-01-01 UTC
+
+def make_handler(interval: int, latency: float):
+    """
+    Build a handler serving one synthetic swap every `interval` seconds.
+    """
+    class MockGraphHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers['Content-Length']))
+            query = json.loads(body)['query']
+            first = int(re.search(r'first: (\d+)', query).group(1))
+            gte = int(re.search(r'timestamp_gte: (\d+)', query).group(1))
+            lte = int(re.search(r'timestamp_lte: (\d+)', query).group(1))
+            first_ts = gte + (-(gte - START)) % interval
+            swaps = [
+                {'id': f"0x{ts:x}-0", 'timestamp': str(ts), 'amount0In': '1000.0',
+                 'amount1In': '0', 'amount0Out': '0', 'amount1Out': '0.4'}
+                for ts in range(first_ts, lte + 1, interval)[:first]
+            ]
+            time.sleep(latency)
+            payload = json.dumps({'data': {'swaps': swaps}}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    return MockGraphHandler
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--interval', type=int, default=60, help='Seconds between mock swaps')
+    parser.add_argument('--latency', type=float, default=0.05, help='Mock server latency per request')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--rate-limit', type=float, default=50.0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(args.interval, args.latency))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    end = START + args.days * 86400 - 1
+
+    try:
+        t0 = time.perf_counter()
+        df_seq = fetch_uniswap_pool_data_paginated(POOL, START, end, url=url)
+        t_seq = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        df_shard = fetch_uniswap_pool_data_sharded(
+            POOL, START, end, max_workers=args.workers, rate_limit=args.rate_limit, url=url
+        )
+        t_shard = time.perf_counter() - t0
+    finally:
+        server.shutdown()
+
+    print(f"sequential: {len(df_seq):>9d} swaps in {t_seq:8.2f}s")
+    print(f"sharded:    {len(df_shard):>9d} swaps in {t_shard:8.2f}s "
+          f"({args.workers} workers, {args.rate_limit:g} req/s)")
+    print(f"speedup:    {t_seq / t_shard:8.2f}x, identical ids: "
+          f"{set(df_seq['id']) == set(df_shard['id'])}")
+
+if __name__ == '__main__':
+    main()
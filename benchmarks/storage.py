@@ -0,0 +1,71 @@
+"""
+Compare columnar datasets against the current CSV files: write time, read time and size.
+
+Usage: python -m benchmarks.storage [--rows 1000000]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from src.columnar import read_dataset, write_dataset
+from src.engine import run_backtest_vectorized
+
+def make_results(rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Build a backtest_results-shaped frame from a random-walk price series.
+    """
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'id': [f"0x{i:064x}-0" for i in range(rows)],
+        'timestamp': pd.date_range('2024-01-01', periods=rows, freq='30s'),
+        'eth_price': 2300 * np.exp(np.cumsum(rng.normal(0, 5e-4, rows))),
+    })
+    return run_backtest_vectorized(df)
+
+def dir_size(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+def timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - t0, result
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    df = make_results(args.rows)
+    tmp = tempfile.mkdtemp()
+    try:
+        csv_path = os.path.join(tmp, 'backtest_results.csv')
+        npy_path = os.path.join(tmp, 'backtest_results')
+        npz_path = os.path.join(tmp, 'backtest_results_z')
+        cases = [
+            ('csv', lambda: df.to_csv(csv_path, index=False),
+             lambda: pd.read_csv(csv_path, parse_dates=['timestamp']),
+             lambda: pd.read_csv(csv_path, usecols=['timestamp', 'investor_portfolio']), csv_path),
+            ('npy', lambda: write_dataset(npy_path, df),
+             lambda: read_dataset(npy_path),
+             lambda: read_dataset(npy_path, columns=['timestamp', 'investor_portfolio']), npy_path),
+            ('npz', lambda: write_dataset(npz_path, df, compress=True),
+             lambda: read_dataset(npz_path),
+             lambda: read_dataset(npz_path, columns=['timestamp', 'investor_portfolio']), npz_path),
+        ]
+        print(f"{len(df)} rows x {len(df.columns)} columns")
+        print(f"{'format':<8}{'write s':>10}{'read s':>10}{'2 cols s':>10}{'size MB':>10}")
+        for name, write, read, read_cols, path in cases:
+            t_write, _ = timed(write)
+            t_read, _ = timed(read)
+            t_cols, _ = timed(read_cols)
+            print(f"{name:<8}{t_write:>10.2f}{t_read:>10.2f}{t_cols:>10.2f}{dir_size(path) / 1e6:>10.1f}")
+    finally:
+        shutil.rmtree(tmp)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""
+End-to-end benchmark suite on deterministic synthetic data.
+
+Times each pipeline stage (merge, valuation, hedge simulation, output
+writing, plotting) at several sizes, and compares against a saved baseline:
+the run fails (exit code 1) when any stage is slower than the baseline by
+more than the tolerance.
+
+Usage:
+    python -m benchmarks.suite --save-baseline            # record a baseline
+    python -m benchmarks.suite --check --tolerance 0.25   # gate on regressions
+    python -m benchmarks.suite --sizes 1e3 1e5 1e7 --json results.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+import numpy as np
+from src.calculations import calc_position_metrics
+from src.columnar import write_dataset
+from src.engine import add_normalized_columns, compute_backtest_arrays
+from src.plotting import plot_results
+from src.simulation import merge_price_data
+from src.synthetic import generate_candles, generate_swaps
+
+STAGES = ['merge', 'valuation', 'hedge', 'write', 'plot']
+DEFAULT_SIZES = [10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6]
+DEFAULT_BASELINE = os.path.join('benchmarks', 'baseline.json')
+SWAPS_PER_CANDLE = 20
+# Stages faster than this are dominated by timer noise and never fail the check
+NOISE_FLOOR_SECONDS = 0.005
+
+def best_of(fn: Callable[[], object], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+def run_size(n: int, repeat: int, seed: int, workdir: str) -> Dict[str, float]:
+    """
+    Time every stage on n synthetic swaps.
+
+    :param n: Number of swap rows
+    :param repeat: Timing repetitions per stage (best is kept)
+    :param seed: Random seed for the synthetic data
+    :param workdir: Scratch directory for written datasets and plots
+    :return: Mapping of stage name to best wall time in seconds
+    """
+    candles = generate_candles(max(2, n // SWAPS_PER_CANDLE), seed=seed)
+    swaps = generate_swaps(n, candles, seed=seed, as_strings=False)
+
+    merged = merge_price_data(swaps, candles)
+    prices = merged['eth_price'].to_numpy(dtype=np.float64)
+    results = merged.assign(**compute_backtest_arrays(prices))
+    add_normalized_columns(results)
+    out_path = os.path.join(workdir, f'results_{n}')
+    plot_path = os.path.join(workdir, f'plot_{n}.png')
+
+    def write():
+        shutil.rmtree(out_path, ignore_errors=True)
+        write_dataset(out_path, results)
+
+    return {
+        'merge': best_of(lambda: merge_price_data(swaps, candles), repeat),
+        'valuation': best_of(lambda: calc_position_metrics(prices), repeat),
+        'hedge': best_of(lambda: compute_backtest_arrays(prices), repeat),
+        'write': best_of(write, repeat),
+        'plot': best_of(lambda: plot_results(results, output_path=plot_path), min(repeat, 2)),
+    }
+
+def compare(current: dict, baseline: dict, tolerance: float) -> List[str]:
+    """
+    List stages whose time exceeds the baseline by more than the tolerance.
+
+    :param current: Results of this run
+    :param baseline: Previously saved results
+    :param tolerance: Allowed relative slowdown (0.25 = 25%)
+    :return: Human-readable regression descriptions (empty if none)
+    """
+    regressions = []
+    for size, stages in current['results'].items():
+        base_stages = baseline['results'].get(size, {})
+        for stage, seconds in stages.items():
+            base = base_stages.get(stage)
+            if base is None or max(seconds, base) < NOISE_FLOOR_SECONDS:
+                continue
+            if seconds > base * (1 + tolerance):
+                regressions.append(f"{stage} @ n={size}: {seconds:.4f}s vs baseline {base:.4f}s "
+                                   f"(+{(seconds / base - 1) * 100:.0f}%)")
+    return regressions
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=float, nargs='+', default=DEFAULT_SIZES,
+                        help='Swap row counts, e.g. 1e3 1e6 (1e8 needs roughly 40 GB of RAM)')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='Write this run as the new baseline')
+    parser.add_argument('--check', action='store_true', help='Fail if any stage regresses past the tolerance')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--json', help='Also write this run to the given file')
+    args = parser.parse_args()
+
+    current = {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'seed': args.seed,
+        'results': {},
+    }
+    print(f"{'n':>12}" + ''.join(f'{stage:>12}' for stage in STAGES) + '   (seconds)')
+    workdir = tempfile.mkdtemp(prefix='bench_suite_')
+    try:
+        for size in args.sizes:
+            n = int(size)
+            timings = run_size(n, args.repeat, args.seed, workdir)
+            current['results'][str(n)] = timings
+            print(f'{n:>12d}' + ''.join(f'{timings[stage]:>12.4f}' for stage in STAGES))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    for path in filter(None, [args.json, args.baseline if args.save_baseline else None]):
+        with open(path, 'w') as f:
+            json.dump(current, f, indent=2)
+        print(f'Wrote {path}')
+
+    if args.check:
+        if not os.path.exists(args.baseline):
+            print(f'No baseline at {args.baseline}; run with --save-baseline first')
+            return 1
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.tolerance)
+        for line in regressions:
+            print(f'REGRESSION {line}')
+        if regressions:
+            return 1
+        print(f'No stage regressed by more than {args.tolerance:.0%}')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,129 @@
+import logging
+from typing import Union
+import numpy as np
+import pandas as pd
+from src.columnar import read_dataset, write_dataset
+
+Timestamps = Union[np.ndarray, pd.Series, pd.DatetimeIndex]
+
+def to_epoch_ns(timestamps: Timestamps) -> np.ndarray:
+    """
+    Convert datetimes of any resolution to int64 epoch nanoseconds.
+
+    Integer input is taken to be epoch nanoseconds already; NaT maps to the
+    smallest int64 and therefore sorts before every real timestamp.
+
+    :param timestamps: datetime64 values (array, Series or DatetimeIndex) or int64 ns
+    :return: int64 array
+    """
+    values = timestamps.to_numpy() if isinstance(timestamps, (pd.Series, pd.Index)) else np.asarray(timestamps)
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype('datetime64[ns]').view(np.int64)
+    return values.astype(np.int64, copy=False)
+
+class PriceIndex:
+    """
+    Sorted candle closes for as-of price lookups.
+
+    Built once from the candles and reused: each lookup maps a batch of
+    event timestamps to the latest close at or before them with a single
+    searchsorted, like merge_asof(direction='backward') but without sorting
+    or copying either side. Timestamps are kept as int64 epoch nanoseconds;
+    prices can be stored as float32 to halve their memory at the cost of
+    ~7 significant digits.
+
+    NaN closes are forward-filled across the candles, so an event gets the
+    latest valid close at or before it. Without NaN closes this equals the
+    former merge_asof + ffill join. With them it does not: that join filled
+    from the previous event's price instead, which may come from an older
+    candle, or be NaN for the first events.
+    """
+
+    __slots__ = ('timestamps', 'prices')
+
+    def __init__(self, timestamps: Timestamps, prices: np.ndarray, price_dtype: np.dtype = np.float64):
+        """
+        :param timestamps: Candle timestamps (datetime64 or int64 epoch ns), any order
+        :param prices: Price per timestamp; NaN prices are forward-filled
+        :param price_dtype: Stored price dtype (np.float64 or np.float32)
+        """
+        ts = to_epoch_ns(timestamps)
+        prices = np.asarray(prices, dtype=np.float64)
+        if len(ts) != len(prices):
+            raise ValueError(f"{len(ts)} timestamps for {len(prices)} prices")
+        if np.any(ts[1:] < ts[:-1]):
+            # Stable, so among equal timestamps the last row still wins like in merge_asof
+            order = np.argsort(ts, kind='stable')
+            ts, prices = ts[order], prices[order]
+        missing = np.isnan(prices)
+        if missing.any():
+            last_valid = np.maximum.accumulate(np.where(missing, -1, np.arange(len(prices))))
+            prices = np.where(last_valid >= 0, prices[np.maximum(last_valid, 0)], np.nan)
+        self.timestamps = np.ascontiguousarray(ts)
+        self.prices = np.ascontiguousarray(prices, dtype=price_dtype)
+
+    @classmethod
+    def from_candles(
+        cls, df_eth: pd.DataFrame, price_column: str = 'close', price_dtype: np.dtype = np.float64
+    ) -> 'PriceIndex':
+        """
+        Build an index from Binance candles.
+
+        :param df_eth: DataFrame with 'timestamp' and the price column
+        :param price_column: Column holding the price (default 'close')
+        :param price_dtype: Stored price dtype (np.float64 or np.float32)
+        :return: PriceIndex
+        """
+        return cls(df_eth['timestamp'], df_eth[price_column].to_numpy(), price_dtype)
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    @property
+    def nbytes(self) -> int:
+        return self.timestamps.nbytes + self.prices.nbytes
+
+    def positions(self, timestamps: Timestamps) -> np.ndarray:
+        """
+        Index of the latest candle at or before each timestamp (-1 if none).
+
+        :param timestamps: Event timestamps (datetime64 or int64 epoch ns), any order
+        :return: int64 array of candle positions
+        """
+        return np.searchsorted(self.timestamps, to_epoch_ns(timestamps), side='right') - 1
+
+    def lookup(self, timestamps: Timestamps) -> np.ndarray:
+        """
+        Latest price at or before each timestamp; NaN before the first candle.
+
+        :param timestamps: Event timestamps (datetime64 or int64 epoch ns), any order
+        :return: Array of prices in the index's price dtype
+        """
+        pos = self.positions(timestamps)
+        prices = self.prices[np.maximum(pos, 0)]
+        before_first = pos < 0
+        if before_first.any():
+            prices[before_first] = np.nan
+        return prices
+
+    def save(self, path: str) -> None:
+        """
+        Save the index as a columnar dataset ('timestamp', 'price').
+
+        :param path: Dataset directory (replaced if it exists)
+        """
+        df = pd.DataFrame({'timestamp': self.timestamps.view('datetime64[ns]'), 'price': self.prices})
+        write_dataset(path, df, part_rows=max(len(df), 1))
+        logging.info("Saved price index with %d candles to %s", len(self), path)
+
+    @classmethod
+    def load(cls, path: str) -> 'PriceIndex':
+        """
+        Load an index written by save.
+
+        :param path: Dataset directory
+        :return: PriceIndex with the saved price dtype
+        """
+        df = read_dataset(path)
+        prices = df['price'].to_numpy()
+        return cls(df['timestamp'], prices, prices.dtype)
@@ -0,0 +1,225 @@
+import argparse
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+import pandas as pd
+from src.alignment import PriceIndex
+from src.columnar import read_dataset, write_dataset
+from src.engine import run_backtest_vectorized
+from src.metrics import compute_metrics, log_metrics
+from src.plotting import plot_results
+from src.simulation import load_merged_data, merge_price_data
+from src.synthetic import generate_candles, generate_swaps
+from src.config import FEE_RATE, IL_THRESHOLD, ALPHA, INITIAL_ETH, INITIAL_USDC
+
+# Keyword arguments of run_backtest_vectorized a job may set, with their defaults
+JOB_PARAMS = {
+    'alpha': ALPHA,
+    'il_threshold': IL_THRESHOLD,
+    'fee_rate': FEE_RATE,
+    'eth_amount': INITIAL_ETH,
+    'usdc_amount': INITIAL_USDC,
+}
+SOURCE_TYPES = ('dataset', 'candles_swaps', 'fetch', 'synthetic')
+OUTPUT_TYPES = ('results', 'metrics', 'plot')
+
+class BatchJob:
+    """
+    One backtest of a job file: where the merged prices come from, the time
+    range, the strategy parameters and which outputs to write.
+
+    Source types:
+
+    - dataset: {'path'} columnar dataset with 'timestamp' and 'eth_price'
+      (e.g. data/backtest_results); only those two columns are read
+    - candles_swaps: {'candles', 'swaps'} datasets as saved by the main run
+      (data/eth_candles, data/uniswap_pool_data), merged locally
+    - fetch: {'timeframe'} fetch through the local store like src.main
+      (imports ccxt); with a timeframe, prices come from the candle pyramid
+    - synthetic: {'candles', 'swaps', 'seed'} generated market, no I/O
+    """
+
+    __slots__ = ('name', 'source', 'start', 'end', 'params', 'outputs')
+
+    def __init__(
+        self,
+        name: str,
+        source: dict,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        params: Optional[dict] = None,
+        outputs: Optional[dict] = None,
+    ):
+        """
+        :param name: Label of the job in logs and the summary
+        :param source: Data source, a dict with a 'type' from SOURCE_TYPES and its fields
+        :param start: Inclusive start of the backtest period (ISO date or datetime)
+        :param end: Inclusive end of the backtest period
+        :param params: Subset of JOB_PARAMS; the rest take their config defaults
+        :param outputs: Subset of OUTPUT_TYPES mapped to paths (results dataset, metrics JSON, plot image)
+        """
+        if source.get('type') not in SOURCE_TYPES:
+            raise ValueError(f"Job {name}: unknown source type {source.get('type')!r}, expected one of {SOURCE_TYPES}")
+        unknown = set(params or {}) - set(JOB_PARAMS)
+        if unknown:
+            raise ValueError(f"Job {name}: unknown parameters {sorted(unknown)}")
+        unknown = set(outputs or {}) - set(OUTPUT_TYPES)
+        if unknown:
+            raise ValueError(f"Job {name}: unknown outputs {sorted(unknown)}")
+        if source['type'] == 'fetch' and (start is None or end is None):
+            raise ValueError(f"Job {name}: fetch sources need a start and an end")
+        self.name = name
+        self.source = source
+        self.start = start
+        self.end = end
+        self.params = {**JOB_PARAMS, **(params or {})}
+        self.outputs = outputs or {}
+
+    @classmethod
+    def from_dict(cls, spec: dict, defaults: Optional[dict] = None, index: int = 0) -> 'BatchJob':
+        """
+        :param spec: Job entry of a job file
+        :param defaults: Fields shared by all jobs; params and outputs are merged key by key
+        :param index: Position in the file, used for the default name
+        """
+        defaults = defaults or {}
+        merged = {**defaults, **spec}
+        for field in ('params', 'outputs'):
+            merged[field] = {**defaults.get(field, {}), **spec.get(field, {})}
+        merged.setdefault('name', f"job-{index}")
+        return cls(**merged)
+
+    @property
+    def source_key(self) -> str:
+        """
+        Identity of the loaded data, so jobs sharing a source and range load it once.
+        """
+        return json.dumps([self.source, self.start, self.end], sort_keys=True)
+
+    def __repr__(self) -> str:
+        return f"BatchJob({self.name!r}, {self.source['type']!r})"
+
+def load_job_file(path: str) -> List[BatchJob]:
+    """
+    Read a job file: a JSON list of jobs, or {'defaults': {...}, 'jobs': [...]}.
+
+    :param path: Job file
+    :return: Jobs in file order
+    """
+    with open(path) as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        data = {'jobs': data}
+    return [BatchJob.from_dict(spec, data.get('defaults'), i) for i, spec in enumerate(data['jobs'])]
+
+def load_source(job: BatchJob) -> pd.DataFrame:
+    """
+    Merged swaps with an 'eth_price' column for a job's source and time range.
+
+    Every source type is clipped to the job's [start, end], including those
+    (synthetic, day-aligned fetches) that cannot select the range up front.
+    """
+    df = _load_source_rows(job)
+    if job.start is None and job.end is None:
+        return df
+    timestamps = df['timestamp']
+    in_range = pd.Series(True, index=df.index)
+    if job.start is not None:
+        in_range &= timestamps >= pd.Timestamp(job.start)
+    if job.end is not None:
+        in_range &= timestamps <= pd.Timestamp(job.end)
+    return df[in_range].reset_index(drop=True)
+
+def _load_source_rows(job: BatchJob) -> pd.DataFrame:
+    source = job.source
+    kind = source['type']
+    if kind == 'dataset':
+        return read_dataset(source['path'], columns=['timestamp', 'eth_price'], start=job.start, end=job.end)
+    if kind == 'candles_swaps':
+        df_eth = read_dataset(source['candles'], columns=['timestamp', 'close'])
+        df_pool = read_dataset(source['swaps'], start=job.start, end=job.end)
+        return merge_price_data(df_pool, df_eth, PriceIndex.from_candles(df_eth))
+    if kind == 'fetch':
+        # The first fetch imports ccxt; other source types never load it
+        return load_merged_data(datetime.fromisoformat(job.start), datetime.fromisoformat(job.end),
+                                timeframe=source.get('timeframe'))
+    seed = source.get('seed', 0)
+    df_eth = generate_candles(source.get('candles', 35040), seed=seed)
+    df_pool = generate_swaps(source.get('swaps', 500_000), df_eth, seed=seed, as_strings=False)
+    return merge_price_data(df_pool, df_eth)
+
+def run_job(job: BatchJob, df_merged: pd.DataFrame) -> dict:
+    """
+    Backtest one job on its loaded data and write the requested outputs.
+
+    :return: Metrics of the run (see src.metrics)
+    """
+    df = run_backtest_vectorized(df_merged.copy(), **job.params)
+    metrics = compute_metrics(df)
+    outputs = job.outputs
+    if 'results' in outputs:
+        write_dataset(outputs['results'], df)
+    if 'metrics' in outputs:
+        directory = os.path.dirname(outputs['metrics'])
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(outputs['metrics'], 'w') as f:
+            json.dump({'name': job.name, 'params': job.params, 'metrics': metrics}, f, indent=2, default=float)
+    if 'plot' in outputs:
+        plot_results(df, outputs['plot'], il_threshold=job.params['il_threshold'])
+    return metrics
+
+def run_jobs(jobs: Sequence[BatchJob]) -> pd.DataFrame:
+    """
+    Run jobs one after another in this process.
+
+    Interpreter and import startup is paid once for the whole batch, each
+    distinct source and range is loaded once and shared by the jobs using
+    it, and ccxt/matplotlib are only imported by jobs that fetch or plot. A
+    failing job is logged and recorded without stopping the others.
+
+    :param jobs: Jobs to run, in order
+    :return: Summary with one row per job: name, status, seconds and its metrics
+    """
+    started = time.perf_counter()
+    loaded: Dict[str, pd.DataFrame] = {}
+    rows = []
+    first_result = True
+    for job in jobs:
+        job_started = time.perf_counter()
+        try:
+            df_merged = loaded.get(job.source_key)
+            if df_merged is None:
+                df_merged = loaded[job.source_key] = load_source(job)
+            metrics = run_job(job, df_merged)
+        except Exception as e:
+            logging.exception("Job %s failed: %s", job.name, e)
+            rows.append({'name': job.name, 'status': 'failed', 'seconds': time.perf_counter() - job_started})
+            continue
+        elapsed = time.perf_counter() - job_started
+        if first_result:
+            logging.info("First result after %.3f s.", time.perf_counter() - started)
+            first_result = False
+        logging.info("Job %s done in %.3f s.", job.name, elapsed)
+        log_metrics(metrics)
+        rows.append({'name': job.name, 'status': 'ok', 'seconds': elapsed, **metrics})
+    return pd.DataFrame(rows)
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run a file of backtest jobs in one process.")
+    parser.add_argument('jobs', help="JSON job file (see src.batch.BatchJob)")
+    parser.add_argument('--summary', default=None, help="Write the per-job summary to this CSV file")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
+
+    summary = run_jobs(load_job_file(args.jobs))
+    if args.summary:
+        summary.to_csv(args.summary, index=False)
+        logging.info("Saved the summary of %d jobs to %s", len(summary), args.summary)
+    return int((summary['status'] != 'ok').any())
+
+if __name__ == '__main__':
+    raise SystemExit(main())
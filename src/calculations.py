@@ -1,20 +1,87 @@
 import math
+from typing import Optional, Tuple, Union
+import numpy as np
+from src.config import INITIAL_ETH, INITIAL_USDC
 
-def calc_lp_value(eth_price: float, k: float) -> float:
+ArrayLike = Union[float, np.ndarray]
+
+def _is_scalar(value: ArrayLike) -> bool:
+    # isinstance first: np.ndim alone costs more than the scalar math it guards
+    return isinstance(value, (int, float)) or np.ndim(value) == 0
+
+# Elements processed per block by calc_position_metrics, sized to stay in cache
+METRICS_BLOCK = 1 << 14
+
+def calc_lp_value(eth_price: ArrayLike, k: float) -> ArrayLike:
     """
     Calculate the theoretical LP value for a constant-product pool.
     
-    :param eth_price: The current ETH price.
+    :param eth_price: The current ETH price (scalar or array).
     :param k: The constant product (e.g., 5 ETH * 10,000 USDC).
-    :return: The LP value.
+    :return: The LP value, with the same shape as eth_price.
     """
-    return 2 * math.sqrt(k * eth_price)
+    if _is_scalar(eth_price):
+        return 2 * math.sqrt(k * eth_price)
+    return 2 * np.sqrt(k * np.asarray(eth_price, dtype=np.float64))
 
-def calc_hold_value(eth_price: float) -> float:
+def calc_hold_value(
+    eth_price: ArrayLike, eth_amount: float = INITIAL_ETH, usdc_amount: float = INITIAL_USDC
+) -> ArrayLike:
     """
-    Calculate the value of holding the assets (5 ETH + 10,000 USDC).
+    Calculate the value of holding the initial assets instead of providing liquidity.
     
-    :param eth_price: The current ETH price.
-    :return: The holding value.
+    :param eth_price: The current ETH price (scalar or array).
+    :param eth_amount: Initial ETH amount (default 5).
+    :param usdc_amount: Initial USDC amount (default 10,000).
+    :return: The holding value, with the same shape as eth_price.
+    """
+    return eth_amount * eth_price + usdc_amount
+
+def calc_position_metrics(
+    eth_price: ArrayLike,
+    eth_amount: float = INITIAL_ETH,
+    usdc_amount: float = INITIAL_USDC,
+    out: Optional[Tuple[np.ndarray, ...]] = None,
+) -> Tuple[ArrayLike, ...]:
     """
-    return 5 * eth_price + 10000
+    Calculate LP value, holding value, IL%, LP ETH exposure and LP delta in one pass.
+
+    Arrays are processed in cache-sized blocks with in-place ufuncs, so no
+    full-length temporary is built for intermediate quantities. Each value
+    is computed with the same operations as calc_lp_value, calc_hold_value
+    and the batch engines, so results are bit-identical to them.
+
+    :param eth_price: The current ETH price (scalar or array).
+    :param eth_amount: Initial ETH amount; k = eth_amount * usdc_amount.
+    :param usdc_amount: Initial USDC amount.
+    :param out: Optional tuple of five preallocated float64 arrays shaped like eth_price.
+    :return: (V_LP, V_hold, IL_pct, lp_eth, lp_delta), where lp_eth = sqrt(k / P) is the
+        ETH held by the LP and lp_delta = lp_eth - eth_amount is its ETH delta relative
+        to the holding position.
+    """
+    k = eth_amount * usdc_amount
+    if _is_scalar(eth_price):
+        lp_val = 2 * math.sqrt(k * eth_price)
+        hold_val = eth_amount * eth_price + usdc_amount
+        lp_eth = math.sqrt(k / eth_price)
+        return lp_val, hold_val, ((hold_val - lp_val) / hold_val) * 100, lp_eth, lp_eth - eth_amount
+
+    prices = np.asarray(eth_price, dtype=np.float64)
+    if out is None:
+        out = tuple(np.empty_like(prices) for _ in range(5))
+    v_lp, v_hold, il_pct, lp_eth, lp_delta = out
+    flat = [a.reshape(-1) for a in (prices, v_lp, v_hold, il_pct, lp_eth, lp_delta)]
+    for start in range(0, prices.size, METRICS_BLOCK):
+        p, lp, hold, il, eth, delta = (a[start:start + METRICS_BLOCK] for a in flat)
+        np.multiply(k, p, out=lp)
+        np.sqrt(lp, out=lp)
+        np.multiply(2, lp, out=lp)
+        np.multiply(eth_amount, p, out=hold)
+        np.add(hold, usdc_amount, out=hold)
+        np.subtract(hold, lp, out=il)
+        np.divide(il, hold, out=il)
+        np.multiply(il, 100, out=il)
+        np.divide(k, p, out=eth)
+        np.sqrt(eth, out=eth)
+        np.subtract(eth, eth_amount, out=delta)
+    return v_lp, v_hold, il_pct, lp_eth, lp_delta
@@ -0,0 +1,343 @@
+import json
+import logging
+import os
+from typing import Any, Dict, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from src.alignment import PriceIndex, to_epoch_ns
+from src.columnar import TimeBound, read_dataset, write_dataset
+from src.data_fetcher import CANDLE_COLUMNS, fetch_binance_candles
+from src.storage import PartitionedStore
+from src.config import CANDLE_BASE_TIMEFRAME, CANDLE_PYRAMID_LEVELS, CANDLE_STORE_DIR, PLOT_MAX_POINTS
+
+PYRAMID_FILE = 'pyramid.json'
+TIMEFRAME_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+# Row order of a level's value matrix
+OHLCV = CANDLE_COLUMNS[1:]
+
+def timeframe_seconds(timeframe: str) -> int:
+    """
+    :param timeframe: Binance-style timeframe such as '1m', '15m', '4h' or '1d'
+    :return: Candle length in seconds
+    """
+    try:
+        return int(timeframe[:-1]) * TIMEFRAME_UNITS[timeframe[-1]]
+    except (KeyError, ValueError):
+        raise ValueError(f"Unsupported timeframe: {timeframe}") from None
+
+def aggregate_candles(
+    timestamps: np.ndarray, values: np.ndarray, period_ns: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Aggregate sorted candles into epoch-aligned buckets of period_ns.
+
+    Buckets take the first open, highest high, lowest low, last close and
+    summed volume of the candles they contain; missing candles just leave a
+    bucket with fewer members.
+
+    :param timestamps: Sorted int64 epoch-ns candle open times
+    :param values: (5, n) matrix of open, high, low, close, volume
+    :param period_ns: Bucket length in nanoseconds
+    :return: (bucket open times, (5, buckets) value matrix)
+    """
+    buckets = timestamps // period_ns * period_ns
+    if not len(buckets):
+        return buckets, np.empty((len(OHLCV), 0))
+    starts = np.flatnonzero(np.concatenate([[True], buckets[1:] != buckets[:-1]]))
+    ends = np.append(starts[1:], len(buckets)) - 1
+    out = np.empty((len(OHLCV), len(starts)))
+    out[0] = values[0, starts]
+    out[1] = np.maximum.reduceat(values[1], starts)
+    out[2] = np.minimum.reduceat(values[2], starts)
+    out[3] = values[3, ends]
+    out[4] = np.add.reduceat(values[4], starts)
+    return buckets[starts], out
+
+class CandleLevel:
+    """
+    One resolution of a pyramid: sorted candle open times and a (5, n) OHLCV
+    matrix in growable buffers, so appends are amortized O(1) per candle.
+    """
+
+    __slots__ = ('timeframe', 'period_ns', 'size', '_timestamps', '_values')
+
+    def __init__(self, timeframe: str):
+        self.timeframe = timeframe
+        self.period_ns = timeframe_seconds(timeframe) * 1_000_000_000
+        self.size = 0
+        self._timestamps = np.empty(0, dtype=np.int64)
+        self._values = np.empty((len(OHLCV), 0))
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self._timestamps[:self.size]
+
+    @property
+    def values(self) -> np.ndarray:
+        return self._values[:, :self.size]
+
+    def truncate(self, size: int) -> None:
+        self.size = max(min(size, self.size), 0)
+
+    def extend(self, timestamps: np.ndarray, values: np.ndarray) -> None:
+        size = self.size + len(timestamps)
+        if size > len(self._timestamps):
+            capacity = max(size, 2 * len(self._timestamps), 1024)
+            grown_ts = np.empty(capacity, dtype=np.int64)
+            grown_values = np.empty((len(OHLCV), capacity))
+            grown_ts[:self.size] = self.timestamps
+            grown_values[:, :self.size] = self.values
+            self._timestamps, self._values = grown_ts, grown_values
+        self._timestamps[self.size:size] = timestamps
+        self._values[:, self.size:size] = values
+        self.size = size
+
+    def bounds(self, start: TimeBound = None, end: TimeBound = None) -> Tuple[int, int]:
+        """
+        :return: (first, stop) positions of the candles opening in [start, end], by binary search
+        """
+        ts = self.timestamps
+        first, stop = 0, self.size
+        if start is not None:
+            first = int(np.searchsorted(ts, pd.Timestamp(start).as_unit('ns').value, side='left'))
+        if end is not None:
+            stop = int(np.searchsorted(ts, pd.Timestamp(end).as_unit('ns').value, side='right'))
+        return first, max(first, stop)
+
+class CandlePyramid:
+    """
+    Candles of one symbol at a base resolution plus aggregated coarser levels.
+
+    The base level (e.g. 1m) is fetched once; every other level is built
+    from the next finer one, so a year of 1m candles yields 5m, 15m, 1h, 4h
+    and 1d candles in one pass each. Appending new base candles only
+    re-aggregates from the last (possibly partial) bucket of each level, and
+    time-range queries at any level are two binary searches.
+    """
+
+    def __init__(self, base_timeframe: str = CANDLE_BASE_TIMEFRAME, levels: Sequence[str] = CANDLE_PYRAMID_LEVELS):
+        """
+        :param base_timeframe: Resolution of the appended candles
+        :param levels: Coarser timeframes, each a multiple of the previous one
+        """
+        self.levels: Dict[str, CandleLevel] = {base_timeframe: CandleLevel(base_timeframe)}
+        self.base_timeframe = base_timeframe
+        finer = self.levels[base_timeframe]
+        for timeframe in levels:
+            level = CandleLevel(timeframe)
+            if level.period_ns <= finer.period_ns or level.period_ns % finer.period_ns:
+                raise ValueError(f"{timeframe} is not a multiple of {finer.timeframe}")
+            self.levels[timeframe] = finer = level
+
+    @property
+    def timeframes(self) -> list:
+        return list(self.levels)
+
+    def _level(self, timeframe: Optional[str]) -> CandleLevel:
+        try:
+            return self.levels[timeframe or self.base_timeframe]
+        except KeyError:
+            raise ValueError(f"No {timeframe} level in pyramid {self.timeframes}") from None
+
+    def append(self, df: pd.DataFrame) -> int:
+        """
+        Add base-resolution candles and update the coarser levels incrementally.
+
+        Candles opening before the last stored one are ignored; one opening
+        at the same time replaces it (Binance's still-open candle).
+
+        :param df: Candles with CANDLE_COLUMNS at the base timeframe
+        :return: Number of base candles added or replaced
+        """
+        if df.empty:
+            return 0
+        timestamps = to_epoch_ns(df['timestamp'])
+        values = np.vstack([df[column].to_numpy(dtype=np.float64) for column in OHLCV])
+        if np.any(timestamps[1:] <= timestamps[:-1]):
+            order = np.argsort(timestamps, kind='stable')
+            timestamps, values = timestamps[order], values[:, order]
+            # Keep the last of duplicated timestamps
+            keep = np.append(timestamps[1:] != timestamps[:-1], True)
+            timestamps, values = timestamps[keep], values[:, keep]
+
+        base = self.levels[self.base_timeframe]
+        changed = base.size
+        if base.size:
+            last = base.timestamps[-1]
+            new = timestamps >= last
+            if not new.all():
+                logging.debug("Ignoring %d candles older than the pyramid's last candle", int((~new).sum()))
+                timestamps, values = timestamps[new], values[:, new]
+            if len(timestamps) and timestamps[0] == last:
+                changed -= 1
+        if not len(timestamps):
+            return 0
+        base.truncate(changed)
+        base.extend(timestamps, values)
+
+        finer = base
+        for level in list(self.levels.values())[1:]:
+            changed = self._reaggregate(finer, level, changed)
+            finer = level
+        return len(timestamps)
+
+    @staticmethod
+    def _reaggregate(finer: CandleLevel, level: CandleLevel, changed: int) -> int:
+        """
+        Rebuild level's buckets from the one containing finer candle `changed` onwards.
+
+        :return: First position of level that changed
+        """
+        if changed >= finer.size:
+            return level.size
+        bucket = finer.timestamps[changed] // level.period_ns * level.period_ns
+        first = int(np.searchsorted(level.timestamps, bucket, side='left'))
+        source = int(np.searchsorted(finer.timestamps, bucket, side='left'))
+        timestamps, values = aggregate_candles(finer.timestamps[source:], finer.values[:, source:], level.period_ns)
+        level.truncate(first)
+        level.extend(timestamps, values)
+        return first
+
+    def window(
+        self, timeframe: Optional[str] = None, start: TimeBound = None, end: TimeBound = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Views of the candles opening in [start, end], without copying.
+
+        The views are only valid until the next append.
+
+        :param timeframe: Pyramid level (default: base)
+        :return: (int64 epoch-ns open times, (5, n) OHLCV matrix)
+        """
+        level = self._level(timeframe)
+        first, stop = level.bounds(start, end)
+        return level.timestamps[first:stop], level.values[:, first:stop]
+
+    def candles(self, timeframe: Optional[str] = None, start: TimeBound = None, end: TimeBound = None) -> pd.DataFrame:
+        """
+        Candles opening in [start, end] at one level, like fetch_binance_candles returns them.
+
+        :param timeframe: Pyramid level (default: base)
+        :param start: Inclusive start (anything pd.Timestamp accepts, or epoch ns)
+        :param end: Inclusive end
+        :return: DataFrame with CANDLE_COLUMNS
+        """
+        timestamps, values = self.window(timeframe, start, end)
+        df = pd.DataFrame({'timestamp': timestamps.astype('datetime64[ns]')})
+        for name, row in zip(OHLCV, values):
+            df[name] = row.copy()
+        return df
+
+    def price_index(self, timeframe: Optional[str] = None, start: TimeBound = None, end: TimeBound = None) -> PriceIndex:
+        """
+        :return: As-of close price index at one level, e.g. to rerun the backtest at another granularity
+        """
+        timestamps, values = self.window(timeframe, start, end)
+        return PriceIndex(timestamps, values[3])
+
+    def level_for(self, start: TimeBound = None, end: TimeBound = None, max_points: int = PLOT_MAX_POINTS) -> str:
+        """
+        Finest level with at most max_points candles in [start, end], e.g. to zoom a chart.
+
+        :return: Timeframe of the chosen level (the coarsest one if none is small enough)
+        """
+        for timeframe, level in self.levels.items():
+            first, stop = level.bounds(start, end)
+            if stop - first <= max_points:
+                return timeframe
+        return timeframe
+
+    def sync(
+        self,
+        symbol: str,
+        since: int,
+        end_time: int,
+        store: Optional[PartitionedStore] = None,
+        exchange: Optional[Any] = None,
+    ) -> int:
+        """
+        Fetch base candles from the pyramid's last candle (or since) to end_time and append them.
+
+        :param symbol: Binance symbol
+        :param since: Start in milliseconds, used when the pyramid has no candles at or after it yet
+        :param end_time: End in milliseconds (inclusive)
+        :param store: Local partitioned store, so only missing days hit the network
+        :param exchange: ccxt exchange instance
+        :return: Number of base candles added or replaced
+        """
+        base = self.levels[self.base_timeframe]
+        if base.size:
+            first_ms, last_ms = int(base.timestamps[0] // 1_000_000), int(base.timestamps[-1] // 1_000_000)
+            if since < first_ms:
+                # Candles can only be appended, so an earlier start rebuilds the pyramid
+                logging.info("Rebuilding the %s pyramid from %d ms.", symbol, since)
+                end_time = max(end_time, last_ms)
+                for level in self.levels.values():
+                    level.truncate(0)
+            else:
+                since = max(since, last_ms)
+        if since > end_time:
+            return 0
+        df = fetch_binance_candles(symbol=symbol, timeframe=self.base_timeframe, since=since,
+                                   end_time=end_time, exchange=exchange, store=store)
+        added = self.append(df)
+        logging.info("Added %d %s %s candles to the pyramid.", added, symbol, self.base_timeframe)
+        return added
+
+    def save(self, path: str) -> None:
+        """
+        Store every level as a columnar dataset under path.
+        """
+        os.makedirs(path, exist_ok=True)
+        for timeframe in self.levels:
+            write_dataset(os.path.join(path, timeframe), self.candles(timeframe))
+        with open(os.path.join(path, PYRAMID_FILE), 'w') as f:
+            json.dump({'base_timeframe': self.base_timeframe, 'levels': self.timeframes[1:]}, f)
+
+    @classmethod
+    def load(cls, path: str) -> 'CandlePyramid':
+        """
+        Load a pyramid written by save.
+        """
+        with open(os.path.join(path, PYRAMID_FILE)) as f:
+            layout = json.load(f)
+        pyramid = cls(layout['base_timeframe'], layout['levels'])
+        for timeframe, level in pyramid.levels.items():
+            df = read_dataset(os.path.join(path, timeframe))
+            if len(df):
+                level.extend(to_epoch_ns(df['timestamp']), np.vstack([df[name].to_numpy() for name in OHLCV]))
+        return pyramid
+
+def pyramid_path(symbol: str, root: str = CANDLE_STORE_DIR) -> str:
+    return os.path.join(root, symbol.replace('/', '-'))
+
+def load_candles(
+    symbol: str,
+    timeframe: str,
+    since: int,
+    end_time: int,
+    store: Optional[PartitionedStore] = None,
+    root: str = CANDLE_STORE_DIR,
+) -> pd.DataFrame:
+    """
+    Candles at any pyramid level, syncing the symbol's persisted pyramid first.
+
+    Only base candles after the pyramid's last one are fetched (through the
+    partitioned store when given), so switching timeframe never refetches.
+
+    :param symbol: Binance symbol
+    :param timeframe: Level to return (the base timeframe or one of CANDLE_PYRAMID_LEVELS)
+    :param since: Start in milliseconds
+    :param end_time: End in milliseconds (inclusive)
+    :param store: Local partitioned store for the base candles
+    :param root: Directory of the persisted pyramids
+    :return: DataFrame with CANDLE_COLUMNS
+    """
+    path = pyramid_path(symbol, root)
+    pyramid = CandlePyramid.load(path) if os.path.exists(os.path.join(path, PYRAMID_FILE)) else CandlePyramid()
+    if pyramid.sync(symbol, since, end_time, store=store):
+        pyramid.save(path)
+    return pyramid.candles(timeframe, since * 1_000_000, end_time * 1_000_000)
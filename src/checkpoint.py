@@ -0,0 +1,112 @@
+import json
+import logging
+import os
+import random
+import re
+import shutil
+import time
+from typing import Any, Callable, List, Optional, Tuple
+from src.config import FETCH_MAX_RETRIES, FETCH_BACKOFF_BASE, FETCH_BACKOFF_MAX
+
+class FetchError(Exception):
+    """
+    Raised when a fetch request still fails after all retries.
+    """
+
+def retry_call(
+    fn: Callable[[], Any],
+    description: str,
+    max_retries: int = FETCH_MAX_RETRIES,
+    backoff_base: float = FETCH_BACKOFF_BASE,
+    backoff_max: float = FETCH_BACKOFF_MAX,
+) -> Any:
+    """
+    Call fn, retrying failures with exponential backoff and jitter.
+
+    :param fn: Zero-argument callable performing one attempt
+    :param description: Short label used in log messages
+    :param max_retries: Number of attempts before giving up
+    :param backoff_base: Delay before the first retry in seconds
+    :param backoff_max: Upper bound on a single delay in seconds
+    :return: The result of the first successful attempt
+    :raises FetchError: If every attempt fails
+    """
+    for attempt in range(1, max_retries + 1):
+        try:
+            return fn()
+        except Exception as e:
+            if attempt == max_retries:
+                raise FetchError(f"{description} failed after {attempt} attempts: {e}") from e
+            delay = min(backoff_max, backoff_base * 2 ** (attempt - 1))
+            delay *= random.uniform(0.5, 1.0)
+            logging.warning("%s failed (attempt %d/%d): %s. Retrying in %.1fs.",
+                            description, attempt, max_retries, e, delay)
+            time.sleep(delay)
+
+class FetchJournal:
+    """
+    Append-only checkpoint journal of a single fetch job.
+
+    Each committed page appends its rows to rows.jsonl and then atomically
+    replaces cursor.json with the cursor to resume from and the byte length
+    of the committed rows. Rows written after the last cursor update, e.g.
+    by a crash mid-commit, are truncated away on load.
+    """
+
+    def __init__(self, root: str, job_id: str):
+        """
+        :param root: Directory holding all journals
+        :param job_id: Unique identifier of the job (sanitized into a directory name)
+        """
+        self.path = os.path.join(root, re.sub(r'[^A-Za-z0-9_.-]', '-', job_id))
+        self._rows_path = os.path.join(self.path, 'rows.jsonl')
+        self._cursor_path = os.path.join(self.path, 'cursor.json')
+
+    def load(self) -> Tuple[Optional[Any], List[Any]]:
+        """
+        :return: (cursor, rows) of the last commit, or (None, []) for a new job
+        """
+        if not os.path.exists(self._cursor_path):
+            return None, []
+        with open(self._cursor_path) as f:
+            state = json.load(f)
+        with open(self._rows_path, 'r+') as f:
+            f.truncate(state['offset'])
+            rows = [json.loads(line) for line in f]
+        logging.info("Resuming fetch job %s from cursor %s (%d rows).",
+                     os.path.basename(self.path), state['cursor'], len(rows))
+        return state['cursor'], rows
+
+    def commit(self, rows: List[Any], cursor: Any) -> None:
+        """
+        Durably append a page of rows and advance the cursor.
+
+        :param rows: JSON-serializable rows of the page
+        :param cursor: Position to resume from after this page
+        """
+        os.makedirs(self.path, exist_ok=True)
+        with open(self._rows_path, 'a') as f:
+            for row in rows:
+                f.write(json.dumps(row))
+                f.write('\n')
+            f.flush()
+            os.fsync(f.fileno())
+            offset = f.tell()
+        tmp_path = self._cursor_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'cursor': cursor, 'offset': offset}, f)
+        os.replace(tmp_path, self._cursor_path)
+
+    def clear(self) -> None:
+        """
+        Remove the journal once the job has completed.
+        """
+        shutil.rmtree(self.path, ignore_errors=True)
+
+def open_journal(journal_dir: Optional[str], job_id: str) -> Optional[FetchJournal]:
+    """
+    :param journal_dir: Journal root directory, or None to disable checkpointing
+    :param job_id: Unique identifier of the job
+    :return: Journal for the job, or None when checkpointing is disabled
+    """
+    return FetchJournal(journal_dir, job_id) if journal_dir else None
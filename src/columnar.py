@@ -0,0 +1,273 @@
+import json
+import os
+import shutil
+from typing import Callable, Iterator, List, Optional, Sequence, Union
+import numpy as np
+import pandas as pd
+
+META_FILE = 'meta.json'
+# Default number of rows per part; parts are the unit of time-range pruning
+PART_ROWS = 1_000_000
+
+TimeBound = Optional[Union[int, str, pd.Timestamp]]
+
+def _to_ns(value: TimeBound) -> Optional[int]:
+    if value is None:
+        return None
+    return pd.Timestamp(value).as_unit('ns').value
+
+def _encode_strings(values: np.ndarray) -> np.ndarray:
+    text = values.astype(str)
+    try:
+        # ASCII (hex ids, decimal amounts) converts in C; UTF-8 bytes are identical
+        return text.astype('S')
+    except UnicodeEncodeError:
+        return np.char.encode(text, 'utf-8')
+
+def _decode_strings(values: np.ndarray) -> np.ndarray:
+    try:
+        return values.astype(str)
+    except UnicodeDecodeError:
+        return np.char.decode(values, 'utf-8')
+
+class DatasetWriter:
+    """
+    Append DataFrames to a columnar dataset directory.
+
+    Each appended frame becomes a part directory with one .npy file per
+    column (or one compressed .npz per part). meta.json keeps the column
+    dtypes and, per part, the row count and timestamp range so readers can
+    skip parts outside a requested time range. Numeric and datetime columns
+    keep their exact dtype; string columns are stored as UTF-8 bytes.
+    """
+
+    def __init__(self, path: str, compress: bool = False, time_column: str = 'timestamp'):
+        """
+        :param path: Dataset directory (replaced if it exists)
+        :param compress: Write compressed .npz parts instead of memory-mappable .npy columns
+        :param time_column: Column used for time-range pruning (if present)
+        """
+        self.path = path
+        self.compress = compress
+        self.time_column = time_column
+        self.meta = {'columns': None, 'time_column': time_column, 'compress': compress, 'parts': []}
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.makedirs(path)
+
+    def append(self, df: pd.DataFrame) -> None:
+        """
+        Write df as the next part of the dataset.
+
+        :param df: Frame with the same columns as previous parts
+        """
+        if df.empty:
+            return
+        arrays, kinds = {}, {}
+        for name in df.columns:
+            values = df[name].to_numpy()
+            if values.dtype == object or pd.api.types.is_string_dtype(df[name].dtype):
+                arrays[name] = _encode_strings(values)
+                kinds[name] = 'str'
+            else:
+                arrays[name] = values
+                kinds[name] = values.dtype.str
+        if self.meta['columns'] is None:
+            self.meta['columns'] = kinds
+        elif list(kinds) != list(self.meta['columns']):
+            raise ValueError(f"Column mismatch: {list(kinds)} != {list(self.meta['columns'])}")
+
+        part = {'name': f"part-{len(self.meta['parts']):05d}", 'rows': len(df)}
+        if self.time_column in arrays:
+            ts = arrays[self.time_column].astype('datetime64[ns]').astype(np.int64)
+            part['ts_min'] = int(ts.min())
+            part['ts_max'] = int(ts.max())
+            part['sorted'] = bool(np.all(ts[1:] >= ts[:-1]))
+
+        if self.compress:
+            np.savez_compressed(os.path.join(self.path, part['name'] + '.npz'), **arrays)
+        else:
+            part_dir = os.path.join(self.path, part['name'])
+            os.makedirs(part_dir)
+            for name, values in arrays.items():
+                np.save(os.path.join(part_dir, f"{name}.npy"), values)
+        self.meta['parts'].append(part)
+        self._write_meta()
+
+    def _write_meta(self) -> None:
+        tmp_path = os.path.join(self.path, META_FILE + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self.meta, f)
+        os.replace(tmp_path, os.path.join(self.path, META_FILE))
+
+    def close(self) -> None:
+        self._write_meta()
+
+    def __enter__(self) -> 'DatasetWriter':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+def write_dataset(
+    path: str, df: pd.DataFrame, compress: bool = False, part_rows: int = PART_ROWS
+) -> None:
+    """
+    Write a DataFrame as a columnar dataset, split into parts of part_rows rows.
+
+    :param path: Dataset directory (replaced if it exists)
+    :param df: Frame to write
+    :param compress: Write compressed .npz parts instead of memory-mappable .npy columns
+    :param part_rows: Rows per part
+    """
+    with DatasetWriter(path, compress=compress) as writer:
+        for start in range(0, len(df), part_rows):
+            writer.append(df.iloc[start:start + part_rows])
+
+def read_meta(path: str) -> dict:
+    with open(os.path.join(path, META_FILE)) as f:
+        return json.load(f)
+
+def _read_part(
+    load: Callable[[str], np.ndarray],
+    part: dict,
+    kinds: dict,
+    columns: List[str],
+    time_column: Optional[str],
+    start_ns: Optional[int],
+    end_ns: Optional[int],
+) -> dict:
+    """
+    Copy the requested columns of one part, restricted to [start_ns, end_ns].
+
+    :param load: Callable returning a column array of the part by name
+    :return: Column name -> array owning its data
+    """
+    rows = slice(None)
+    if (start_ns is not None or end_ns is not None) and time_column in kinds:
+        ts = load(time_column).astype('datetime64[ns]').view(np.int64)
+        if part.get('sorted'):
+            lo = 0 if start_ns is None else int(np.searchsorted(ts, start_ns, side='left'))
+            hi = len(ts) if end_ns is None else int(np.searchsorted(ts, end_ns, side='right'))
+            rows = slice(lo, hi)
+        else:
+            rows = np.ones(len(ts), dtype=bool)
+            if start_ns is not None:
+                rows &= ts >= start_ns
+            if end_ns is not None:
+                rows &= ts <= end_ns
+
+    data = {}
+    for name in columns:
+        values = load(name)[rows]
+        if kinds[name] == 'str':
+            data[name] = pd.array(_decode_strings(values), dtype='str')
+        else:
+            data[name] = np.array(values)
+    return data
+
+def iter_dataset(
+    path: str,
+    columns: Optional[Sequence[str]] = None,
+    start: TimeBound = None,
+    end: TimeBound = None,
+    mmap: bool = True,
+    chunk_rows: Optional[int] = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Yield the rows of a dataset overlapping [start, end], one DataFrame per part.
+
+    Only the requested columns are loaded. Uncompressed parts are memory-mapped,
+    so rows outside the time range are never read from disk. With chunk_rows,
+    rows are instead yielded in frames of exactly that size (the last may be
+    shorter), regardless of how the dataset was split into parts.
+
+    :param path: Dataset directory
+    :param columns: Columns to load (default: all)
+    :param start: Inclusive lower bound on the time column (anything pd.Timestamp accepts)
+    :param end: Inclusive upper bound on the time column
+    :param mmap: Memory-map uncompressed column files
+    :param chunk_rows: Rows per yielded frame (default: one frame per part)
+    :return: Iterator of DataFrames
+    """
+    if chunk_rows is not None:
+        yield from _rechunk(iter_dataset(path, columns, start, end, mmap), chunk_rows)
+        return
+
+    meta = read_meta(path)
+    kinds = meta['columns'] or {}
+    columns = list(kinds) if columns is None else list(columns)
+    time_column = meta['time_column']
+    start_ns, end_ns = _to_ns(start), _to_ns(end)
+
+    for part in meta['parts']:
+        if start_ns is not None and part.get('ts_max', start_ns) < start_ns:
+            continue
+        if end_ns is not None and part.get('ts_min', end_ns) > end_ns:
+            continue
+
+        if meta['compress']:
+            # Closed before the part is yielded, so a paused iterator holds no file handle
+            with np.load(os.path.join(path, part['name'] + '.npz')) as archive:
+                data = _read_part(archive.__getitem__, part, kinds, columns, time_column, start_ns, end_ns)
+        else:
+            part_dir = os.path.join(path, part['name'])
+            load = lambda name: np.load(os.path.join(part_dir, f"{name}.npy"), mmap_mode='r' if mmap else None)
+            data = _read_part(load, part, kinds, columns, time_column, start_ns, end_ns)
+        df = pd.DataFrame(data, columns=columns)
+        if not df.empty:
+            yield df
+
+def _rechunk(frames: Iterator[pd.DataFrame], chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """
+    Re-split a stream of frames into frames of chunk_rows rows.
+    """
+    pending = []
+    pending_rows = 0
+    for df in frames:
+        offset = 0
+        while offset < len(df):
+            take = min(chunk_rows - pending_rows, len(df) - offset)
+            pending.append(df.iloc[offset:offset + take])
+            pending_rows += take
+            offset += take
+            if pending_rows == chunk_rows:
+                yield pd.concat(pending, ignore_index=True)
+                pending, pending_rows = [], 0
+    if pending:
+        yield pd.concat(pending, ignore_index=True)
+
+def read_dataset(
+    path: str,
+    columns: Optional[Sequence[str]] = None,
+    start: TimeBound = None,
+    end: TimeBound = None,
+) -> pd.DataFrame:
+    """
+    Load selected columns and an optional time range of a dataset into one DataFrame.
+
+    :param path: Dataset directory
+    :param columns: Columns to load (default: all)
+    :param start: Inclusive lower bound on the time column
+    :param end: Inclusive upper bound on the time column
+    :return: DataFrame
+    """
+    frames = list(iter_dataset(path, columns=columns, start=start, end=end))
+    if not frames:
+        kinds = read_meta(path)['columns'] or {}
+        return pd.DataFrame(columns=list(kinds) if columns is None else list(columns))
+    return pd.concat(frames, ignore_index=True)
+
+def export_csv(path: str, csv_path: str, columns: Optional[List[str]] = None) -> None:
+    """
+    Export a dataset to a CSV file part by part.
+
+    :param path: Dataset directory
+    :param csv_path: Output CSV path
+    :param columns: Columns to export (default: all)
+    """
+    header = True
+    with open(csv_path, 'w', newline='') as f:
+        for df in iter_dataset(path, columns=columns):
+            df.to_csv(f, index=False, header=header)
+            header = False
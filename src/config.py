@@ -9,9 +9,36 @@ GRAPH_URL = (
     "https://gateway.thegraph.com/api/cf408901eb42841aec6fea82de29b9a4/"
     "subgraphs/id/A3Np3RQbaBA6oKJgiwDJeo5T3zrYfGHPWFYayMwtNDum"
 )
+POOL_FEE_RATE = 0.003  # Uniswap V2 swap fee paid to liquidity providers (0.3% of the input amount)
 
 # Strategy parameters
 FEE_RATE = 0.001  # 0.1% fee per trade
 IL_THRESHOLD = 3.0  # Impermanent loss threshold (percentage)
 ALPHA = 0.5         # Hedge fraction (short 50% of ETH exposure)
-INITIAL_K = 50000.0  # k = 5 ETH * 10,000 USDC
+INITIAL_ETH = 5.0        # ETH deposited into the LP position
+INITIAL_USDC = 10000.0   # USDC deposited into the LP position
+INITIAL_K = INITIAL_ETH * INITIAL_USDC  # k = 5 ETH * 10,000 USDC
+
+# Local data cache
+CACHE_DIR = "data/cache"  # Root of the time-partitioned store for fetched data
+STAGE_CACHE_DIR = "data/stage_cache"       # Content-addressed outputs of pipeline stages
+STAGE_CACHE_MAX_BYTES = 2 * 1024 ** 3      # Least recently used stage outputs are evicted above this size
+CANDLE_STORE_DIR = "data/candle_store"     # Multi-resolution candle pyramids, one per symbol
+CANDLE_BASE_TIMEFRAME = '1m'               # Finest resolution fetched; coarser levels are aggregated from it
+CANDLE_PYRAMID_LEVELS = ['5m', '15m', '1h', '4h', '1d']
+
+# Graph ingestion
+GRAPH_MAX_WORKERS = 8     # Concurrent shard fetchers for sharded swap ingestion
+GRAPH_RATE_LIMIT = 10.0   # Global cap on Graph requests per second
+
+# Fetch retries and checkpoints
+FETCH_MAX_RETRIES = 5       # Attempts per request before a fetch job fails
+FETCH_BACKOFF_BASE = 1.0    # First retry delay in seconds, doubled on every attempt
+FETCH_BACKOFF_MAX = 60.0    # Upper bound on a single retry delay in seconds
+JOURNAL_DIR = "data/journal"  # Checkpoint journals of unfinished fetch jobs
+
+# Output storage
+EXPORT_CSV = False  # Also write CSV copies of the columnar datasets under data/
+
+# Plotting
+PLOT_MAX_POINTS = 4000  # Points kept per series when downsampling for rendering
@@ -1,16 +1,69 @@
-import ccxt
+import numpy as np
 import pandas as pd
-import requests
 import time
 import logging
-from typing import Optional
-from src.config import BINANCE_DEFAULT_SINCE, GRAPH_URL
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterator, Optional
+from src.checkpoint import FetchError, open_journal, retry_call
+from src.config import BINANCE_DEFAULT_SINCE, GRAPH_URL, GRAPH_MAX_WORKERS, GRAPH_RATE_LIMIT, JOURNAL_DIR
+from src.http_client import RateLimiter, make_session
+from src.profiling import record_http
+from src.storage import PartitionedStore
+
+CANDLE_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+SWAP_COLUMNS = ['id', 'timestamp', 'amount0In', 'amount1In', 'amount0Out', 'amount1Out']
+# Graph amounts are decimal strings; keep them as text when reading the cache back
+SWAP_DTYPES = {column: str for column in SWAP_COLUMNS if column != 'timestamp'}
+POOL_STATE_COLUMNS = ['timestamp', 'eth_reserve', 'usdc_reserve']
+
+def candle_cache_key(symbol: str, timeframe: str) -> str:
+    return f"candles/binance/{symbol.replace('/', '-')}/{timeframe}"
+
+def swap_cache_key(pool_address: str) -> str:
+    return f"swaps/{pool_address.lower()}"
+
+def pool_state_cache_key(pool_address: str) -> str:
+    return f"pool_state/{pool_address.lower()}"
+
+def _post_graph_query(
+    session: Optional[Any],
+    url: str,
+    query: str,
+    entity: str,
+    description: str,
+    rate_limiter: Optional[RateLimiter] = None,
+) -> list:
+    """
+    Run one GraphQL query with retries and return the list of requested entities.
+
+    Request errors, JSON decode errors and unexpected result structures are all
+    retried with exponential backoff; a FetchError is raised once retries run out.
+    """
+    if session is None:
+        import requests
+        session = requests
+
+    def attempt() -> list:
+        if rate_limiter is not None:
+            rate_limiter.wait()
+        response = session.post(url, json={'query': query}, timeout=30)
+        record_http(len(getattr(response, 'content', None) or b''))
+        response.raise_for_status()
+        result = response.json()
+        if "data" not in result or not result["data"] or entity not in result["data"]:
+            raise FetchError(f"Unexpected result structure: {result}")
+        return result["data"][entity]
+
+    return retry_call(attempt, description)
 
 def fetch_binance_candles(
     symbol: str = 'ETH/USDC',
     timeframe: str = '15m',
     since: Optional[int] = None,
     end_time: Optional[int] = None,
+    exchange: Optional[Any] = None,
+    store: Optional[PartitionedStore] = None,
+    journal_dir: Optional[str] = JOURNAL_DIR,
 ) -> pd.DataFrame:
     """
     Fetch historical candlestick data from Binance using pagination.
@@ -19,33 +72,84 @@ def fetch_binance_candles(
     :param timeframe: Timeframe for candles (default '15m')
     :param since: Start timestamp in milliseconds (default Jan 1, 2024)
     :param end_time: End timestamp in milliseconds (optional)
+    :param exchange: ccxt exchange instance (default: a rate-limited Binance client)
+    :param store: Local partitioned store; when given, only days missing from it are fetched
+    :param journal_dir: Directory for resumable checkpoint journals (None disables them)
     :return: DataFrame with OHLCV data
     """
-    binance = ccxt.binance({'enableRateLimit': True})
+    if exchange is None:
+        # ccxt takes ~0.5 s to import, so only runs that fetch candles pay for it
+        import ccxt
+        exchange = ccxt.binance({'enableRateLimit': True})
     if since is None:
         since = BINANCE_DEFAULT_SINCE
 
+    if store is not None:
+        end_ms = end_time if end_time else int(time.time() * 1000)
+        return store.fetch_through(
+            candle_cache_key(symbol, timeframe),
+            since // 1000,
+            end_ms // 1000,
+            lambda start, end: _fetch_binance_range(
+                exchange, symbol, timeframe, start * 1000, end * 1000 - 1, journal_dir
+            ),
+            CANDLE_COLUMNS,
+        )
+    return _fetch_binance_range(exchange, symbol, timeframe, since, end_time, journal_dir)
+
+def _fetch_binance_range(
+    exchange: Any,
+    symbol: str,
+    timeframe: str,
+    since: int,
+    end_time: Optional[int],
+    journal_dir: Optional[str] = JOURNAL_DIR,
+) -> pd.DataFrame:
+    """
+    Page through fetch_ohlcv from since to end_time (both in milliseconds, inclusive).
+    """
+    journal = open_journal(journal_dir, f"candles-{symbol}-{timeframe}-{since}-{end_time}")
     all_candles = []
+    if journal is not None:
+        cursor, all_candles = journal.load()
+        if cursor is not None:
+            since = cursor
+
     while True:
-        candles = binance.fetch_ohlcv(symbol, timeframe=timeframe, since=since, limit=1000)
+        candles = retry_call(
+            lambda: exchange.fetch_ohlcv(symbol, timeframe=timeframe, since=since, limit=1000),
+            f"fetch_ohlcv {symbol} {timeframe} since {since}",
+        )
+        record_http(len(getattr(exchange, 'last_http_response', None) or ''))
         if not candles:
             break
         all_candles.extend(candles)
         last_ts = candles[-1][0]
+        if journal is not None:
+            journal.commit(candles, last_ts + 1)
         if end_time and last_ts >= end_time:
             break
         if last_ts == since:
             break
         since = last_ts + 1
+    if journal is not None:
+        journal.clear()
 
-    df = pd.DataFrame(all_candles, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+    df = pd.DataFrame(all_candles, columns=CANDLE_COLUMNS)
     df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
     if end_time:
         df = df[df['timestamp'] <= pd.to_datetime(end_time, unit='ms')]
     return df
 
 def fetch_uniswap_pool_data_paginated(
-    pool_address: str, start_timestamp: int, end_timestamp: int
+    pool_address: str,
+    start_timestamp: int,
+    end_timestamp: int,
+    session: Optional[Any] = None,
+    store: Optional[PartitionedStore] = None,
+    rate_limiter: Optional[RateLimiter] = None,
+    url: str = GRAPH_URL,
+    journal_dir: Optional[str] = JOURNAL_DIR,
 ) -> pd.DataFrame:
     """
     Fetch Uniswap pool swap data from The Graph using timestamp pagination.
@@ -53,14 +157,36 @@ def fetch_uniswap_pool_data_paginated(
     :param pool_address: Pool address (string)
     :param start_timestamp: Start Unix timestamp in seconds
     :param end_timestamp: End Unix timestamp in seconds
+    :param session: Object with a requests-compatible post() (default: the requests module)
+    :param store: Local partitioned store; when given, only days missing from it are fetched
+    :param rate_limiter: Shared limiter to wait on before each request (default: fixed 0.2s pause between pages)
+    :param url: GraphQL endpoint
+    :param journal_dir: Directory for resumable checkpoint journals (None disables them)
     :return: DataFrame with swap data
     """
-    url = GRAPH_URL
+    if store is not None:
+        return store.fetch_through(
+            swap_cache_key(pool_address),
+            start_timestamp,
+            end_timestamp,
+            lambda start, end: fetch_uniswap_pool_data_paginated(
+                pool_address, start, end - 1, session=session, rate_limiter=rate_limiter,
+                url=url, journal_dir=journal_dir,
+            ),
+            SWAP_COLUMNS,
+            dtype=SWAP_DTYPES,
+        )
+
     pool_address = pool_address.lower()
     all_data = []
     limit = 1000
     current_timestamp = start_timestamp
     iteration = 0
+    journal = open_journal(journal_dir, f"swaps-{pool_address}-{start_timestamp}-{end_timestamp}")
+    if journal is not None:
+        cursor, all_data = journal.load()
+        if cursor is not None:
+            current_timestamp = cursor
 
     while True:
         iteration += 1
@@ -80,24 +206,10 @@ def fetch_uniswap_pool_data_paginated(
           }}
         }}
         """
-        try:
-            response = requests.post(url, json={'query': query}, timeout=30)
-            response.raise_for_status()
-        except Exception as e:
-            logging.error("Request error (iteration %d): %s", iteration, e)
-            break
-
-        try:
-            result = response.json()
-        except Exception as e:
-            logging.error("JSON decode error (iteration %d): %s", iteration, e)
-            break
-
-        if "data" not in result or "swaps" not in result["data"]:
-            logging.error("Unexpected result structure (iteration %d): %s", iteration, result)
-            break
-
-        data_chunk = result["data"]["swaps"]
+        data_chunk = _post_graph_query(
+            session, url, query, "swaps",
+            f"Swaps query from {current_timestamp} (iteration {iteration})", rate_limiter,
+        )
         if not data_chunk:
             logging.info("Iteration %d: No new data, ending pagination.", iteration)
             break
@@ -105,6 +217,8 @@ def fetch_uniswap_pool_data_paginated(
         logging.info("Iteration %d: Retrieved %d records.", iteration, len(data_chunk))
         all_data.extend(data_chunk)
         last_timestamp = int(data_chunk[-1]["timestamp"])
+        if journal is not None:
+            journal.commit(data_chunk, last_timestamp + 1)
 
         if last_timestamp >= end_timestamp:
             logging.info("Reached end of period in iteration %d.", iteration)
@@ -115,36 +229,144 @@ def fetch_uniswap_pool_data_paginated(
             break
 
         current_timestamp = last_timestamp + 1
-        time.sleep(0.2)
+        if rate_limiter is None:
+            time.sleep(0.2)
+    if journal is not None:
+        journal.clear()
 
-    df = pd.DataFrame(all_data)
-    if not df.empty:
-        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='s')
+    return _swap_frame(all_data)
+
+def _swap_frame(rows: list) -> pd.DataFrame:
+    """
+    Convert swap rows into a frame with SWAP_COLUMNS, also when there are none.
+    """
+    df = pd.DataFrame(rows, columns=SWAP_COLUMNS)
+    df['timestamp'] = pd.to_datetime(df['timestamp'].astype('int64'), unit='s')
     return df
 
-def fetch_uniswap_pool_state_data(
-    pool_address: str, start_timestamp: int, end_timestamp: int
+def fetch_uniswap_pool_data_sharded(
+    pool_address: str,
+    start_timestamp: int,
+    end_timestamp: int,
+    shards: Optional[int] = None,
+    max_workers: int = GRAPH_MAX_WORKERS,
+    rate_limit: float = GRAPH_RATE_LIMIT,
+    session: Optional[Any] = None,
+    store: Optional[PartitionedStore] = None,
+    url: str = GRAPH_URL,
+    journal_dir: Optional[str] = JOURNAL_DIR,
 ) -> pd.DataFrame:
     """
-    Fetch Uniswap pool state data (pair hour data) using skip-based pagination.
-    
+    Fetch Uniswap pool swap data by paging several time shards concurrently.
+
+    [start_timestamp, end_timestamp] is split into equal, non-overlapping
+    shards that are paged on a bounded thread pool. All workers share one
+    pooled keep-alive session and one global rate limiter. Swaps are
+    de-duplicated by id in case a shard edge is returned twice.
+
     :param pool_address: Pool address (string)
     :param start_timestamp: Start Unix timestamp in seconds
     :param end_timestamp: End Unix timestamp in seconds
-    :return: DataFrame with pool state data
+    :param shards: Number of time shards (default: 4 per worker)
+    :param max_workers: Number of concurrent shard fetchers
+    :param rate_limit: Global cap on requests per second across all workers
+    :param session: Object with a requests-compatible post() (default: a pooled requests session)
+    :param store: Local partitioned store; when given, only days missing from it are fetched
+    :param url: GraphQL endpoint
+    :param journal_dir: Directory for per-shard checkpoint journals (None disables them)
+    :return: DataFrame with swap data sorted by timestamp
+    """
+    if session is None:
+        session = make_session(max_workers)
+    if store is not None:
+        return store.fetch_through(
+            swap_cache_key(pool_address),
+            start_timestamp,
+            end_timestamp,
+            lambda start, end: fetch_uniswap_pool_data_sharded(
+                pool_address, start, end - 1, shards=shards, max_workers=max_workers,
+                rate_limit=rate_limit, session=session, url=url, journal_dir=journal_dir,
+            ),
+            SWAP_COLUMNS,
+            dtype=SWAP_DTYPES,
+        )
+
+    if shards is None:
+        shards = max_workers * 4
+    span = end_timestamp - start_timestamp + 1
+    shards = max(1, min(shards, span))
+    bounds = [start_timestamp + span * i // shards for i in range(shards + 1)]
+    rate_limiter = RateLimiter(rate_limit)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [
+            pool.submit(
+                fetch_uniswap_pool_data_paginated,
+                pool_address, bounds[i], bounds[i + 1] - 1,
+                session=session, rate_limiter=rate_limiter, url=url, journal_dir=journal_dir,
+            )
+            for i in range(shards)
+        ]
+        frames = [future.result() for future in futures]
+
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        # An empty period still has the swap columns, so callers get an empty backtest rather than a KeyError
+        return _swap_frame([])
+    df = pd.concat(frames, ignore_index=True)
+    df = df.drop_duplicates(subset='id').sort_values('timestamp', kind='stable', ignore_index=True)
+    logging.info("Fetched %d swaps in %d shards.", len(df), shards)
+    return df
+
+def _pool_state_frame(rows: list) -> pd.DataFrame:
+    """
+    Convert a page of pairHourDatas rows into typed pool state columns.
+    """
+    return pd.DataFrame({
+        'timestamp': pd.to_datetime(np.array([row['hourStartUnix'] for row in rows], dtype=np.int64), unit='s'),
+        'eth_reserve': np.array([row['reserve1'] for row in rows], dtype=np.float64),
+        'usdc_reserve': np.array([row['reserve0'] for row in rows], dtype=np.float64),
+    }, columns=POOL_STATE_COLUMNS)
+
+def iter_uniswap_pool_state_chunks(
+    pool_address: str,
+    start_timestamp: int,
+    end_timestamp: int,
+    page_size: int = 1000,
+    session: Optional[Any] = None,
+    journal_dir: Optional[str] = JOURNAL_DIR,
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream Uniswap pool state data (pair hour data) page by page using keyset pagination.
+
+    Each page asks for rows with hourStartUnix greater than the last one seen,
+    so every request costs the same regardless of how far into the range it is.
+
+    :param pool_address: Pool address (string)
+    :param start_timestamp: Start Unix timestamp in seconds
+    :param end_timestamp: End Unix timestamp in seconds
+    :param page_size: Rows per request
+    :param session: Object with a requests-compatible post() (default: the requests module)
+    :param journal_dir: Directory for resumable checkpoint journals (None disables them)
+    :return: Iterator of DataFrames with 'timestamp', 'eth_reserve' and 'usdc_reserve' columns
     """
     url = GRAPH_URL
     pool_address = pool_address.lower()
-    all_data = []
-    skip = 0
-    limit = 1000
+    cursor = start_timestamp - 1
+    journal = open_journal(journal_dir, f"pool-state-{pool_address}-{start_timestamp}-{end_timestamp}")
+    if journal is not None:
+        saved_cursor, saved_rows = journal.load()
+        if saved_cursor is not None:
+            cursor = saved_cursor
+        if saved_rows:
+            yield _pool_state_frame(saved_rows)
 
     while True:
         query = f"""
         {{
-          pairHourDatas(first: {limit}, skip: {skip}, where: {{
+          pairHourDatas(first: {page_size}, orderBy: hourStartUnix, orderDirection: asc, where: {{
             pair: "{pool_address}",
-            hourStartUnix_gte: {start_timestamp},
+            hourStartUnix_gt: {cursor},
             hourStartUnix_lte: {end_timestamp}
           }}) {{
             hourStartUnix
@@ -153,33 +375,56 @@ def fetch_uniswap_pool_state_data(
           }}
         }}
         """
-        try:
-            response = requests.post(url, json={'query': query}, timeout=30)
-            response.raise_for_status()
-        except Exception as e:
-            logging.error("Error fetching pool state data: %s", e)
+        data_chunk = _post_graph_query(
+            session, url, query, "pairHourDatas", f"Pool state query after {cursor}"
+        )
+        if not data_chunk:
+            break  # No more data
+        cursor = int(data_chunk[-1]['hourStartUnix'])
+        if journal is not None:
+            journal.commit(data_chunk, cursor)
+        yield _pool_state_frame(data_chunk)
+        if len(data_chunk) < page_size:
             break
+    if journal is not None:
+        journal.clear()
 
-        try:
-            result = response.json()
-        except Exception as e:
-            logging.error("JSON decode error while fetching pool state: %s", e)
-            break
+def fetch_uniswap_pool_state_data(
+    pool_address: str,
+    start_timestamp: int,
+    end_timestamp: int,
+    session: Optional[Any] = None,
+    store: Optional[PartitionedStore] = None,
+    journal_dir: Optional[str] = JOURNAL_DIR,
+) -> pd.DataFrame:
+    """
+    Fetch Uniswap pool state data (pair hour data) using keyset pagination.
 
-        if "data" not in result or "pairHourDatas" not in result["data"]:
-            logging.error("Unexpected result structure when fetching pool state: %s", result)
-            break
+    With a store, pages are streamed straight into its daily partitions as
+    they arrive and only the requested range is read back.
+    
+    :param pool_address: Pool address (string)
+    :param start_timestamp: Start Unix timestamp in seconds
+    :param end_timestamp: End Unix timestamp in seconds
+    :param session: Object with a requests-compatible post() (default: the requests module)
+    :param store: Local partitioned store; when given, only days missing from it are fetched
+    :param journal_dir: Directory for resumable checkpoint journals (None disables them)
+    :return: DataFrame with pool state data
+    """
+    if store is not None:
+        return store.stream_through(
+            pool_state_cache_key(pool_address),
+            start_timestamp,
+            end_timestamp,
+            lambda start, end: iter_uniswap_pool_state_chunks(
+                pool_address, start, end - 1, session=session, journal_dir=journal_dir
+            ),
+            POOL_STATE_COLUMNS,
+        )
 
-        data_chunk = result["data"]["pairHourDatas"]
-        if not data_chunk:
-            break  # No more data
-        all_data.extend(data_chunk)
-        skip += limit
-
-    df = pd.DataFrame(all_data)
-    if not df.empty:
-        df['timestamp'] = pd.to_datetime(df['hourStartUnix'], unit='s')
-        df['usdc_reserve'] = df['reserve0'].astype(float)
-        df['eth_reserve'] = df['reserve1'].astype(float)
-        df = df[['timestamp', 'eth_reserve', 'usdc_reserve']]
-    return df
+    chunks = list(iter_uniswap_pool_state_chunks(
+        pool_address, start_timestamp, end_timestamp, session=session, journal_dir=journal_dir
+    ))
+    if not chunks:
+        return _pool_state_frame([])
+    return pd.concat(chunks, ignore_index=True)
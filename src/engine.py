@@ -0,0 +1,145 @@
+from typing import Optional
+import numpy as np
+import pandas as pd
+from src.calculations import calc_position_metrics
+from src.config import FEE_RATE, IL_THRESHOLD, ALPHA, INITIAL_ETH, INITIAL_USDC
+
+def add_normalized_columns(df: pd.DataFrame, initial_hold: Optional[float] = None) -> pd.DataFrame:
+    """
+    Normalize LP, holding and investor values relative to the initial holding value.
+
+    :param df: DataFrame with 'V_LP', 'V_hold' and 'investor_portfolio' columns
+    :param initial_hold: Holding value to normalize by (default: the first row's V_hold)
+    :return: The same DataFrame with '*_norm' columns added
+    """
+    if initial_hold is None:
+        initial_hold = df['V_hold'].iloc[0] if len(df) else np.nan
+    df['V_LP_norm'] = df['V_LP'] / initial_hold
+    df['V_hold_norm'] = df['V_hold'] / initial_hold
+    df['investor_portfolio_norm'] = df['investor_portfolio'] / initial_hold
+    return df
+
+class BacktestState:
+    """
+    State carried between consecutive chunks of a backtest.
+
+    Holding it is all that is needed to continue the simulation on the next
+    chunk of prices as if the whole series had been processed at once.
+    """
+
+    __slots__ = ('current_hedge', 'last_price', 'cumulative_cost', 'cumulative_pnl', 'initial_hold')
+
+    def __init__(self):
+        self.current_hedge = 0.0
+        self.last_price = None
+        self.cumulative_cost = 0.0
+        self.cumulative_pnl = 0.0
+        self.initial_hold = None
+
+def compute_backtest_arrays(
+    prices: np.ndarray,
+    alpha: float = ALPHA,
+    il_threshold: float = IL_THRESHOLD,
+    fee_rate: float = FEE_RATE,
+    eth_amount: float = INITIAL_ETH,
+    usdc_amount: float = INITIAL_USDC,
+    state: Optional[BacktestState] = None,
+    position_metrics: Optional[tuple] = None,
+) -> dict:
+    """
+    Run the LP valuation and threshold hedge over a price array in a few array passes.
+
+    The operations mirror the reference loop in src.simulation term by term, so
+    results agree with it to the last bit on the same platform. When a state is
+    passed, the prices are treated as the continuation of the previous chunk and
+    the state is advanced to the end of this one.
+
+    :param prices: 1-D array of ETH prices, one per event
+    :param alpha: Hedge fraction of the LP's ETH exposure
+    :param il_threshold: Impermanent loss threshold (percentage) that triggers the hedge
+    :param fee_rate: Fee rate applied to the notional of each hedge adjustment
+    :param eth_amount: Initial ETH amount of the LP position
+    :param usdc_amount: Initial USDC amount of the LP position
+    :param state: Carried state of a chunked run (default: a fresh run)
+    :param position_metrics: Precomputed (V_LP, V_hold, IL_pct, lp_eth) of these prices, e.g. from a cache
+    :return: Dict of backtest column name -> array
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    if state is None:
+        state = BacktestState()
+
+    # LP Value, Holding Value, Impermanent Loss and the LP's ETH exposure
+    if position_metrics is None:
+        v_lp, v_hold, il_pct, eth_exposure, _ = calc_position_metrics(prices, eth_amount, usdc_amount)
+    else:
+        v_lp, v_hold, il_pct, eth_exposure = position_metrics
+
+    # Desired hedge: short ALPHA of the LP's ETH exposure while IL is above the threshold
+    hedge_desired = np.where(il_pct > il_threshold, -alpha * eth_exposure, 0.0)
+
+    # Immediate execution: the position tracks the desired hedge, fees on each change
+    hedge_position = hedge_desired
+    delta = np.diff(hedge_position, prepend=state.current_hedge)
+    hedge_cost = fee_rate * np.abs(delta) * prices
+    # Prepending the carried total keeps the running sum in the loop's order
+    cumulative_hedge_cost = np.cumsum(np.concatenate(([state.cumulative_cost], hedge_cost)))[1:]
+
+    # Short hedge PnL accrues on the position held over each step
+    step_pnl = np.empty_like(prices)
+    if len(prices):
+        step_pnl[0] = 0.0 if state.last_price is None else -state.current_hedge * (state.last_price - prices[0])
+    step_pnl[1:] = -hedge_position[:-1] * (prices[:-1] - prices[1:])
+    cumulative_hedge_pnl = np.cumsum(np.concatenate(([state.cumulative_pnl], step_pnl)))[1:]
+
+    investor_portfolio = v_lp + cumulative_hedge_pnl - cumulative_hedge_cost
+
+    if len(prices):
+        state.current_hedge = hedge_position[-1]
+        state.last_price = prices[-1]
+        state.cumulative_cost = cumulative_hedge_cost[-1]
+        state.cumulative_pnl = cumulative_hedge_pnl[-1]
+        if state.initial_hold is None:
+            state.initial_hold = v_hold[0]
+
+    return {
+        'V_LP': v_lp,
+        'V_hold': v_hold,
+        'IL_pct': il_pct,
+        'hedge_desired': hedge_desired,
+        'hedge_position': hedge_position.copy(),
+        'hedge_cost': hedge_cost,
+        'cumulative_hedge_cost': cumulative_hedge_cost,
+        'cumulative_hedge_pnl': cumulative_hedge_pnl,
+        'investor_portfolio': investor_portfolio,
+    }
+
+def run_backtest_vectorized(
+    df_merged: pd.DataFrame,
+    alpha: float = ALPHA,
+    il_threshold: float = IL_THRESHOLD,
+    fee_rate: float = FEE_RATE,
+    eth_amount: float = INITIAL_ETH,
+    usdc_amount: float = INITIAL_USDC,
+) -> pd.DataFrame:
+    """
+    Vectorized replacement for src.simulation.run_backtest_loop.
+
+    :param df_merged: DataFrame with 'timestamp' and 'eth_price' columns
+    :param alpha: Hedge fraction of the LP's ETH exposure
+    :param il_threshold: Impermanent loss threshold (percentage) that triggers the hedge
+    :param fee_rate: Fee rate applied to the notional of each hedge adjustment
+    :param eth_amount: Initial ETH amount of the LP position
+    :param usdc_amount: Initial USDC amount of the LP position
+    :return: The same DataFrame with backtest columns added
+    """
+    columns = compute_backtest_arrays(
+        df_merged['eth_price'].to_numpy(dtype=np.float64),
+        alpha=alpha,
+        il_threshold=il_threshold,
+        fee_rate=fee_rate,
+        eth_amount=eth_amount,
+        usdc_amount=usdc_amount,
+    )
+    for name, values in columns.items():
+        df_merged[name] = values
+    return add_normalized_columns(df_merged)
@@ -0,0 +1,181 @@
+import argparse
+import logging
+import time
+from typing import Optional
+import numpy as np
+from src.columnar import iter_dataset
+from src.calculations import calc_position_metrics
+from src.config import FEE_RATE, IL_THRESHOLD, ALPHA, INITIAL_ETH, INITIAL_USDC
+
+class HedgeEngine:
+    """
+    Stateful threshold hedge that makes one decision per price tick.
+
+    on_price applies the same rules as the batch engine in src.engine:
+    short ALPHA * sqrt(K / P) ETH while IL% is above the threshold, pay
+    FEE_RATE on the notional of every position change and accrue PnL on
+    the position held since the previous tick. Each tick is O(1) and
+    allocates no arrays or frames.
+    """
+
+    __slots__ = (
+        'alpha', 'il_threshold', 'fee_rate', 'eth_amount', 'usdc_amount',
+        'current_hedge', 'last_price', 'last_ts',
+        'cumulative_cost', 'cumulative_pnl', 'lp_value', 'portfolio', 'ticks',
+    )
+
+    def __init__(
+        self,
+        alpha: float = ALPHA,
+        il_threshold: float = IL_THRESHOLD,
+        fee_rate: float = FEE_RATE,
+        eth_amount: float = INITIAL_ETH,
+        usdc_amount: float = INITIAL_USDC,
+    ):
+        """
+        :param alpha: Hedge fraction of the LP's ETH exposure
+        :param il_threshold: Impermanent loss threshold (percentage) that triggers the hedge
+        :param fee_rate: Fee rate applied to the notional of each hedge adjustment
+        :param eth_amount: Initial ETH amount of the LP position
+        :param usdc_amount: Initial USDC amount of the LP position
+        """
+        self.alpha = alpha
+        self.il_threshold = il_threshold
+        self.fee_rate = fee_rate
+        self.eth_amount = eth_amount
+        self.usdc_amount = usdc_amount
+        self.current_hedge = 0.0
+        self.last_price = None
+        self.last_ts = None
+        self.cumulative_cost = 0.0
+        self.cumulative_pnl = 0.0
+        self.lp_value = 0.0
+        self.portfolio = 0.0
+        self.ticks = 0
+
+    def on_price(self, ts, price: float) -> float:
+        """
+        Process one price tick.
+
+        :param ts: Tick timestamp (stored as last_ts, not used in the decision)
+        :param price: Current ETH price
+        :return: Order delta in ETH (negative sells / adds to the short, 0.0 for no order)
+        """
+        lp_val, _, il_pct, lp_eth, _ = calc_position_metrics(price, self.eth_amount, self.usdc_amount)
+
+        # PnL on the position held since the previous tick
+        if self.last_price is not None:
+            self.cumulative_pnl += -self.current_hedge * (self.last_price - price)
+
+        if il_pct > self.il_threshold:
+            desired = -self.alpha * lp_eth
+        else:
+            desired = 0.0
+        delta = desired - self.current_hedge
+        self.cumulative_cost += self.fee_rate * abs(delta) * price
+
+        self.current_hedge = desired
+        self.last_price = price
+        self.last_ts = ts
+        self.lp_value = lp_val
+        self.portfolio = lp_val + self.cumulative_pnl - self.cumulative_cost
+        self.ticks += 1
+        return delta
+
+def replay(
+    path: str,
+    engine: Optional[HedgeEngine] = None,
+    price_column: str = 'eth_price',
+    chunk_rows: int = 1_000_000,
+    record: bool = False,
+) -> dict:
+    """
+    Push a stored price series through a HedgeEngine as fast as possible.
+
+    Each on_price call is timed individually; latencies are summarized as
+    percentiles and a power-of-two histogram.
+
+    :param path: Columnar dataset with 'timestamp' and price_column columns
+    :param engine: Engine to drive (default: one with the configured parameters)
+    :param price_column: Price column ('eth_price' for merged data, 'close' for candles)
+    :param chunk_rows: Rows read from disk at a time
+    :param record: Also return per-tick hedge_position, cumulative cost/PnL and portfolio arrays
+    :return: Report dict with ticks, seconds, ticks_per_sec, latency stats and final state
+    """
+    if engine is None:
+        engine = HedgeEngine()
+    on_price = engine.on_price
+    perf_counter_ns = time.perf_counter_ns
+    latencies = []
+    recorded = {name: [] for name in ('hedge_position', 'cumulative_hedge_cost',
+                                      'cumulative_hedge_pnl', 'investor_portfolio')}
+
+    start = time.perf_counter()
+    for df_chunk in iter_dataset(path, columns=['timestamp', price_column], chunk_rows=chunk_rows):
+        timestamps = df_chunk['timestamp'].to_numpy()
+        prices = df_chunk[price_column].to_numpy(dtype=np.float64).tolist()
+        chunk_latency = np.empty(len(prices), dtype=np.int64)
+        if record:
+            position, cost, pnl, portfolio = (np.empty(len(prices)) for _ in range(4))
+        for i, price in enumerate(prices):
+            t0 = perf_counter_ns()
+            on_price(timestamps[i], price)
+            chunk_latency[i] = perf_counter_ns() - t0
+            if record:
+                position[i] = engine.current_hedge
+                cost[i] = engine.cumulative_cost
+                pnl[i] = engine.cumulative_pnl
+                portfolio[i] = engine.portfolio
+        latencies.append(chunk_latency)
+        if record:
+            for name, values in zip(recorded, (position, cost, pnl, portfolio)):
+                recorded[name].append(values)
+    elapsed = time.perf_counter() - start
+
+    latency = np.concatenate(latencies) if latencies else np.zeros(0, dtype=np.int64)
+    # Bucket b counts latencies in [2**(b-1), 2**b) nanoseconds
+    buckets = np.bincount(np.ceil(np.log2(np.maximum(latency, 1) + 1)).astype(np.int64)) if len(latency) else []
+    report = {
+        'ticks': int(len(latency)),
+        'seconds': elapsed,
+        'ticks_per_sec': len(latency) / elapsed if elapsed else 0.0,
+        'latency_ns': {
+            'p50': float(np.percentile(latency, 50)) if len(latency) else 0.0,
+            'p99': float(np.percentile(latency, 99)) if len(latency) else 0.0,
+            'max': int(latency.max()) if len(latency) else 0,
+        },
+        'latency_histogram_ns': {f"<{2 ** b}": int(count) for b, count in enumerate(buckets) if count},
+        'final_hedge': engine.current_hedge,
+        'cumulative_hedge_cost': engine.cumulative_cost,
+        'cumulative_hedge_pnl': engine.cumulative_pnl,
+        'investor_portfolio': engine.portfolio,
+    }
+    if record:
+        report['series'] = {name: np.concatenate(parts) if parts else np.zeros(0)
+                            for name, parts in recorded.items()}
+    return report
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay a stored price dataset through the HedgeEngine.")
+    parser.add_argument('path', help="Columnar dataset, e.g. data/backtest_results")
+    parser.add_argument('--price-column', default='eth_price')
+    parser.add_argument('--alpha', type=float, default=ALPHA)
+    parser.add_argument('--il-threshold', type=float, default=IL_THRESHOLD)
+    parser.add_argument('--fee-rate', type=float, default=FEE_RATE)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
+
+    report = replay(args.path, HedgeEngine(args.alpha, args.il_threshold, args.fee_rate),
+                    price_column=args.price_column)
+    logging.info("Replayed %d ticks in %.2fs (%.0f ticks/sec)",
+                 report['ticks'], report['seconds'], report['ticks_per_sec'])
+    logging.info("Decision latency ns: p50 %.0f, p99 %.0f, max %d",
+                 report['latency_ns']['p50'], report['latency_ns']['p99'], report['latency_ns']['max'])
+    for bucket, count in report['latency_histogram_ns'].items():
+        logging.info("  %10s ns: %d", bucket, count)
+    logging.info("Final hedge %.6f ETH, cost %.2f, PnL %.2f, portfolio %.2f",
+                 report['final_hedge'], report['cumulative_hedge_cost'],
+                 report['cumulative_hedge_pnl'], report['investor_portfolio'])
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+import threading
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import requests
+
+class RateLimiter:
+    """
+    Thread-safe limiter spacing calls at least 1 / rate seconds apart.
+
+    A single instance is shared by all workers so the limit is global.
+    """
+
+    def __init__(self, rate: float):
+        """
+        :param rate: Maximum number of calls per second (0 or less disables limiting)
+        """
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self) -> None:
+        """
+        Block until the caller may issue its next request.
+        """
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+def make_session(pool_size: int) -> 'requests.Session':
+    """
+    Create a requests session that keeps up to pool_size keep-alive connections per host.
+
+    :param pool_size: Connection pool size (match the number of concurrent workers)
+    :return: Configured session
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
@@ -0,0 +1,165 @@
+import json
+import logging
+from typing import Dict, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from src.calculations import calc_position_metrics
+from src.config import FEE_RATE, IL_THRESHOLD, ALPHA, INITIAL_ETH, INITIAL_USDC
+
+def unit_hedge_paths(
+    prices: np.ndarray, il_pct: np.ndarray, lp_eth: np.ndarray, il_threshold: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Cumulative hedge PnL and traded notional of the ALPHA = 1 hedge.
+
+    The trigger mask depends only on price and threshold, so for any alpha
+    the hedge PnL is alpha * unit_pnl and the fees are alpha * fee_rate *
+    unit_turnover.
+
+    :param prices: 1-D array of ETH prices
+    :param il_pct: Impermanent loss (percentage) per price
+    :param lp_eth: ETH held by the LP per price
+    :param il_threshold: Impermanent loss threshold (percentage)
+    :return: (unit_pnl, unit_turnover), running totals per event
+    """
+    unit_position = np.where(il_pct > il_threshold, -lp_eth, 0.0)
+    unit_turnover = np.cumsum(np.abs(np.diff(unit_position, prepend=0.0)) * prices)
+    step_pnl = np.zeros_like(prices)
+    step_pnl[1:] = -unit_position[:-1] * (prices[:-1] - prices[1:])
+    return np.cumsum(step_pnl), unit_turnover
+
+class IncrementalEvaluator:
+    """
+    Price (alpha, fee_rate) scenarios in O(1) from per-threshold unit-alpha totals.
+
+    Valuation runs once per price series and each threshold costs one O(n)
+    pass the first time it is used; after that any alpha and fee rate are
+    priced with a few multiplications. Results equal the full backtest up to
+    floating-point rounding (the engine scales before summing, this sums
+    first). With keep_series=True the unit paths are kept, so full equity
+    curves can be rebuilt without rerunning the hedge.
+    """
+
+    def __init__(
+        self,
+        prices: np.ndarray,
+        eth_amount: float = INITIAL_ETH,
+        usdc_amount: float = INITIAL_USDC,
+        keep_series: bool = False,
+    ):
+        """
+        :param prices: 1-D array of ETH prices (e.g. df_merged['eth_price'])
+        :param eth_amount: Initial ETH amount of the LP position
+        :param usdc_amount: Initial USDC amount of the LP position
+        :param keep_series: Keep per-threshold unit paths for curve()
+        """
+        self.prices = np.ascontiguousarray(prices, dtype=np.float64)
+        if not len(self.prices):
+            raise ValueError("Empty price series")
+        self.v_lp, v_hold, self.il_pct, self.lp_eth, _ = calc_position_metrics(self.prices, eth_amount, usdc_amount)
+        self.final_v_lp = float(self.v_lp[-1])
+        self.initial_hold = float(v_hold[0])
+        self.keep_series = keep_series
+        # threshold -> (final unit PnL, final unit turnover)
+        self.totals: Dict[float, Tuple[float, float]] = {}
+        self.series: Dict[float, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def prepare(self, il_thresholds: Sequence[float]) -> None:
+        """
+        Precompute the unit-alpha totals of several thresholds.
+        """
+        for threshold in il_thresholds:
+            self._unit(float(threshold))
+
+    def _unit(self, il_threshold: float) -> Tuple[float, float]:
+        totals = self.totals.get(il_threshold)
+        if totals is None:
+            if self.prices is None:
+                raise KeyError(f"IL threshold {il_threshold} was not prepared before saving")
+            unit_pnl, unit_turnover = unit_hedge_paths(self.prices, self.il_pct, self.lp_eth, il_threshold)
+            totals = self.totals[il_threshold] = (float(unit_pnl[-1]), float(unit_turnover[-1]))
+            if self.keep_series:
+                self.series[il_threshold] = (unit_pnl, unit_turnover)
+            logging.debug("Prepared unit hedge paths for IL threshold %s", il_threshold)
+        return totals
+
+    def evaluate(self, alpha: float = ALPHA, il_threshold: float = IL_THRESHOLD, fee_rate: float = FEE_RATE) -> dict:
+        """
+        Final results of one scenario.
+
+        :param alpha: Hedge fraction of the LP's ETH exposure
+        :param il_threshold: Impermanent loss threshold (percentage)
+        :param fee_rate: Fee rate applied to the notional of each hedge adjustment
+        :return: Dict with final_value_norm, total_hedge_cost and hedge_pnl
+        """
+        unit_pnl, unit_turnover = self._unit(float(il_threshold))
+        hedge_pnl = alpha * unit_pnl
+        hedge_cost = alpha * fee_rate * unit_turnover
+        return {
+            'final_value_norm': (self.final_v_lp + hedge_pnl - hedge_cost) / self.initial_hold,
+            'total_hedge_cost': hedge_cost,
+            'hedge_pnl': hedge_pnl,
+        }
+
+    def evaluate_grid(
+        self, alphas: Sequence[float], il_thresholds: Sequence[float], fee_rates: Sequence[float]
+    ) -> pd.DataFrame:
+        """
+        Evaluate a full ALPHA x IL_THRESHOLD x FEE_RATE grid with broadcasting.
+
+        :return: Tidy DataFrame with one row per combination, sorted like run_parameter_sweep
+        """
+        self.prepare(il_thresholds)
+        alpha, threshold, fee = (a.ravel() for a in np.meshgrid(
+            np.asarray(alphas, dtype=float), np.asarray(il_thresholds, dtype=float),
+            np.asarray(fee_rates, dtype=float), indexing='ij'))
+        totals = np.array([self.totals[t] for t in threshold.tolist()]).reshape(-1, 2)
+        hedge_pnl = alpha * totals[:, 0]
+        hedge_cost = alpha * fee * totals[:, 1]
+        return pd.DataFrame({
+            'alpha': alpha,
+            'il_threshold': threshold,
+            'fee_rate': fee,
+            'final_value_norm': (self.final_v_lp + hedge_pnl - hedge_cost) / self.initial_hold,
+            'total_hedge_cost': hedge_cost,
+            'hedge_pnl': hedge_pnl,
+        }).sort_values(['alpha', 'il_threshold', 'fee_rate'], ignore_index=True)
+
+    def curve(self, alpha: float = ALPHA, il_threshold: float = IL_THRESHOLD, fee_rate: float = FEE_RATE) -> np.ndarray:
+        """
+        Investor portfolio value per event, rebuilt from the stored unit paths in one O(n) pass.
+
+        :return: Array like the engine's investor_portfolio column
+        """
+        if not self.keep_series:
+            raise ValueError("curve() needs an evaluator built with keep_series=True")
+        self._unit(float(il_threshold))
+        unit_pnl, unit_turnover = self.series[float(il_threshold)]
+        return self.v_lp + alpha * unit_pnl - (alpha * fee_rate) * unit_turnover
+
+    def save(self, path: str) -> None:
+        """
+        Store the prepared unit-alpha totals as JSON; load() evaluates them without the prices.
+        """
+        with open(path, 'w') as f:
+            json.dump({
+                'final_v_lp': self.final_v_lp,
+                'initial_hold': self.initial_hold,
+                'thresholds': [[t, pnl, turnover] for t, (pnl, turnover) in sorted(self.totals.items())],
+            }, f, indent=2)
+
+    @classmethod
+    def load(cls, path: str) -> 'IncrementalEvaluator':
+        """
+        :return: An evaluator of the saved thresholds (new thresholds and curve() need the prices)
+        """
+        with open(path) as f:
+            data = json.load(f)
+        evaluator = cls.__new__(cls)
+        evaluator.prices = evaluator.v_lp = evaluator.il_pct = evaluator.lp_eth = None
+        evaluator.final_v_lp = data['final_v_lp']
+        evaluator.initial_hold = data['initial_hold']
+        evaluator.keep_series = False
+        evaluator.totals = {t: (pnl, turnover) for t, pnl, turnover in data['thresholds']}
+        evaluator.series = {}
+        return evaluator
@@ -1,13 +1,84 @@
+import argparse
 import logging
+import os
+from typing import Optional, Sequence
+from src.batch import load_job_file, run_jobs
+from src.profiling import StageProfiler, set_profiler
 from src.simulation import simulate_backtest
+from src.stages import simulate_backtest_cached
 
-def main() -> None:
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Backtest the impermanent loss hedging strategy.")
+    parser.add_argument('--engine', choices=['vectorized', 'loop'], default='vectorized',
+                        help="Backtest engine (default: vectorized)")
+    parser.add_argument('--jobs', default=None,
+                        help="Run the backtests of a JSON job file in this process instead (see src.batch)")
+    parser.add_argument('--stage-cache', action='store_true',
+                        help="Run as cached stages so only stages whose inputs or parameters changed are recomputed")
+    parser.add_argument('--timeframe', default=None,
+                        help="Price granularity (e.g. 1m, 5m, 1h) from the local candle pyramid; "
+                             "only new 1m candles are fetched")
+    parser.add_argument('--fee-income', action='store_true',
+                        help="Credit the LP's share of the swap fees, rebuilt from the swaps and hourly reserves")
+    parser.add_argument('--plot-path', default=None,
+                        help="Render the charts to this PNG/SVG file instead of opening a window")
+    parser.add_argument('--profile-report', default=None,
+                        help="Write a JSON report with per-stage timings, memory, rows and HTTP traffic")
+    parser.add_argument('--cprofile-stage', default=None,
+                        help="Also run this stage (e.g. merge, simulate, plot) under cProfile")
+    args = parser.parse_args(argv)
+    if args.jobs:
+        # Each job sets its own source, timeframe and outputs in the job file
+        ignored = [flag for flag, value in (('--timeframe', args.timeframe), ('--stage-cache', args.stage_cache),
+                                            ('--plot-path', args.plot_path), ('--engine', args.engine != 'vectorized'),
+                                            ('--fee-income', args.fee_income))
+                   if value]
+        if ignored:
+            parser.error(f"{', '.join(ignored)} cannot be combined with --jobs; set them per job in the job file")
+    if args.stage_cache:
+        # The stages always run the vectorized engine
+        unsupported = [flag for flag, value in (('--engine', args.engine != 'vectorized'),
+                                                ('--fee-income', args.fee_income)) if value]
+        if unsupported:
+            parser.error(f"{', '.join(unsupported)} cannot be combined with --stage-cache")
+    return args
+
+def cprofile_path(report_path: str, stage: str) -> str:
+    """
+    :return: Path of the cProfile dump next to the report, e.g. report.json -> report.simulate.prof
+    """
+    return f"{os.path.splitext(report_path)[0]}.{stage}.prof"
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """
+    :return: Process exit status: 1 if the run or any batch job failed
+    """
+    args = parse_args(argv)
     logging.basicConfig(level=logging.INFO, 
                         format='%(asctime)s [%(levelname)s] %(message)s')
+    profiler = None
+    if args.profile_report or args.cprofile_stage:
+        report_path = args.profile_report or 'data/profile_report.json'
+        profiler = StageProfiler(args.cprofile_stage, cprofile_path(report_path, args.cprofile_stage))
+        set_profiler(profiler)
+    status = 0
     try:
-        simulate_backtest()
+        if args.jobs:
+            summary = run_jobs(load_job_file(args.jobs))
+            status = int((summary['status'] != 'ok').any())
+        elif args.stage_cache:
+            simulate_backtest_cached(plot_path=args.plot_path, timeframe=args.timeframe)
+        else:
+            simulate_backtest(engine=args.engine, plot_path=args.plot_path, timeframe=args.timeframe,
+                              fee_income=args.fee_income)
     except Exception as e:
         logging.exception("An error occurred during simulation: %s", e)
+        status = 1
+    finally:
+        if profiler is not None:
+            profiler.write_report(report_path)
+            set_profiler(None)
+    return status
 
 if __name__ == '__main__':
-    main()
+    raise SystemExit(main())
@@ -0,0 +1,261 @@
+import logging
+from typing import Dict, Iterable, Mapping, Optional, Tuple, Union
+import numpy as np
+import pandas as pd
+from src.alignment import to_epoch_ns
+
+Chunk = Union[pd.DataFrame, Mapping[str, np.ndarray]]
+
+def _column(chunk: Chunk, name: str) -> np.ndarray:
+    return np.asarray(chunk[name], dtype=np.float64)
+
+class RunningMoments:
+    """
+    Count, mean and variance of a stream, merged chunk by chunk.
+
+    Each chunk's moments are combined with the running ones with Chan's
+    parallel form of Welford's update, which is the per-row rule applied to
+    a whole chunk at once and stays numerically stable over long streams.
+    Works on 1-D chunks, or on (paths x steps) chunks with one set of
+    moments per path.
+    """
+
+    __slots__ = ('n', 'mean', 'm2')
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, x: np.ndarray) -> None:
+        """
+        :param x: New values; for 2-D input the last axis is time
+        """
+        x = np.asarray(x, dtype=np.float64)
+        n_b = x.shape[-1]
+        if n_b == 0:
+            return
+        mean_b = x.mean(axis=-1)
+        m2_b = ((x - mean_b[..., None] if x.ndim > 1 else x - mean_b) ** 2).sum(axis=-1)
+        n = self.n + n_b
+        delta = mean_b - self.mean
+        self.mean = self.mean + delta * (n_b / n)
+        self.m2 = self.m2 + m2_b + delta ** 2 * (self.n * n_b / n)
+        self.n = n
+
+    def variance(self, ddof: int = 1):
+        return self.m2 / (self.n - ddof) if self.n > ddof else np.nan * np.ones_like(self.mean)
+
+    def std(self, ddof: int = 1):
+        return np.sqrt(self.variance(ddof))
+
+class RollingWindow:
+    """
+    Mean and standard deviation over the last `window` values, chunk by chunk.
+
+    Only the last window - 1 values are carried between chunks; each chunk
+    is handled with windowed differences of running sums over the carried
+    tail plus the chunk, so the cost is O(1) amortized per row. Values are
+    shifted by a reference point before summing to limit cancellation.
+    """
+
+    __slots__ = ('window', 'tail', 'shift')
+
+    def __init__(self, window: int):
+        """
+        :param window: Number of values per window (>= 2)
+        """
+        if window < 2:
+            raise ValueError("window must be at least 2")
+        self.window = window
+        self.tail = np.empty(0)
+        self.shift = None
+
+    def update(self, x: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        :param x: Next values of the series
+        :return: (mean, std with ddof=1) of the window ending at each value; NaN until a window is full
+        """
+        x = np.asarray(x, dtype=np.float64)
+        if not len(x):
+            return np.empty(0), np.empty(0)
+        if self.shift is None:
+            self.shift = x[0]
+        values = np.concatenate([self.tail, x]) - self.shift
+        s1 = np.concatenate([[0.0], np.cumsum(values)])
+        s2 = np.concatenate([[0.0], np.cumsum(values * values)])
+        w = self.window
+        ends = np.arange(len(self.tail) + 1, len(values) + 1)
+        full = ends >= w
+        mean = np.full(len(x), np.nan)
+        std = np.full(len(x), np.nan)
+        e = ends[full]
+        sum1 = s1[e] - s1[e - w]
+        sum2 = s2[e] - s2[e - w]
+        mean[full] = sum1 / w + self.shift
+        std[full] = np.sqrt(np.maximum(sum2 - sum1 * sum1 / w, 0.0) / (w - 1))
+        self.tail = values[-(w - 1):] + self.shift
+        return mean, std
+
+class MetricsAccumulator:
+    """
+    Performance metrics of a backtest, accumulated in one pass over its output.
+
+    Feed it the engine's result columns chunk by chunk (or all at once):
+    investor_portfolio is required; hedge_position, eth_price,
+    cumulative_hedge_cost, cumulative_hedge_pnl, V_hold and timestamp are
+    used when present. Only O(1) state is kept (plus the rolling windows'
+    tails), so it suits the streaming backtest, sweeps and Monte Carlo runs.
+    """
+
+    def __init__(self, periods_per_year: Optional[float] = None, rolling_window: Optional[int] = None):
+        """
+        :param periods_per_year: Annualize Sharpe/Sortino/volatility by this many return periods (default: per event)
+        :param rolling_window: Also return rolling volatility and Sharpe over this many returns from update()
+        """
+        self.periods_per_year = periods_per_year
+        self.returns = RunningMoments()
+        self.downside_sq = 0.0
+        self.rolling = RollingWindow(rolling_window) if rolling_window else None
+        self.rows = 0
+        self.first_value = None
+        self.initial_hold = None
+        self.last_value = None
+        self.peak = -np.inf
+        self.max_drawdown = 0.0
+        self.last_hedge = 0.0
+        self.last_price = None
+        self.turnover = 0.0
+        self.hedged_rows = 0
+        self.hedged_steps = 0
+        self.winning_steps = 0
+        self.hedged_time = 0.0
+        self.total_time = 0.0
+        self.last_ts = None
+        self.hedge_cost = 0.0
+        self.hedge_pnl = 0.0
+
+    def update(self, chunk: Chunk) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Add the next rows of backtest output.
+
+        :param chunk: DataFrame or dict of arrays with the engine's column names
+        :return: Rolling 'rolling_volatility' and 'rolling_sharpe' per row when a rolling window is set
+        """
+        portfolio = _column(chunk, 'investor_portfolio')
+        n = len(portfolio)
+        if n == 0:
+            return None
+        if self.first_value is None:
+            self.first_value = portfolio[0]
+            self.initial_hold = _column(chunk, 'V_hold')[0] if 'V_hold' in chunk else portfolio[0]
+
+        previous = np.concatenate([[self.last_value], portfolio[:-1]]) if self.last_value is not None else None
+        returns = portfolio[1:] / portfolio[:-1] - 1 if previous is None else portfolio / previous - 1
+        self.returns.update(returns)
+        self.downside_sq += float(np.sum(np.minimum(returns, 0.0) ** 2))
+
+        running_peak = np.maximum.accumulate(np.concatenate([[self.peak], portfolio]))[1:]
+        self.max_drawdown = max(self.max_drawdown, float(np.max((running_peak - portfolio) / running_peak)))
+        self.peak = running_peak[-1]
+        self.last_value = portfolio[-1]
+
+        if 'hedge_position' in chunk:
+            position = _column(chunk, 'hedge_position')
+            hedged = position != 0
+            self.hedged_rows += int(hedged.sum())
+            held = np.concatenate([[self.last_hedge], position[:-1]])
+            if 'eth_price' in chunk:
+                prices = _column(chunk, 'eth_price')
+                self.turnover += float(np.sum(np.abs(np.diff(position, prepend=self.last_hedge)) * prices))
+                last_price = np.nan if self.last_price is None else self.last_price
+                step_pnl = -held * (np.concatenate([[last_price], prices[:-1]]) - prices)
+                over = held != 0
+                if self.last_price is None:
+                    over[0] = False
+                self.hedged_steps += int(over.sum())
+                self.winning_steps += int((step_pnl[over] > 0).sum())
+                self.last_price = prices[-1]
+            if 'timestamp' in chunk:
+                ts = to_epoch_ns(chunk['timestamp'])
+                start = ts[0] if self.last_ts is None else self.last_ts
+                dt = np.diff(ts, prepend=start).astype(np.float64)
+                self.total_time += float(dt.sum())
+                self.hedged_time += float(dt[held != 0].sum())
+                self.last_ts = ts[-1]
+            self.last_hedge = position[-1]
+        if 'cumulative_hedge_cost' in chunk:
+            self.hedge_cost = float(_column(chunk, 'cumulative_hedge_cost')[-1])
+        if 'cumulative_hedge_pnl' in chunk:
+            self.hedge_pnl = float(_column(chunk, 'cumulative_hedge_pnl')[-1])
+        self.rows += n
+
+        if self.rolling is None:
+            return None
+        row_returns = returns if previous is not None else np.concatenate([[np.nan], returns])
+        valid = ~np.isnan(row_returns)
+        mean, std = np.full(n, np.nan), np.full(n, np.nan)
+        mean[valid], std[valid] = self.rolling.update(row_returns[valid])
+        scale = np.sqrt(self.periods_per_year) if self.periods_per_year else 1.0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return {'rolling_volatility': std * scale, 'rolling_sharpe': mean / std * scale}
+
+    def result(self) -> dict:
+        """
+        :return: Metrics of everything seen so far
+        """
+        if self.rows == 0:
+            raise ValueError("No rows were added")
+        scale = np.sqrt(self.periods_per_year) if self.periods_per_year else 1.0
+        volatility = float(self.returns.std())
+        n_returns = self.returns.n
+        downside = float(np.sqrt(self.downside_sq / n_returns)) if n_returns else np.nan
+        mean = float(self.returns.mean) if n_returns else np.nan
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sharpe = mean / volatility * scale if volatility else np.nan
+            sortino = mean / downside * scale if downside else np.nan
+        return {
+            'rows': self.rows,
+            'final_value': float(self.last_value),
+            'final_value_norm': float(self.last_value / self.initial_hold),
+            'total_return': float(self.last_value / self.first_value - 1),
+            'cumulative_hedge_pnl': self.hedge_pnl,
+            'total_hedge_cost': self.hedge_cost,
+            'volatility': volatility * scale,
+            'sharpe': sharpe,
+            'sortino': sortino,
+            'max_drawdown': self.max_drawdown,
+            'turnover': self.turnover,
+            'hit_rate': self.winning_steps / self.hedged_steps if self.hedged_steps else np.nan,
+            'time_hedged': self.hedged_rows / self.rows,
+            'time_hedged_duration': self.hedged_time / self.total_time if self.total_time else np.nan,
+        }
+
+def compute_metrics(
+    chunks: Union[Chunk, Iterable[Chunk]],
+    periods_per_year: Optional[float] = None,
+) -> dict:
+    """
+    Metrics of a backtest result, given whole or as an iterable of chunks.
+
+    :param chunks: A results DataFrame / dict of arrays, or an iterable of them (e.g. iter_dataset(...))
+    :param periods_per_year: Annualization factor for volatility, Sharpe and Sortino
+    :return: MetricsAccumulator.result()
+    """
+    accumulator = MetricsAccumulator(periods_per_year)
+    if isinstance(chunks, (pd.DataFrame, Mapping)):
+        chunks = [chunks]
+    for chunk in chunks:
+        accumulator.update(chunk)
+    return accumulator.result()
+
+def log_metrics(metrics: dict) -> None:
+    """
+    Log the comparative metrics listed in the README.
+    """
+    logging.info("Final value %.2f (%.4f of holding), hedge PnL %.2f, hedge costs %.2f, volatility %.6f",
+                 metrics['final_value'], metrics['final_value_norm'], metrics['cumulative_hedge_pnl'],
+                 metrics['total_hedge_cost'], metrics['volatility'])
+    logging.info("Sharpe %.4f, Sortino %.4f, max drawdown %.2f%%, turnover %.2f, hit rate %.2f%%, time hedged %.2f%%",
+                 metrics['sharpe'], metrics['sortino'], 100 * metrics['max_drawdown'], metrics['turnover'],
+                 100 * metrics['hit_rate'], 100 * metrics['time_hedged'])
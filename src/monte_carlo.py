@@ -0,0 +1,214 @@
+import argparse
+import logging
+from typing import Iterator, Optional, Sequence
+import numpy as np
+import pandas as pd
+from src.calculations import calc_position_metrics
+from src.columnar import read_dataset, write_dataset
+from src.metrics import RunningMoments
+from src.synthetic import bootstrap_log_returns, gbm_log_returns, jump_diffusion_log_returns
+from src.config import FEE_RATE, IL_THRESHOLD, ALPHA, INITIAL_ETH, INITIAL_USDC
+
+MODELS = ('gbm', 'bootstrap', 'jump')
+# Memory budget for one (paths x steps) chunk including all temporaries
+MC_BLOCK_BYTES = 512 * 1024 * 1024
+# float64 (paths x steps) arrays alive at once while a chunk is simulated
+MC_TEMPORARIES = 14
+STEPS_PER_YEAR_15M = 365 * 96
+
+def chunk_steps_for(n_paths: int, block_bytes: int = MC_BLOCK_BYTES) -> int:
+    """
+    Time steps per chunk that keep a chunk of n_paths paths within block_bytes.
+    """
+    return max(1, block_bytes // (8 * MC_TEMPORARIES * max(1, n_paths)))
+
+def iter_price_paths(
+    n_paths: int,
+    n_steps: int,
+    model: str = 'gbm',
+    seed: int = 0,
+    start_price: Optional[float] = None,
+    dt_seconds: float = 900.0,
+    chunk_steps: Optional[int] = None,
+    returns: Optional[np.ndarray] = None,
+    **model_params,
+) -> Iterator[np.ndarray]:
+    """
+    Generate synthetic ETH price paths in time chunks.
+
+    The first chunk starts with a column of start_price (the LP entry), so a
+    run has n_steps + 1 prices per path. Output is deterministic for a given
+    seed and chunk_steps.
+
+    :param n_paths: Number of paths
+    :param n_steps: Number of returns per path
+    :param model: 'gbm', 'bootstrap' (block bootstrap of `returns`) or 'jump' (Merton jump-diffusion)
+    :param seed: Random seed
+    :param start_price: Entry price (default: the pool price of INITIAL_USDC / INITIAL_ETH)
+    :param dt_seconds: Step length in seconds (default 15m)
+    :param chunk_steps: Steps per chunk (default: sized by MC_BLOCK_BYTES)
+    :param returns: Historical log returns, required for 'bootstrap'
+    :param model_params: Extra keyword arguments of the src.synthetic generator
+    :return: Iterator of float64 arrays shaped (n_paths, steps_in_chunk)
+    """
+    if model not in MODELS:
+        raise ValueError(f"Unknown model {model!r}, expected one of {MODELS}")
+    if model == 'bootstrap' and returns is None:
+        raise ValueError("The bootstrap model needs historical returns")
+    rng = np.random.default_rng(seed)
+    chunk_steps = chunk_steps or chunk_steps_for(n_paths)
+    log_price = np.full(n_paths, np.log(start_price or INITIAL_USDC / INITIAL_ETH))
+    first = True
+    for start in range(0, n_steps, chunk_steps):
+        steps = min(chunk_steps, n_steps - start)
+        if model == 'gbm':
+            log_returns = gbm_log_returns(steps, n_paths, dt_seconds, rng=rng, **model_params)
+        elif model == 'jump':
+            log_returns = jump_diffusion_log_returns(steps, n_paths, dt_seconds, rng=rng, **model_params)
+        else:
+            log_returns = bootstrap_log_returns(returns, steps, n_paths, rng=rng, **model_params)
+        if first:
+            log_returns = np.concatenate([np.zeros((n_paths, 1)), log_returns], axis=1)
+            first = False
+        np.cumsum(log_returns, axis=1, out=log_returns)
+        log_returns += log_price[:, None]
+        log_price = log_returns[:, -1].copy()
+        yield np.exp(log_returns, out=log_returns)
+
+def run_monte_carlo(
+    chunks: Iterator[np.ndarray],
+    alpha: float = ALPHA,
+    il_threshold: float = IL_THRESHOLD,
+    fee_rate: float = FEE_RATE,
+    eth_amount: float = INITIAL_ETH,
+    usdc_amount: float = INITIAL_USDC,
+) -> pd.DataFrame:
+    """
+    Run the LP valuation and threshold hedge on many price paths at once.
+
+    Each chunk is a (paths x steps) matrix processed with the same array
+    operations as src.engine.compute_backtest_arrays along the time axis;
+    per-path hedge, last price, cumulative cost and PnL, running peak, max
+    drawdown and return moments are carried between chunks, so memory
+    depends on the chunk size only and each path's result equals a single-path backtest.
+
+    :param chunks: Price matrices in time order (e.g. from iter_price_paths)
+    :param alpha: Hedge fraction of the LP's ETH exposure
+    :param il_threshold: Impermanent loss threshold (percentage) that triggers the hedge
+    :param fee_rate: Fee rate applied to the notional of each hedge adjustment
+    :param eth_amount: Initial ETH amount of the LP position
+    :param usdc_amount: Initial USDC amount of the LP position
+    :return: One row per path: final_price, final_value_norm, lp_value_norm,
+        max_drawdown, volatility (ddof=1 std of per-step portfolio returns),
+        total_hedge_cost, hedge_pnl, time_hedged
+    """
+    current_hedge = last_price = cumulative_cost = cumulative_pnl = None
+    initial_hold = peak = max_drawdown = hedged_steps = None
+    steps = 0
+    moments = RunningMoments()
+    for prices in chunks:
+        n_paths = prices.shape[0]
+        if current_hedge is None:
+            current_hedge = np.zeros(n_paths)
+            cumulative_cost = np.zeros(n_paths)
+            cumulative_pnl = np.zeros(n_paths)
+            max_drawdown = np.zeros(n_paths)
+            hedged_steps = np.zeros(n_paths, dtype=np.int64)
+
+        v_lp, v_hold, il_pct, eth_exposure, _ = calc_position_metrics(prices, eth_amount, usdc_amount)
+        hedged = il_pct > il_threshold
+        hedge_position = np.where(hedged, -alpha * eth_exposure, 0.0)
+        del eth_exposure, il_pct
+
+        delta = np.diff(hedge_position, axis=1, prepend=current_hedge[:, None])
+        hedge_cost = fee_rate * np.abs(delta) * prices
+        del delta
+        # Prepending the carried totals keeps every path's running sum in the engine's order
+        cum_cost = np.cumsum(np.concatenate([cumulative_cost[:, None], hedge_cost], axis=1), axis=1)[:, 1:]
+        del hedge_cost
+
+        step_pnl = np.empty_like(prices)
+        if last_price is None:
+            step_pnl[:, 0] = 0.0
+        else:
+            step_pnl[:, 0] = -current_hedge * (last_price - prices[:, 0])
+        step_pnl[:, 1:] = -hedge_position[:, :-1] * (prices[:, :-1] - prices[:, 1:])
+        cum_pnl = np.cumsum(np.concatenate([cumulative_pnl[:, None], step_pnl], axis=1), axis=1)[:, 1:]
+        del step_pnl
+
+        portfolio = v_lp + cum_pnl - cum_cost
+        if initial_hold is None:
+            initial_hold = v_hold[:, 0].copy()
+            peak = portfolio[:, 0].copy()
+        running_peak = np.maximum.accumulate(np.concatenate([peak[:, None], portfolio], axis=1), axis=1)[:, 1:]
+        drawdown = (running_peak - portfolio) / running_peak
+        np.maximum(max_drawdown, drawdown.max(axis=1), out=max_drawdown)
+        del drawdown
+        values = np.concatenate([final_portfolio[:, None], portfolio], axis=1) if steps else portfolio
+        moments.update(values[:, 1:] / values[:, :-1] - 1)
+        del values
+
+        current_hedge = hedge_position[:, -1].copy()
+        last_price = prices[:, -1].copy()
+        cumulative_cost = cum_cost[:, -1].copy()
+        cumulative_pnl = cum_pnl[:, -1].copy()
+        peak = running_peak[:, -1].copy()
+        hedged_steps += hedged.sum(axis=1)
+        final_lp = v_lp[:, -1].copy()
+        final_portfolio = portfolio[:, -1].copy()
+        steps += prices.shape[1]
+
+    if current_hedge is None:
+        raise ValueError("No price chunks to simulate")
+    logging.info("Simulated %d paths x %d steps.", len(current_hedge), steps)
+    return pd.DataFrame({
+        'final_price': last_price,
+        'final_value_norm': final_portfolio / initial_hold,
+        'lp_value_norm': final_lp / initial_hold,
+        'max_drawdown': max_drawdown,
+        'volatility': moments.std() if moments.n > 1 else np.full(len(current_hedge), np.nan),
+        'total_hedge_cost': cumulative_cost,
+        'hedge_pnl': cumulative_pnl,
+        'time_hedged': hedged_steps / steps,
+    })
+
+def summarize_paths(
+    df: pd.DataFrame, quantiles: Sequence[float] = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+) -> pd.DataFrame:
+    """
+    Distribution summary of per-path Monte Carlo results.
+
+    :param df: Output of run_monte_carlo
+    :param quantiles: Quantiles to report
+    :return: DataFrame indexed by statistic (mean, std, quantiles) with one column per metric
+    """
+    summary = df.quantile(list(quantiles))
+    summary.index = [f"p{q * 100:g}" for q in quantiles]
+    return pd.concat([df.agg(['mean', 'std']), summary])
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Monte Carlo stress test of the threshold hedge.")
+    parser.add_argument('--paths', type=int, default=10_000)
+    parser.add_argument('--steps', type=int, default=STEPS_PER_YEAR_15M, help="15m steps (default one year)")
+    parser.add_argument('--model', choices=MODELS, default='gbm')
+    parser.add_argument('--candles', default='data/eth_candles', help="Candle dataset bootstrapped by --model bootstrap")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--alpha', type=float, default=ALPHA)
+    parser.add_argument('--il-threshold', type=float, default=IL_THRESHOLD)
+    parser.add_argument('--fee-rate', type=float, default=FEE_RATE)
+    parser.add_argument('--output', default='data/monte_carlo', help="Dataset for the per-path results")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
+
+    returns = None
+    if args.model == 'bootstrap':
+        closes = read_dataset(args.candles, columns=['close'])['close'].to_numpy(dtype=np.float64)
+        returns = np.diff(np.log(closes))
+    chunks = iter_price_paths(args.paths, args.steps, args.model, seed=args.seed, returns=returns)
+    df = run_monte_carlo(chunks, args.alpha, args.il_threshold, args.fee_rate)
+    write_dataset(args.output, df)
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(summarize_paths(df).to_string())
+
+if __name__ == '__main__':
+    main()
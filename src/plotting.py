@@ -1,74 +1,237 @@
-import matplotlib.pyplot as plt
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, Optional, Sequence, Tuple
+import numpy as np
 import pandas as pd
-from src.config import IL_THRESHOLD
+from src.config import IL_THRESHOLD, PLOT_MAX_POINTS
 
-def plot_results(df: pd.DataFrame) -> None:
+if TYPE_CHECKING:
+    from matplotlib.figure import Figure
+
+# Columns needed to draw plot_results, used when loading scenario datasets
+PLOT_COLUMNS = [
+    'timestamp', 'eth_price', 'V_hold_norm', 'V_LP_norm', 'IL_pct', 'hedge_desired',
+    'hedge_position', 'cumulative_hedge_cost', 'cumulative_hedge_pnl', 'investor_portfolio_norm',
+]
+
+def _as_numeric(x: np.ndarray) -> np.ndarray:
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype('datetime64[ns]').view(np.int64)
+    return np.asarray(x, dtype=np.float64)
+
+def downsample_minmax(x: np.ndarray, y: np.ndarray, n_buckets: int) -> np.ndarray:
     """
-    Plot various charts for the backtest results.
-    
-    :param df: DataFrame containing backtest results.
+    Pick the indices of the minimum and maximum y in each of n_buckets equal-width x ranges.
+
+    With one bucket per horizontal pixel, the drawn line covers exactly the
+    same vertical extent as the full series, so spikes are never lost.
+
+    :param x: Sorted x values (numeric or datetime64)
+    :param y: y values
+    :param n_buckets: Number of x buckets (e.g. plot width in pixels)
+    :return: Sorted indices into x/y, including the first and last point
+    """
+    n = len(y)
+    if n <= 2 * n_buckets:
+        return np.arange(n)
+    xs = _as_numeric(x)
+    span = xs[-1] - xs[0]
+    if span <= 0:
+        bucket = np.arange(n) * n_buckets // n
+    else:
+        bucket = ((xs - xs[0]) * (n_buckets / span)).astype(np.int64)
+        np.minimum(bucket, n_buckets - 1, out=bucket)
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    counts = np.diff(np.r_[starts, n])
+
+    picked = [np.array([0, n - 1])]
+    for reduce in (np.fmin, np.fmax):
+        extreme = np.repeat(reduce.reduceat(y, starts), counts)
+        hits = np.flatnonzero(y == extreme)
+        hit_bucket = bucket[hits]
+        # Keep the first hit per bucket
+        picked.append(hits[np.r_[True, hit_bucket[1:] != hit_bucket[:-1]]])
+    return np.unique(np.concatenate(picked))
+
+def downsample_lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+
+    Keeps the point in each bucket that forms the largest triangle with the
+    previously kept point and the average of the next bucket, which preserves
+    the visual shape of the series.
+
+    :param x: Sorted x values (numeric or datetime64)
+    :param y: y values
+    :param n_out: Number of points to keep (at least 3)
+    :return: Sorted indices into x/y
+    """
+    n = len(y)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+    xs = _as_numeric(x)
+    xs = xs - xs[0]
+    ys = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+
+    indices = np.empty(n_out, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+    prev = 0
+    for b in range(n_out - 2):
+        lo, hi = edges[b], edges[b + 1]
+        next_lo, next_hi = hi, edges[b + 2] if b + 2 < len(edges) else n
+        avg_x = xs[next_lo:next_hi].mean()
+        avg_y = ys[next_lo:next_hi].mean()
+        area = np.abs((xs[prev] - avg_x) * (ys[lo:hi] - ys[prev])
+                      - (xs[prev] - xs[lo:hi]) * (avg_y - ys[prev]))
+        prev = lo + int(np.argmax(area)) if hi > lo else lo
+        indices[b + 1] = prev
+    return indices
+
+def _downsample(x: np.ndarray, y: np.ndarray, max_points: Optional[int], method: str) -> Tuple[np.ndarray, np.ndarray]:
+    if not max_points or len(y) <= max_points:
+        return x, y
+    if method == 'lttb':
+        idx = downsample_lttb(x, y, max_points)
+    elif method == 'minmax':
+        idx = downsample_minmax(x, y, max_points // 2)
+    else:
+        raise ValueError(f"Unknown downsampling method: {method}")
+    return x[idx], y[idx]
+
+def _draw_results(
+    fig: 'Figure',
+    df: pd.DataFrame,
+    il_threshold: float,
+    max_points: Optional[int],
+    method: str,
+) -> None:
     """
-    plt.figure(figsize=(16, 20))
+    Draw the nine backtest charts onto fig, downsampling every series first.
+    """
+    x = df['timestamp'].to_numpy()
+
+    def plot(ax, column, label, **kwargs):
+        xs, ys = _downsample(x, df[column].to_numpy(dtype=np.float64), max_points, method)
+        ax.plot(xs, ys, label=label, **kwargs)
+
+    axes = [fig.add_subplot(9, 1, i) for i in range(1, 10)]
 
     # 1. ETH Price
-    plt.subplot(9, 1, 1)
-    plt.plot(df['timestamp'], df['eth_price'], label='ETH Price')
-    plt.title('ETH Price')
-    plt.legend()
+    plot(axes[0], 'eth_price', 'ETH Price')
+    axes[0].set_title('ETH Price')
 
     # 2. Normalized Holding vs. LP Value
-    plt.subplot(9, 1, 2)
-    plt.plot(df['timestamp'], df['V_hold_norm'], label='Holding Value (Normalized)')
-    plt.plot(df['timestamp'], df['V_LP_norm'], label='LP Value (Normalized)')
-    plt.title('Holding vs LP Value (Normalized)')
-    plt.legend()
+    plot(axes[1], 'V_hold_norm', 'Holding Value (Normalized)')
+    plot(axes[1], 'V_LP_norm', 'LP Value (Normalized)')
+    axes[1].set_title('Holding vs LP Value (Normalized)')
 
     # 3. Impermanent Loss (%)
-    plt.subplot(9, 1, 3)
-    plt.plot(df['timestamp'], df['IL_pct'], label='Impermanent Loss (%)')
-    plt.axhline(y=IL_THRESHOLD, color='r', linestyle='--', label='IL Threshold')
-    plt.title('Impermanent Loss (%)')
-    plt.legend()
+    plot(axes[2], 'IL_pct', 'Impermanent Loss (%)')
+    axes[2].axhline(y=il_threshold, color='r', linestyle='--', label='IL Threshold')
+    axes[2].set_title('Impermanent Loss (%)')
 
     # 4. Desired Hedge Position (ETH)
-    plt.subplot(9, 1, 4)
-    plt.plot(df['timestamp'], df['hedge_desired'], label='Desired Hedge (ETH)')
-    plt.title('Desired Hedge Position (ETH)')
-    plt.legend()
+    plot(axes[3], 'hedge_desired', 'Desired Hedge (ETH)')
+    axes[3].set_title('Desired Hedge Position (ETH)')
 
     # 5. Actual Hedge Position (ETH)
-    plt.subplot(9, 1, 5)
-    plt.plot(df['timestamp'], df['hedge_position'], label='Actual Hedge (ETH)')
-    plt.title('Actual Hedge Position (ETH)')
-    plt.legend()
+    plot(axes[4], 'hedge_position', 'Actual Hedge (ETH)')
+    axes[4].set_title('Actual Hedge Position (ETH)')
 
     # 6. Cumulative Hedge Cost (USDC)
-    plt.subplot(9, 1, 6)
-    plt.plot(df['timestamp'], df['cumulative_hedge_cost'], label='Cumulative Hedge Cost (USDC)')
-    plt.title('Cumulative Hedge Cost')
-    plt.legend()
+    plot(axes[5], 'cumulative_hedge_cost', 'Cumulative Hedge Cost (USDC)')
+    axes[5].set_title('Cumulative Hedge Cost')
 
     # 7. Cumulative Hedge PnL (USDC)
-    plt.subplot(9, 1, 7)
-    plt.plot(df['timestamp'], df['cumulative_hedge_pnl'], label='Cumulative Hedge PnL (USDC)')
-    plt.title('Cumulative Hedge PnL')
-    plt.legend()
+    plot(axes[6], 'cumulative_hedge_pnl', 'Cumulative Hedge PnL (USDC)')
+    axes[6].set_title('Cumulative Hedge PnL')
 
     # 8. Investor Portfolio Value (Normalized)
-    plt.subplot(9, 1, 8)
-    plt.plot(df['timestamp'], df['investor_portfolio_norm'], label='Investor Portfolio (Normalized)')
-    plt.title('Investor Portfolio Value (Normalized)')
-    plt.legend()
+    plot(axes[7], 'investor_portfolio_norm', 'Investor Portfolio (Normalized)')
+    axes[7].set_title('Investor Portfolio Value (Normalized)')
 
     # 9. Combined Chart: Holdings vs LP vs Investor Portfolio
-    plt.subplot(9, 1, 9)
-    plt.plot(df['timestamp'], df['V_hold_norm'], label='Pure Holdings (Normalized)', linewidth=2)
-    plt.plot(df['timestamp'], df['V_LP_norm'], label='LP Value (Normalized)', linewidth=2)
-    plt.plot(df['timestamp'], df['investor_portfolio_norm'], label='Investor Portfolio (Normalized)', linewidth=2)
-    plt.title('Comparison: Holdings vs LP vs Investor Portfolio')
-    plt.xlabel('Time')
-    plt.ylabel('Normalized Value (Starting at 1.0)')
-    plt.legend()
-
-    plt.tight_layout()
-    plt.show()
+    plot(axes[8], 'V_hold_norm', 'Pure Holdings (Normalized)', linewidth=2)
+    plot(axes[8], 'V_LP_norm', 'LP Value (Normalized)', linewidth=2)
+    plot(axes[8], 'investor_portfolio_norm', 'Investor Portfolio (Normalized)', linewidth=2)
+    axes[8].set_title('Comparison: Holdings vs LP vs Investor Portfolio')
+    axes[8].set_xlabel('Time')
+    axes[8].set_ylabel('Normalized Value (Starting at 1.0)')
+
+    for ax in axes:
+        ax.legend()
+    fig.tight_layout()
+
+def plot_results(
+    df: pd.DataFrame,
+    output_path: Optional[str] = None,
+    max_points: Optional[int] = PLOT_MAX_POINTS,
+    method: str = 'minmax',
+    il_threshold: float = IL_THRESHOLD,
+) -> None:
+    """
+    Plot various charts for the backtest results.
+
+    Without output_path the charts are shown interactively. With output_path
+    they are rendered headless (Agg canvas, no pyplot) to a PNG or SVG file,
+    chosen by the extension, and the call never blocks.
+    
+    :param df: DataFrame containing backtest results.
+    :param output_path: File to render to instead of opening a window.
+    :param max_points: Points kept per series ('minmax' keeps a min and max per bucket); None draws every row.
+    :param method: Downsampling method, 'minmax' or 'lttb'.
+    :param il_threshold: Threshold line drawn on the IL chart.
+    """
+    if output_path is None:
+        import matplotlib.pyplot as plt
+        fig = plt.figure(figsize=(16, 20))
+        _draw_results(fig, df, il_threshold, max_points, method)
+        plt.show()
+        return
+
+    # matplotlib is imported only when a chart is actually drawn
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=(16, 20))
+    FigureCanvasAgg(fig)
+    _draw_results(fig, df, il_threshold, max_points, method)
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    fig.savefig(output_path)
+    logging.info("Plot saved to %s", output_path)
+
+def _render_scenario(dataset_path: str, output_path: str, il_threshold: float,
+                     max_points: Optional[int], method: str) -> str:
+    from src.columnar import read_dataset
+    df = read_dataset(dataset_path, columns=PLOT_COLUMNS)
+    plot_results(df, output_path, max_points=max_points, method=method, il_threshold=il_threshold)
+    return output_path
+
+def render_scenarios(
+    scenarios: Sequence[Tuple[str, str, float]],
+    max_points: Optional[int] = PLOT_MAX_POINTS,
+    method: str = 'minmax',
+    max_workers: Optional[int] = None,
+) -> list:
+    """
+    Render many backtest result datasets to image files in parallel worker processes.
+
+    Each worker loads only the plotted columns of its dataset, so result
+    frames are never pickled between processes.
+
+    :param scenarios: (dataset_path, output_path, il_threshold) per scenario
+    :param max_points: Points kept per series
+    :param method: Downsampling method, 'minmax' or 'lttb'
+    :param max_workers: Number of worker processes (default: all cores)
+    :return: Paths of the rendered files
+    """
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [
+            pool.submit(_render_scenario, dataset_path, output_path, il_threshold, max_points, method)
+            for dataset_path, output_path, il_threshold in scenarios
+        ]
+        return [future.result() for future in futures]
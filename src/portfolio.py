@@ -0,0 +1,264 @@
+import argparse
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import shared_memory
+from multiprocessing.util import Finalize
+from typing import Dict, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from src.alignment import PriceIndex, to_epoch_ns
+from src.columnar import write_dataset
+from src.data_fetcher import fetch_binance_candles, fetch_uniswap_pool_data_sharded
+from src.engine import compute_backtest_arrays
+from src.storage import PartitionedStore
+from src.config import FEE_RATE, IL_THRESHOLD, ALPHA, INITIAL_ETH, INITIAL_USDC
+
+# Per-pool series on the common time grid; hedge_notional is hedge_position * hedge price
+POOL_METRICS = ['hedge_position', 'hedge_notional', 'V_LP', 'cumulative_hedge_cost',
+                'cumulative_hedge_pnl', 'investor_portfolio']
+# Metrics summed across pools into the portfolio totals
+TOTAL_METRICS = ['hedge_notional', 'V_LP', 'cumulative_hedge_cost', 'cumulative_hedge_pnl', 'investor_portfolio']
+
+class PoolSpec:
+    """
+    One LP position of a portfolio: the pool, the Binance symbol used to
+    price and hedge its volatile token, the deposited amounts and the hedge
+    parameters.
+    """
+
+    __slots__ = ('name', 'pool_address', 'hedge_symbol', 'eth_amount', 'usdc_amount',
+                 'alpha', 'il_threshold', 'fee_rate')
+
+    def __init__(
+        self,
+        pool_address: str,
+        hedge_symbol: str = 'ETH/USDC',
+        eth_amount: float = INITIAL_ETH,
+        usdc_amount: float = INITIAL_USDC,
+        alpha: float = ALPHA,
+        il_threshold: float = IL_THRESHOLD,
+        fee_rate: float = FEE_RATE,
+        name: Optional[str] = None,
+    ):
+        """
+        :param pool_address: Uniswap V2 pair address
+        :param hedge_symbol: Binance symbol of the volatile token against the stable token
+        :param eth_amount: Initial amount of the volatile token
+        :param usdc_amount: Initial amount of the stable token
+        :param alpha: Hedge fraction of the LP's exposure
+        :param il_threshold: Impermanent loss threshold (percentage) that triggers the hedge
+        :param fee_rate: Fee rate applied to the notional of each hedge adjustment
+        :param name: Label used for the pool's result columns (default: the pool address)
+        """
+        self.name = name or pool_address
+        self.pool_address = pool_address
+        self.hedge_symbol = hedge_symbol
+        self.eth_amount = eth_amount
+        self.usdc_amount = usdc_amount
+        self.alpha = alpha
+        self.il_threshold = il_threshold
+        self.fee_rate = fee_rate
+
+    @classmethod
+    def from_dict(cls, spec: dict) -> 'PoolSpec':
+        return cls(**spec)
+
+    def __repr__(self) -> str:
+        return f"PoolSpec({self.name!r}, {self.hedge_symbol!r})"
+
+# Arrays attached from shared memory in each worker process
+_worker_shm = None
+_worker_arrays: Dict[str, np.ndarray] = {}
+
+def _share_arrays(arrays: Dict[str, np.ndarray]) -> Tuple[shared_memory.SharedMemory, list]:
+    """
+    Copy named arrays into one shared memory block.
+
+    :param arrays: Name -> 1-D array
+    :return: (block, layout) where layout lists (name, dtype, offset, length) for _attach_arrays
+    """
+    layout, offset = [], 0
+    for name, values in arrays.items():
+        layout.append((name, values.dtype.str, offset, len(values)))
+        offset += values.nbytes
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    for (name, dtype, start, length), values in zip(layout, arrays.values()):
+        np.ndarray((length,), dtype=dtype, buffer=shm.buf, offset=start)[:] = values
+    return shm, layout
+
+def _attach_arrays(shm_name: str, layout: list) -> None:
+    """
+    Process pool initializer: map the parent's shared arrays without copying them.
+    """
+    global _worker_shm, _worker_arrays
+    _worker_shm = shared_memory.SharedMemory(name=shm_name)
+    _worker_arrays = {
+        name: np.ndarray((length,), dtype=dtype, buffer=_worker_shm.buf, offset=offset)
+        for name, dtype, offset, length in layout
+    }
+    # Pool workers leave through os._exit, which skips atexit; multiprocessing finalizers still run
+    Finalize(None, _detach_arrays, exitpriority=10)
+
+def _detach_arrays() -> None:
+    global _worker_shm, _worker_arrays
+    # The views must go first: a mapping with exported buffers cannot be closed
+    _worker_arrays = {}
+    if _worker_shm is not None:
+        _worker_shm.close()
+        _worker_shm = None
+
+def _simulate_pool(
+    spec: PoolSpec, events: np.ndarray, index: PriceIndex, grid: np.ndarray
+) -> Dict[str, np.ndarray]:
+    """
+    Backtest one pool on its own swap events and sample the result on the grid.
+
+    Each grid point takes the pool's state after its latest swap at or
+    before it; before the first priced swap the pool holds no hedge and has
+    no costs, PnL or value.
+
+    :param spec: Pool position and hedge parameters
+    :param events: Sorted int64 epoch-ns swap timestamps of the pool
+    :param index: Prices of the pool's hedge symbol
+    :param grid: Sorted int64 epoch-ns timestamps of the portfolio result
+    :return: Metric name -> array aligned with grid
+    """
+    prices = index.lookup(events)
+    priced = ~np.isnan(prices)
+    events, prices = events[priced], prices[priced]
+    columns = compute_backtest_arrays(
+        prices,
+        alpha=spec.alpha,
+        il_threshold=spec.il_threshold,
+        fee_rate=spec.fee_rate,
+        eth_amount=spec.eth_amount,
+        usdc_amount=spec.usdc_amount,
+    )
+    columns['hedge_notional'] = columns['hedge_position'] * prices
+    pos = np.searchsorted(events, grid, side='right') - 1
+    before_first = pos < 0
+    aligned = {}
+    for metric in POOL_METRICS:
+        values = columns[metric][np.maximum(pos, 0)] if len(events) else np.zeros(len(grid))
+        values[before_first] = 0.0
+        aligned[metric] = values
+    return aligned
+
+def _simulate_pool_task(spec: PoolSpec, events: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Worker entry point: simulate one pool against the shared price arrays.
+    """
+    index = PriceIndex(_worker_arrays[f'{spec.hedge_symbol}/ts'], _worker_arrays[f'{spec.hedge_symbol}/price'])
+    return _simulate_pool(spec, events, index, _worker_arrays['grid'])
+
+def run_portfolio(
+    specs: Sequence[PoolSpec],
+    candles: Dict[str, pd.DataFrame],
+    events: Dict[str, np.ndarray],
+    max_workers: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Backtest several LP positions and aggregate them on one time grid.
+
+    Each pool is simulated on its own swaps priced by its hedge symbol's
+    candles. The grid is the union of all candle timestamps. Candle prices
+    and the grid are placed in shared memory once and mapped by every
+    worker; only each pool's own swap timestamps are sent to its worker.
+
+    :param specs: Portfolio positions (names must be unique)
+    :param candles: Hedge symbol -> candles with 'timestamp' and 'close'
+    :param events: Pool name -> swap timestamps (datetime64 or int64 epoch ns)
+    :param max_workers: Number of worker processes (default: all cores, 1 runs in-process)
+    :return: Frame indexed by grid timestamp with '<pool>_<metric>' columns per pool
+        and unprefixed portfolio totals of TOTAL_METRICS
+    """
+    names = [spec.name for spec in specs]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate pool names in {names}")
+    indexes = {symbol: PriceIndex.from_candles(candles[symbol]) for symbol in {s.hedge_symbol for s in specs}}
+    grid = np.unique(np.concatenate([index.timestamps for index in indexes.values()]))
+    pool_events = {spec.name: np.sort(to_epoch_ns(events[spec.name])) for spec in specs}
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    logging.info("Simulating %d pools over %d grid points.", len(specs), len(grid))
+
+    if max_workers <= 1 or len(specs) <= 1:
+        results = [_simulate_pool(spec, pool_events[spec.name], indexes[spec.hedge_symbol], grid) for spec in specs]
+    else:
+        shared = {'grid': grid}
+        for symbol, index in indexes.items():
+            shared[f'{symbol}/ts'] = index.timestamps
+            shared[f'{symbol}/price'] = index.prices
+        shm, layout = _share_arrays(shared)
+        try:
+            with ProcessPoolExecutor(
+                max_workers=min(max_workers, len(specs)),
+                initializer=_attach_arrays,
+                initargs=(shm.name, layout),
+            ) as pool:
+                futures = [pool.submit(_simulate_pool_task, spec, pool_events[spec.name]) for spec in specs]
+                results = [future.result() for future in futures]
+        finally:
+            shm.close()
+            shm.unlink()
+
+    columns = {}
+    for spec, aligned in zip(specs, results):
+        for metric in POOL_METRICS:
+            columns[f'{spec.name}_{metric}'] = aligned[metric]
+    for metric in TOTAL_METRICS:
+        columns[metric] = np.sum([aligned[metric] for aligned in results], axis=0)
+    return pd.DataFrame(columns, index=pd.DatetimeIndex(grid.view('datetime64[ns]'), name='timestamp'))
+
+def load_portfolio_data(
+    specs: Sequence[PoolSpec], start_dt: datetime, end_dt: datetime, store: Optional[PartitionedStore] = None
+) -> Tuple[Dict[str, pd.DataFrame], Dict[str, np.ndarray]]:
+    """
+    Fetch (or read from the local store) candles per hedge symbol and swap timestamps per pool.
+
+    :param specs: Portfolio positions
+    :param start_dt: Start of the backtest period
+    :param end_dt: End of the backtest period
+    :param store: Local partitioned store to read from first (default: one rooted at CACHE_DIR)
+    :return: (candles by hedge symbol, swap timestamps by pool name) for run_portfolio
+    """
+    if store is None:
+        store = PartitionedStore()
+    candles = {}
+    for symbol in sorted({spec.hedge_symbol for spec in specs}):
+        logging.info("Fetching %s candles...", symbol)
+        candles[symbol] = fetch_binance_candles(symbol=symbol, since=int(start_dt.timestamp() * 1000),
+                                                end_time=int(end_dt.timestamp() * 1000), store=store)
+    events = {}
+    for spec in specs:
+        logging.info("Fetching swaps of %s...", spec.name)
+        df_pool = fetch_uniswap_pool_data_sharded(spec.pool_address, int(start_dt.timestamp()),
+                                                  int(end_dt.timestamp()), store=store)
+        events[spec.name] = to_epoch_ns(df_pool['timestamp'])
+    return candles, events
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Backtest a portfolio of hedged LP positions.")
+    parser.add_argument('specs', help="JSON file with a list of PoolSpec fields per pool")
+    parser.add_argument('--start', default='2024-01-01')
+    parser.add_argument('--end', default='2025-01-01')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--output', default='data/portfolio_results')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
+
+    with open(args.specs) as f:
+        specs = [PoolSpec.from_dict(spec) for spec in json.load(f)]
+    candles, events = load_portfolio_data(specs, datetime.fromisoformat(args.start), datetime.fromisoformat(args.end))
+    df = run_portfolio(specs, candles, events, max_workers=args.workers)
+    write_dataset(args.output, df.reset_index())
+    last = df.iloc[-1]
+    logging.info("Portfolio value %.2f, hedge notional %.2f, hedge cost %.2f, hedge PnL %.2f; saved to %s",
+                 last['investor_portfolio'], last['hedge_notional'], last['cumulative_hedge_cost'],
+                 last['cumulative_hedge_pnl'], args.output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+import cProfile
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Iterator, Optional
+
+try:
+    import resource
+except ImportError:
+    # POSIX only; on Windows the report has no peak RSS
+    resource = None
+
+_http_lock = threading.Lock()
+_http_requests = 0
+_http_bytes = 0
+
+def record_http(nbytes: int) -> None:
+    """
+    Count one HTTP request and its response size; called by the fetchers.
+
+    :param nbytes: Response body size in bytes (0 if unknown)
+    """
+    global _http_requests, _http_bytes
+    with _http_lock:
+        _http_requests += 1
+        _http_bytes += nbytes
+
+def _http_counters() -> tuple:
+    with _http_lock:
+        return _http_requests, _http_bytes
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+class StageProfiler:
+    """
+    Collects per-stage wall time, CPU time, peak RSS, row counts and HTTP traffic.
+
+    Stages are recorded in the order they finish. Optionally one stage,
+    chosen by name, also runs under cProfile and its stats are dumped next
+    to the report.
+    """
+
+    def __init__(self, cprofile_stage: Optional[str] = None, cprofile_path: Optional[str] = None):
+        """
+        :param cprofile_stage: Name of the stage to run under cProfile
+        :param cprofile_path: Where to dump the cProfile stats (.prof)
+        """
+        self.cprofile_stage = cprofile_stage
+        self.cprofile_path = cprofile_path
+        self.stages = []
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+
+    @contextmanager
+    def stage(self, name: str, rows_in: Optional[int] = None) -> Iterator[dict]:
+        """
+        Time a pipeline stage. Set record['rows_out'] inside the block to report output rows.
+
+        :param name: Stage name
+        :param rows_in: Number of input rows, if meaningful
+        :return: The stage record (a dict)
+        """
+        record = {'stage': name, 'rows_in': rows_in, 'rows_out': None}
+        requests_before, bytes_before = _http_counters()
+        rss_before = _peak_rss_mb()
+        profiler = cProfile.Profile() if name == self.cprofile_stage else None
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield record
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                path = self.cprofile_path or f"{name}.prof"
+                directory = os.path.dirname(path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                profiler.dump_stats(path)
+                record['cprofile'] = path
+            requests_after, bytes_after = _http_counters()
+            rss_after = _peak_rss_mb()
+            record.update({
+                'wall_s': time.perf_counter() - wall,
+                'cpu_s': time.process_time() - cpu,
+                'peak_rss_mb': rss_after,
+                'peak_rss_growth_mb': None if rss_after is None else rss_after - rss_before,
+                'http_requests': requests_after - requests_before,
+                'http_bytes': bytes_after - bytes_before,
+            })
+            self.stages.append(record)
+            logging.info("Stage %s: %.2fs wall, %.2fs CPU, rows %s -> %s",
+                         name, record['wall_s'], record['cpu_s'], rows_in, record['rows_out'])
+
+    def report(self) -> dict:
+        """
+        :return: Machine-readable summary of the run
+        """
+        requests_total, bytes_total = _http_counters()
+        return {
+            'started_at': self.started_at,
+            'argv': sys.argv,
+            'total': {
+                'wall_s': time.perf_counter() - self._wall_start,
+                'cpu_s': time.process_time() - self._cpu_start,
+                'peak_rss_mb': _peak_rss_mb(),
+                'http_requests': requests_total,
+                'http_bytes': bytes_total,
+            },
+            'stages': self.stages,
+        }
+
+    def write_report(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2, default=str)
+        logging.info("Profile report saved to %s", path)
+
+_active: Optional[StageProfiler] = None
+
+def set_profiler(profiler: Optional[StageProfiler]) -> None:
+    """
+    Install (or remove, with None) the profiler used by profile_stage.
+    """
+    global _active
+    _active = profiler
+
+@contextmanager
+def profile_stage(name: str, rows_in: Optional[int] = None) -> Iterator[dict]:
+    """
+    Record a stage on the active profiler; a no-op when profiling is disabled.
+
+    :param name: Stage name
+    :param rows_in: Number of input rows, if meaningful
+    :return: The stage record (a dict); set 'rows_out' on it inside the block
+    """
+    if _active is None:
+        yield {}
+        return
+    with _active.stage(name, rows_in) as record:
+        yield record
@@ -0,0 +1,308 @@
+import argparse
+import logging
+from typing import Dict, Iterator, Optional
+import numpy as np
+import pandas as pd
+from src.alignment import to_epoch_ns
+from src.columnar import DatasetWriter, iter_dataset, read_dataset, write_dataset
+from src.engine import add_normalized_columns
+from src.config import INITIAL_K, POOL_FEE_RATE
+
+# Columns added to each swap; token0 is USDC and token1 is ETH in the default pool
+RESERVE_COLUMNS = ['usdc_reserve', 'eth_reserve', 'pool_price', 'lp_share',
+                   'lp_fee_usdc', 'lp_fee_eth', 'lp_fee_value']
+
+def swap_amounts(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """
+    Swap amounts as float64 arrays; The Graph returns them as decimal strings.
+
+    :param df: Swaps with amount0In, amount1In, amount0Out and amount1Out
+    :return: Column name -> float64 array
+    """
+    return {
+        name: df[name].astype(np.float64).to_numpy()
+        for name in ('amount0In', 'amount1In', 'amount0Out', 'amount1Out')
+    }
+
+def anchors_from_pool_state(df_state: pd.DataFrame) -> pd.DataFrame:
+    """
+    Turn pair hour data into reserve anchors.
+
+    Hourly rows carry the reserves at the end of the hour starting at
+    'timestamp', so each anchor is valid from the next hour on.
+
+    :param df_state: Output of fetch_uniswap_pool_state_data
+    :return: Frame with 'timestamp', 'usdc_reserve' and 'eth_reserve'
+    """
+    return pd.DataFrame({
+        'timestamp': df_state['timestamp'] + pd.Timedelta(hours=1),
+        'usdc_reserve': df_state['usdc_reserve'].to_numpy(dtype=np.float64),
+        'eth_reserve': df_state['eth_reserve'].to_numpy(dtype=np.float64),
+    }).sort_values('timestamp', kind='stable', ignore_index=True)
+
+class ReserveTracker:
+    """
+    Rebuild pool reserves from the swap stream, chunk by chunk.
+
+    Reserves after each swap are the starting reserves plus the cumulative
+    net inflow of both tokens. Swaps do not see liquidity being added or
+    removed, so the reconstruction is re-anchored whenever an observed
+    reserve snapshot becomes valid: from an anchor on, reserves are the
+    snapshot plus the flows of the swaps at or after its timestamp.
+
+    Each swap's 0.3% input fee is credited to the LP pro rata to its
+    liquidity, sqrt(k_lp) / sqrt(usdc_reserve * eth_reserve) before the swap.
+    Without initial reserves, swaps before the first anchor cannot be priced:
+    their reserves and fees are NaN and they are counted in 'unpriced'.
+    """
+
+    __slots__ = ('lp_k', 'pool_fee', 'anchor_ts', 'anchor_reserves', 'next_anchor',
+                 'offset', 'cumulative_flow', 'swaps', 'unpriced')
+
+    def __init__(
+        self,
+        initial_usdc: Optional[float] = None,
+        initial_eth: Optional[float] = None,
+        anchors: Optional[pd.DataFrame] = None,
+        lp_k: float = INITIAL_K,
+        pool_fee: float = POOL_FEE_RATE,
+    ):
+        """
+        :param initial_usdc: USDC reserve before the first swap (NaN reserves until the first anchor if omitted)
+        :param initial_eth: ETH reserve before the first swap
+        :param anchors: Observed reserves ('timestamp', 'usdc_reserve', 'eth_reserve'), e.g. anchors_from_pool_state
+        :param lp_k: k = eth_amount * usdc_amount of the LP position
+        :param pool_fee: Swap fee rate paid to liquidity providers
+        """
+        self.lp_k = lp_k
+        self.pool_fee = pool_fee
+        if anchors is None or anchors.empty:
+            self.anchor_ts = np.empty(0, dtype=np.int64)
+            self.anchor_reserves = np.empty((0, 2))
+        else:
+            anchors = anchors.sort_values('timestamp', kind='stable')
+            self.anchor_ts = to_epoch_ns(anchors['timestamp'])
+            self.anchor_reserves = anchors[['usdc_reserve', 'eth_reserve']].to_numpy(dtype=np.float64)
+        self.next_anchor = 0
+        initial = [np.nan if initial_usdc is None else initial_usdc, np.nan if initial_eth is None else initial_eth]
+        # Reserves = offset of the latest anchor + cumulative net inflow since the start
+        self.offset = np.array(initial, dtype=np.float64)
+        self.cumulative_flow = np.zeros(2)
+        self.swaps = 0
+        self.unpriced = 0
+
+    def process(self, timestamps: np.ndarray, amounts: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """
+        Reserves, pool price and the LP's fee income for the next chunk of swaps.
+
+        :param timestamps: Sorted int64 epoch-ns swap timestamps, continuing the previous chunk
+        :param amounts: Output of swap_amounts for the same swaps
+        :return: RESERVE_COLUMNS -> arrays, one value per swap (reserves after the swap)
+        """
+        n = len(timestamps)
+        flow = np.empty((n + 1, 2))
+        flow[0] = self.cumulative_flow
+        flow[1:, 0] = amounts['amount0In'] - amounts['amount0Out']
+        flow[1:, 1] = amounts['amount1In'] - amounts['amount1Out']
+        # Carried total prepended so chunked and single-pass sums agree
+        cumulative = np.cumsum(flow, axis=0)
+
+        # Offsets of the anchors that become valid within this chunk; later ones wait,
+        # since swaps before them may still arrive in the next chunk
+        last_ts = timestamps[-1] if n else np.iinfo(np.int64).min
+        stop = max(int(np.searchsorted(self.anchor_ts, last_ts, side='right')), self.next_anchor)
+        offsets = [self.offset]
+        if stop > self.next_anchor:
+            new_ts = self.anchor_ts[self.next_anchor:stop]
+            flow_before = cumulative[np.searchsorted(timestamps, new_ts, side='left')]
+            offsets.extend(self.anchor_reserves[self.next_anchor:stop] - flow_before)
+        offsets = np.array(offsets)
+        which = np.searchsorted(self.anchor_ts[self.next_anchor:stop], timestamps, side='right')
+        offset = offsets[which]
+
+        before = offset + cumulative[:-1]
+        after = offset + cumulative[1:]
+        usdc_reserve, eth_reserve = after[:, 0], after[:, 1]
+        pool_price = usdc_reserve / eth_reserve
+        lp_share = np.sqrt(self.lp_k / (before[:, 0] * before[:, 1]))
+        lp_fee_usdc = self.pool_fee * amounts['amount0In'] * lp_share
+        lp_fee_eth = self.pool_fee * amounts['amount1In'] * lp_share
+
+        self.offset = offsets[-1]
+        self.next_anchor = stop
+        self.cumulative_flow = cumulative[-1]
+        self.swaps += n
+        lp_fee_value = lp_fee_usdc + lp_fee_eth * pool_price
+        self.unpriced += int(np.isnan(lp_fee_value).sum())
+        return {
+            'usdc_reserve': usdc_reserve,
+            'eth_reserve': eth_reserve,
+            'pool_price': pool_price,
+            'lp_share': lp_share,
+            'lp_fee_usdc': lp_fee_usdc,
+            'lp_fee_eth': lp_fee_eth,
+            'lp_fee_value': lp_fee_value,
+        }
+
+class FeeAccumulator:
+    """
+    Per-candle totals of the LP's fee income, built from swap chunks with bincount.
+
+    Swaps without reserves (see ReserveTracker) count towards 'swaps' and
+    'volume_usdc' but earn no fees; they are counted in 'unpriced_swaps'.
+    """
+
+    __slots__ = ('timestamps', 'swaps', 'unpriced_swaps', 'volume_usdc', 'lp_fee_usdc', 'lp_fee_eth',
+                 'lp_fee_value', 'usdc_reserve', 'eth_reserve')
+
+    def __init__(self, candle_timestamps: np.ndarray):
+        """
+        :param candle_timestamps: Candle open times (datetime64 or int64 epoch ns), sorted
+        """
+        self.timestamps = to_epoch_ns(candle_timestamps)
+        n = len(self.timestamps)
+        self.swaps = np.zeros(n, dtype=np.int64)
+        self.unpriced_swaps = np.zeros(n, dtype=np.int64)
+        self.volume_usdc, self.lp_fee_usdc, self.lp_fee_eth, self.lp_fee_value = (np.zeros(n) for _ in range(4))
+        self.usdc_reserve, self.eth_reserve = np.full(n, np.nan), np.full(n, np.nan)
+
+    def add(self, timestamps: np.ndarray, amounts: Dict[str, np.ndarray], columns: Dict[str, np.ndarray]) -> None:
+        """
+        Add one chunk of swaps; swaps before the first candle are ignored.
+
+        :param timestamps: Sorted int64 epoch-ns swap timestamps
+        :param amounts: Output of swap_amounts
+        :param columns: Output of ReserveTracker.process for the same swaps
+        """
+        bucket = np.searchsorted(self.timestamps, timestamps, side='right') - 1
+        keep = bucket >= 0
+        bucket = bucket[keep]
+        n = len(self.timestamps)
+        self.swaps += np.bincount(bucket, minlength=n)
+        volume = np.abs(amounts['amount0In'] - amounts['amount0Out'])[keep]
+        self.volume_usdc += np.bincount(bucket, weights=volume, minlength=n)
+        # One NaN weight would turn its candle's total, and every cumulative value after it, into NaN
+        priced = ~np.isnan(columns['lp_fee_value'][keep])
+        self.unpriced_swaps += np.bincount(bucket[~priced], minlength=n)
+        for name in ('lp_fee_usdc', 'lp_fee_eth', 'lp_fee_value'):
+            getattr(self, name)[:] += np.bincount(bucket[priced], weights=columns[name][keep][priced], minlength=n)
+        if len(bucket):
+            # Reserves at the close of each candle: the last swap of every bucket
+            last = np.flatnonzero(np.r_[bucket[1:] != bucket[:-1], True])
+            self.usdc_reserve[bucket[last]] = columns['usdc_reserve'][keep][last]
+            self.eth_reserve[bucket[last]] = columns['eth_reserve'][keep][last]
+
+    def frame(self) -> pd.DataFrame:
+        """
+        :return: One row per candle; reserves are carried forward through candles without swaps
+        """
+        df = pd.DataFrame({
+            'timestamp': self.timestamps.view('datetime64[ns]'),
+            'swaps': self.swaps,
+            'unpriced_swaps': self.unpriced_swaps,
+            'volume_usdc': self.volume_usdc,
+            'lp_fee_usdc': self.lp_fee_usdc,
+            'lp_fee_eth': self.lp_fee_eth,
+            'lp_fee_value': self.lp_fee_value,
+            'usdc_reserve': self.usdc_reserve,
+            'eth_reserve': self.eth_reserve,
+        })
+        df[['usdc_reserve', 'eth_reserve']] = df[['usdc_reserve', 'eth_reserve']].ffill()
+        df['cumulative_lp_fee_value'] = np.cumsum(self.lp_fee_value)
+        return df
+
+def accrue_fee_income(
+    chunks: Iterator[pd.DataFrame],
+    candle_timestamps: np.ndarray,
+    tracker: ReserveTracker,
+    output_path: Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    Stream swaps through a ReserveTracker and bucket the LP's fee income per candle.
+
+    Only the current chunk and per-candle totals are kept in memory.
+
+    :param chunks: Swap frames in time order (e.g. iter_dataset('data/uniswap_pool_data', chunk_rows=...))
+    :param candle_timestamps: Candle open times defining the buckets
+    :param tracker: Reserve state, carried across chunks
+    :param output_path: Also write every swap with RESERVE_COLUMNS to this columnar dataset
+    :return: FeeAccumulator.frame() of the whole stream
+    """
+    accumulator = FeeAccumulator(candle_timestamps)
+    writer = DatasetWriter(output_path) if output_path else None
+    try:
+        for df_chunk in chunks:
+            if df_chunk.empty:
+                continue
+            timestamps = to_epoch_ns(df_chunk['timestamp'])
+            amounts = swap_amounts(df_chunk)
+            columns = tracker.process(timestamps, amounts)
+            accumulator.add(timestamps, amounts, columns)
+            if writer is not None:
+                writer.append(df_chunk.assign(**columns))
+            logging.info("Reconstructed reserves for %d swaps.", tracker.swaps)
+    finally:
+        if writer is not None:
+            writer.close()
+    return accumulator.frame()
+
+def reconstruct_reserves(df_swaps: pd.DataFrame, tracker: ReserveTracker) -> pd.DataFrame:
+    """
+    In-memory variant: return the swaps (sorted by time) with RESERVE_COLUMNS added.
+
+    :param df_swaps: Swaps with 'timestamp' and the four amount columns
+    :param tracker: Reserve state (advanced to the end of df_swaps)
+    :return: New DataFrame
+    """
+    df = df_swaps.sort_values('timestamp', kind='stable', ignore_index=True)
+    return df.assign(**tracker.process(to_epoch_ns(df['timestamp']), swap_amounts(df)))
+
+def add_fee_income(df: pd.DataFrame, tracker: ReserveTracker) -> pd.DataFrame:
+    """
+    Credit the LP's swap fee income to a backtest run on the swap stream.
+
+    Fees are paid out rather than compounded into the position, so V_LP and
+    investor_portfolio gain the cumulative fee value while IL_pct and the
+    hedge, which depend on the price alone, are unchanged. Swaps the tracker
+    cannot price earn nothing.
+
+    :param df: Backtest results with one row per swap, sorted by time, still holding the amount columns
+    :param tracker: Reserve state (advanced to the end of df)
+    :return: The same DataFrame with 'lp_fee_value' and 'cumulative_lp_fee_value' added and the
+        normalized columns recomputed
+    """
+    unpriced_before = tracker.unpriced
+    fees = tracker.process(to_epoch_ns(df['timestamp']), swap_amounts(df))['lp_fee_value']
+    unpriced = tracker.unpriced - unpriced_before
+    if unpriced:
+        logging.warning("%d of %d swaps precede the first reserve anchor and earn no fees.", unpriced, len(df))
+    df['lp_fee_value'] = np.nan_to_num(fees, nan=0.0)
+    df['cumulative_lp_fee_value'] = np.cumsum(df['lp_fee_value'].to_numpy())
+    df['V_LP'] += df['cumulative_lp_fee_value']
+    df['investor_portfolio'] += df['cumulative_lp_fee_value']
+    return add_normalized_columns(df)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebuild pool reserves from swaps and accrue the LP's fee income.")
+    parser.add_argument('swaps', nargs='?', default='data/uniswap_pool_data', help="Columnar swap dataset")
+    parser.add_argument('--candles', default='data/eth_candles', help="Candle dataset defining the fee buckets")
+    parser.add_argument('--pool-state', help="Columnar pair hour data used as reserve anchors")
+    parser.add_argument('--initial-usdc', type=float, help="USDC reserve before the first swap")
+    parser.add_argument('--initial-eth', type=float, help="ETH reserve before the first swap")
+    parser.add_argument('--chunk-rows', type=int, default=1_000_000)
+    parser.add_argument('--swaps-output', help="Also write every swap with its reserves to this dataset")
+    parser.add_argument('--output', default='data/fee_income')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
+
+    anchors = anchors_from_pool_state(read_dataset(args.pool_state)) if args.pool_state else None
+    tracker = ReserveTracker(args.initial_usdc, args.initial_eth, anchors)
+    candle_ts = read_dataset(args.candles, columns=['timestamp'])['timestamp']
+    df_fees = accrue_fee_income(iter_dataset(args.swaps, chunk_rows=args.chunk_rows), candle_ts, tracker,
+                                output_path=args.swaps_output)
+    write_dataset(args.output, df_fees)
+    logging.info("LP fee income %.2f USDC over %d swaps (%d unpriced before the first anchor); saved to %s",
+                 df_fees['cumulative_lp_fee_value'].iloc[-1], tracker.swaps, tracker.unpriced, args.output)
+
+if __name__ == '__main__':
+    main()
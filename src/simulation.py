@@ -2,51 +2,80 @@ import logging
 import math
 import pandas as pd
 from datetime import datetime
-from src.data_fetcher import fetch_binance_candles, fetch_uniswap_pool_data_paginated
+from typing import Optional
+from src.data_fetcher import fetch_binance_candles, fetch_uniswap_pool_data_sharded, fetch_uniswap_pool_state_data
 from src.calculations import calc_lp_value, calc_hold_value
+from src.engine import run_backtest_vectorized, add_normalized_columns
 from src.plotting import plot_results
-from src.config import UNISWAP_POOL_ADDRESS, FEE_RATE, IL_THRESHOLD, ALPHA, INITIAL_K
+from src.storage import PartitionedStore
+from src.alignment import PriceIndex
+from src.candle_store import load_candles
+from src.profiling import profile_stage
+from src.columnar import write_dataset
+from src.metrics import compute_metrics, log_metrics
+from src.reserves import ReserveTracker, add_fee_income, anchors_from_pool_state
+from src.config import UNISWAP_POOL_ADDRESS, FEE_RATE, IL_THRESHOLD, ALPHA, INITIAL_ETH, INITIAL_USDC, EXPORT_CSV
 
-def simulate_backtest() -> None:
+def save_output(df: pd.DataFrame, name: str, export_csv: bool = EXPORT_CSV) -> None:
     """
-    Perform backtesting of LP performance and a simple hedge strategy.
+    Save a dataset under data/ in columnar format, optionally with a CSV copy.
+
+    :param df: Frame to save
+    :param name: Dataset name (e.g. 'backtest_results')
+    :param export_csv: Also write data/<name>.csv
     """
-    # Define time interval: Jan 1, 2024 – Jan 1, 2025
-    start_dt = datetime(2024, 1, 1)
-    end_dt = datetime(2025, 1, 1)
-    since_binance = int(start_dt.timestamp() * 1000)
-    end_time_binance = int(end_dt.timestamp() * 1000)
-    start_timestamp = int(start_dt.timestamp())
-    end_timestamp = int(end_dt.timestamp())
+    write_dataset(f'data/{name}', df)
+    logging.info("Saved %d rows to data/%s", len(df), name)
+    if export_csv:
+        df.to_csv(f'data/{name}.csv', index=False)
+        logging.info("CSV copy saved to data/%s.csv", name)
 
-    # Fetch Binance candlestick data
-    logging.info("Fetching Binance candlestick data...")
-    df_eth = fetch_binance_candles(symbol='ETH/USDC', since=since_binance, end_time=end_time_binance)
-    df_eth.to_csv('data/eth_candles.csv', index=False)
-    logging.info("Binance data saved to data/eth_candles.csv")
+def merge_price_data(
+    df_pool: pd.DataFrame, df_eth: pd.DataFrame, index: Optional[PriceIndex] = None
+) -> pd.DataFrame:
+    """
+    Assign each swap the latest available ETH close price.
 
-    # Fetch Uniswap pool swap data
-    logging.info("Fetching Uniswap pool swap data...")
-    df_pool = fetch_uniswap_pool_data_paginated(UNISWAP_POOL_ADDRESS, start_timestamp, end_timestamp)
-    df_pool.to_csv('data/uniswap_pool_data.csv', index=False)
-    logging.info("Uniswap swap data saved to data/uniswap_pool_data.csv")
+    :param df_pool: DataFrame with swap data (must contain 'timestamp')
+    :param df_eth: DataFrame with Binance candles (must contain 'timestamp' and 'close')
+    :param index: Prebuilt PriceIndex of the candles, reused instead of building one from df_eth
+    :return: Merged DataFrame with an 'eth_price' column, sorted by timestamp
+    """
+    if index is None:
+        index = PriceIndex.from_candles(df_eth)
+    df_merged = df_pool.sort_values('timestamp', kind='stable', ignore_index=True)
+    df_merged['eth_price'] = index.lookup(df_merged['timestamp'])
+    return df_merged
 
-    # Merge data: assign each swap the latest available ETH price
-    df_merged = pd.merge_asof(
-        df_pool.sort_values('timestamp'),
-        df_eth[['timestamp', 'close']].sort_values('timestamp'),
-        on='timestamp',
-        direction='backward'
-    )
-    df_merged.rename(columns={'close': 'eth_price'}, inplace=True)
-    df_merged['eth_price'] = df_merged['eth_price'].ffill()
+def run_backtest_loop(
+    df_merged: pd.DataFrame,
+    alpha: float = ALPHA,
+    il_threshold: float = IL_THRESHOLD,
+    fee_rate: float = FEE_RATE,
+    eth_amount: float = INITIAL_ETH,
+    usdc_amount: float = INITIAL_USDC,
+) -> pd.DataFrame:
+    """
+    Reference row-by-row implementation of the LP valuation and hedge simulation.
+
+    Kept as the ground truth for the vectorized engine in src.engine.
+
+    :param df_merged: DataFrame with 'timestamp' and 'eth_price' columns
+    :param alpha: Hedge fraction of the LP's ETH exposure
+    :param il_threshold: Impermanent loss threshold (percentage) that triggers the hedge
+    :param fee_rate: Fee rate applied to the notional of each hedge adjustment
+    :param eth_amount: Initial ETH amount of the LP position
+    :param usdc_amount: Initial USDC amount of the LP position
+    :return: The same DataFrame with backtest columns added
+    """
+    k = eth_amount * usdc_amount
 
     # Compute LP Value, Holding Value, and Impermanent Loss
     V_LP, V_hold, IL_pct = [], [], []
     for _, row in df_merged.iterrows():
         price = row['eth_price']
-        lp_val = calc_lp_value(price, INITIAL_K)
-        hold_val = calc_hold_value(price)
+        lp_val = calc_lp_value(price, k)
+        hold_val = calc_hold_value(price, eth_amount, usdc_amount)
         V_LP.append(lp_val)
         V_hold.append(hold_val)
         il = hold_val - lp_val
@@ -59,9 +88,9 @@ def simulate_backtest() -> None:
     hedge_desired = []
     for _, row in df_merged.iterrows():
         price = row['eth_price']
-        eth_exposure = math.sqrt(INITIAL_K / price)
-        if row['IL_pct'] > IL_THRESHOLD:
-            hedge_desired.append(-ALPHA * eth_exposure)
+        eth_exposure = math.sqrt(k / price)
+        if row['IL_pct'] > il_threshold:
+            hedge_desired.append(-alpha * eth_exposure)
         else:
             hedge_desired.append(0.0)
     df_merged['hedge_desired'] = hedge_desired
@@ -73,7 +102,7 @@ def simulate_backtest() -> None:
     for _, row in df_merged.iterrows():
         desired = row['hedge_desired']
         delta = desired - current_hedge
-        cost = FEE_RATE * abs(delta) * row['eth_price']
+        cost = fee_rate * abs(delta) * row['eth_price']
         hedge_costs.append(cost)
         current_hedge = desired
         hedge_position.append(current_hedge)
@@ -98,16 +127,109 @@ def simulate_backtest() -> None:
         investor_portfolio.append(inv_val)
     df_merged['investor_portfolio'] = investor_portfolio
 
-    # Normalize values relative to the initial holding value.
-    initial_hold = df_merged['V_hold'].iloc[0]
-    df_merged['V_LP_norm'] = df_merged['V_LP'] / initial_hold
-    df_merged['V_hold_norm'] = df_merged['V_hold'] / initial_hold
-    df_merged['investor_portfolio_norm'] = df_merged['investor_portfolio'] / initial_hold
+    return add_normalized_columns(df_merged)
+
+def load_merged_data(
+    start_dt: datetime, end_dt: datetime, store: Optional[PartitionedStore] = None, timeframe: Optional[str] = None
+) -> pd.DataFrame:
+    """
+    Fetch Binance candles and Uniswap swaps for a period and merge them by time.
+
+    :param start_dt: Start of the backtest period
+    :param end_dt: End of the backtest period
+    :param store: Local partitioned store to read from first (default: one rooted at CACHE_DIR)
+    :param timeframe: Price granularity taken from the local candle pyramid (default: fetch 15m candles directly)
+    :return: Merged DataFrame with an 'eth_price' column
+    """
+    if store is None:
+        store = PartitionedStore()
+    since_binance = int(start_dt.timestamp() * 1000)
+    end_time_binance = int(end_dt.timestamp() * 1000)
+    start_timestamp = int(start_dt.timestamp())
+    end_timestamp = int(end_dt.timestamp())
+
+    # Fetch Binance candlestick data
+    logging.info("Fetching Binance candlestick data...")
+    with profile_stage('fetch_candles') as stage:
+        if timeframe is None:
+            df_eth = fetch_binance_candles(symbol='ETH/USDC', since=since_binance, end_time=end_time_binance,
+                                           store=store)
+        else:
+            df_eth = load_candles('ETH/USDC', timeframe, since_binance, end_time_binance, store=store)
+        stage['rows_out'] = len(df_eth)
+    with profile_stage('save_candles', rows_in=len(df_eth)):
+        save_output(df_eth, 'eth_candles')
+
+    # Fetch Uniswap pool swap data
+    logging.info("Fetching Uniswap pool swap data...")
+    with profile_stage('fetch_swaps') as stage:
+        df_pool = fetch_uniswap_pool_data_sharded(UNISWAP_POOL_ADDRESS, start_timestamp, end_timestamp,
+                                                  store=store)
+        stage['rows_out'] = len(df_pool)
+    with profile_stage('save_swaps', rows_in=len(df_pool)):
+        save_output(df_pool, 'uniswap_pool_data')
+
+    # Merge data: assign each swap the latest available ETH price
+    with profile_stage('merge', rows_in=len(df_pool) + len(df_eth)) as stage:
+        df_merged = merge_price_data(df_pool, df_eth)
+        stage['rows_out'] = len(df_merged)
+    return df_merged
+
+def load_fee_tracker(start_dt: datetime, end_dt: datetime, store: Optional[PartitionedStore] = None) -> ReserveTracker:
+    """
+    Reserve tracker anchored to the pool's hourly reserves over a period.
+
+    :param start_dt: Start of the backtest period
+    :param end_dt: End of the backtest period
+    :param store: Local partitioned store to read from first (default: one rooted at CACHE_DIR)
+    :return: ReserveTracker for src.reserves.add_fee_income
+    """
+    with profile_stage('fetch_pool_state') as stage:
+        df_state = fetch_uniswap_pool_state_data(UNISWAP_POOL_ADDRESS, int(start_dt.timestamp()),
+                                                 int(end_dt.timestamp()), store=store or PartitionedStore())
+        stage['rows_out'] = len(df_state)
+    return ReserveTracker(anchors=anchors_from_pool_state(df_state) if len(df_state) else None)
+
+def simulate_backtest(
+    engine: str = 'vectorized',
+    plot_path: Optional[str] = None,
+    timeframe: Optional[str] = None,
+    fee_income: bool = False,
+) -> None:
+    """
+    Perform backtesting of LP performance and a simple hedge strategy.
+
+    :param engine: 'vectorized' (default) or 'loop' for the reference implementation
+    :param plot_path: Render the charts headless to this PNG/SVG file instead of showing them
+    :param timeframe: Price granularity from the local candle pyramid (default: 15m candles fetched directly)
+    :param fee_income: Credit the LP's share of the swap fees, rebuilt from the swaps and hourly
+        reserves (see src.reserves); by default the LP earns no fees
+    """
+    # Define time interval: Jan 1, 2024 – Jan 1, 2025
+    start_dt, end_dt = datetime(2024, 1, 1), datetime(2025, 1, 1)
+    df_merged = load_merged_data(start_dt, end_dt, timeframe=timeframe)
+
+    with profile_stage('simulate', rows_in=len(df_merged)) as stage:
+        if engine == 'loop':
+            df_merged = run_backtest_loop(df_merged)
+        elif engine == 'vectorized':
+            df_merged = run_backtest_vectorized(df_merged)
+        else:
+            raise ValueError(f"Unknown backtest engine: {engine}")
+        stage['rows_out'] = len(df_merged)
+
+    if fee_income:
+        tracker = load_fee_tracker(start_dt, end_dt)
+        with profile_stage('fee_income', rows_in=len(df_merged)):
+            add_fee_income(df_merged, tracker)
+        logging.info("LP fee income %.2f USDC.", df_merged['cumulative_lp_fee_value'].iloc[-1])
 
-    logging.info("Backtest complete. Sample data:")
-    logging.info("\n%s", df_merged.head())
+    logging.info("Backtest complete.")
+    with profile_stage('metrics', rows_in=len(df_merged)):
+        log_metrics(compute_metrics(df_merged))
 
     # Plot and save results
-    plot_results(df_merged)
-    df_merged.to_csv('data/backtest_results.csv', index=False)
-    logging.info("Backtest results saved to data/backtest_results.csv")
+    with profile_stage('plot', rows_in=len(df_merged)):
+        plot_results(df_merged, plot_path)
+    with profile_stage('save_results', rows_in=len(df_merged)):
+        save_output(df_merged, 'backtest_results')
@@ -0,0 +1,371 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from src.calculations import calc_position_metrics
+from src.candle_store import load_candles
+from src.columnar import read_dataset, write_dataset
+from src.data_fetcher import fetch_binance_candles, fetch_uniswap_pool_data_sharded
+from src.engine import compute_backtest_arrays, add_normalized_columns
+from src.metrics import compute_metrics, log_metrics
+from src.plotting import plot_results
+from src.profiling import profile_stage
+from src.simulation import merge_price_data, save_output
+from src.storage import PartitionedStore
+from src.config import (UNISWAP_POOL_ADDRESS, FEE_RATE, IL_THRESHOLD, ALPHA, INITIAL_ETH, INITIAL_USDC,
+                        PLOT_MAX_POINTS, STAGE_CACHE_DIR, STAGE_CACHE_MAX_BYTES)
+
+# Bump a stage's version when its code changes so stale cache entries stop matching
+STAGE_VERSIONS = {'fetch': 1, 'align': 1, 'valuation': 1, 'hedge': 1, 'metrics': 2, 'plots': 1}
+ENTRY_FILE = 'entry.json'
+# Backtest columns produced by the hedge stage (valuation columns come from their own stage)
+HEDGE_COLUMNS = ['hedge_desired', 'hedge_position', 'hedge_cost', 'cumulative_hedge_cost',
+                 'cumulative_hedge_pnl', 'investor_portfolio']
+
+class StageResult:
+    """
+    Output of one pipeline stage: named frames and files in a cache entry.
+
+    `digest` hashes the output content; downstream stages key on it, so an
+    upstream rerun that produces identical data still hits their cache.
+    Cached frames are read from disk only when asked for, and only the
+    requested columns, so a stage that is skipped costs nothing.
+    """
+
+    __slots__ = ('stage', 'key', 'digest', 'frames', 'path', 'cached')
+
+    def __init__(self, stage: str, key: str, digest: str, frames: Dict[str, Optional[pd.DataFrame]],
+                 path: str, cached: bool):
+        self.stage = stage
+        self.key = key
+        self.digest = digest
+        self.frames = frames
+        self.path = path
+        self.cached = cached
+
+    def frame(self, name: str, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        :param name: Output frame name
+        :param columns: Columns to return (default: all)
+        :return: DataFrame
+        """
+        df = self.frames[name]
+        if df is None:
+            df = read_dataset(os.path.join(self.path, name), columns=columns)
+            if columns is None:
+                self.frames[name] = df
+            return df
+        return df if columns is None else df[list(columns)]
+
+    def file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+def content_digest(frames: Dict[str, pd.DataFrame], files: Sequence[str] = ()) -> str:
+    """
+    Hash of frame contents (column names, dtypes, values) and files.
+
+    :param frames: Name -> DataFrame
+    :param files: Paths of files belonging to the output
+    :return: Hex digest
+    """
+    h = hashlib.blake2b(digest_size=16)
+    for name in sorted(frames):
+        df = frames[name]
+        h.update(json.dumps([name, [str(c) for c in df.columns], [str(t) for t in df.dtypes]]).encode())
+        h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    for path in sorted(files):
+        h.update(os.path.basename(path).encode())
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                h.update(block)
+    return h.hexdigest()
+
+def _dir_bytes(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, names in os.walk(path) for f in names)
+
+class StageCache:
+    """
+    Content-addressed, size-limited cache of stage outputs on disk.
+
+    An entry lives in <root>/<stage>/<key>/ and holds one columnar dataset
+    per output frame, any output files and entry.json (digest, size). Keys
+    hash the stage name and version, its parameters and the digests of its
+    inputs. Reading an entry touches entry.json; when the cache grows past
+    max_bytes the least recently used entries are removed.
+    """
+
+    def __init__(self, root: str = STAGE_CACHE_DIR, max_bytes: int = STAGE_CACHE_MAX_BYTES):
+        """
+        :param root: Cache directory
+        :param max_bytes: Size limit enforced after every store
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+
+    def key(self, stage: str, params: dict, inputs: Sequence[StageResult] = ()) -> str:
+        """
+        :param stage: Stage name
+        :param params: JSON-serializable parameters the stage depends on
+        :param inputs: Upstream results the stage reads
+        :return: Hex cache key
+        """
+        payload = json.dumps({
+            'stage': stage,
+            'version': STAGE_VERSIONS.get(stage, 0),
+            'params': params,
+            'inputs': [result.digest for result in inputs],
+        }, sort_keys=True, default=str)
+        return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+    def _entry_path(self, stage: str, key: str) -> str:
+        return os.path.join(self.root, stage, key)
+
+    def load(self, stage: str, key: str) -> Optional[StageResult]:
+        """
+        :return: The cached result, or None on a miss
+        """
+        path = self._entry_path(stage, key)
+        entry_file = os.path.join(path, ENTRY_FILE)
+        if not os.path.exists(entry_file):
+            return None
+        with open(entry_file) as f:
+            entry = json.load(f)
+        os.utime(entry_file)
+        return StageResult(stage, key, entry['digest'], dict.fromkeys(entry['frames']), path, cached=True)
+
+    def run(
+        self,
+        stage: str,
+        params: dict,
+        inputs: Sequence[StageResult],
+        compute: Callable[[str], Dict[str, pd.DataFrame]],
+        keep: Sequence[str] = (),
+    ) -> StageResult:
+        """
+        Return the cached output of a stage, computing and storing it on a miss.
+
+        :param stage: Stage name
+        :param params: JSON-serializable parameters the stage depends on
+        :param inputs: Upstream results the stage reads
+        :param compute: Called with a scratch directory on a miss; returns the output frames.
+            Files it writes into the directory become part of the entry.
+        :param keep: Entry paths the caller still reads from, protected from the eviction after storing
+        :return: StageResult
+        """
+        key = self.key(stage, params, inputs)
+        result = self.load(stage, key)
+        if result is not None:
+            logging.info("Stage %s: cache hit (%s)", stage, key)
+            return result
+
+        os.makedirs(os.path.join(self.root, stage), exist_ok=True)
+        workdir = tempfile.mkdtemp(prefix=f'.{key}-', dir=os.path.join(self.root, stage))
+        try:
+            frames = compute(workdir)
+            files = [os.path.join(workdir, name) for name in sorted(os.listdir(workdir))]
+            digest = content_digest(frames, files)
+            for name, df in frames.items():
+                write_dataset(os.path.join(workdir, name), df)
+            entry = {'stage': stage, 'key': key, 'digest': digest, 'frames': sorted(frames),
+                     'params': params, 'created': time.time(), 'bytes': _dir_bytes(workdir)}
+            with open(os.path.join(workdir, ENTRY_FILE), 'w') as f:
+                json.dump(entry, f, default=str)
+            path = self._entry_path(stage, key)
+            shutil.rmtree(path, ignore_errors=True)
+            os.replace(workdir, path)
+        except BaseException:
+            shutil.rmtree(workdir, ignore_errors=True)
+            raise
+        logging.info("Stage %s: computed and cached (%s, %.1f MB)", stage, key, entry['bytes'] / 1e6)
+        self.evict(keep={path, *keep})
+        return StageResult(stage, key, digest, frames, path, cached=False)
+
+    def entries(self) -> list:
+        """
+        :return: (last_used, bytes, path) of every entry, least recently used first
+        """
+        found = []
+        for stage in os.listdir(self.root):
+            stage_dir = os.path.join(self.root, stage)
+            if not os.path.isdir(stage_dir):
+                continue
+            for key in os.listdir(stage_dir):
+                entry_file = os.path.join(stage_dir, key, ENTRY_FILE)
+                if os.path.exists(entry_file):
+                    with open(entry_file) as f:
+                        size = json.load(f)['bytes']
+                    found.append((os.path.getmtime(entry_file), size, os.path.dirname(entry_file)))
+        return sorted(found)
+
+    def evict(self, keep: Sequence[str] = ()) -> int:
+        """
+        Remove least recently used entries until the cache fits in max_bytes.
+
+        :param keep: Entry paths that must not be removed
+        :return: Number of entries removed
+        """
+        found = self.entries()
+        total = sum(size for _, size, _ in found)
+        removed = 0
+        for _, size, path in found:
+            if total <= self.max_bytes:
+                break
+            if path in keep:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            removed += 1
+            logging.info("Evicted stage cache entry %s (%.1f MB)", path, size / 1e6)
+        return removed
+
+def run_pipeline(
+    start_dt: datetime,
+    end_dt: datetime,
+    alpha: float = ALPHA,
+    il_threshold: float = IL_THRESHOLD,
+    fee_rate: float = FEE_RATE,
+    eth_amount: float = INITIAL_ETH,
+    usdc_amount: float = INITIAL_USDC,
+    plot_path: Optional[str] = None,
+    pool_address: str = UNISWAP_POOL_ADDRESS,
+    symbol: str = 'ETH/USDC',
+    cache: Optional[StageCache] = None,
+    store: Optional[PartitionedStore] = None,
+    timeframe: Optional[str] = None,
+    save_inputs: bool = False,
+) -> Tuple[pd.DataFrame, dict]:
+    """
+    Run the backtest as cached stages: fetch, align, valuation, hedge, metrics, plots.
+
+    Each stage reruns only when its parameters or the content of its inputs
+    changed, so e.g. a new ALPHA reuses the fetched, aligned and valued data
+    and recomputes only hedge, metrics and plots.
+
+    :param start_dt: Start of the backtest period
+    :param end_dt: End of the backtest period
+    :param alpha: Hedge fraction of the LP's ETH exposure
+    :param il_threshold: Impermanent loss threshold (percentage) that triggers the hedge
+    :param fee_rate: Fee rate applied to the notional of each hedge adjustment
+    :param eth_amount: Initial ETH amount of the LP position
+    :param usdc_amount: Initial USDC amount of the LP position
+    :param plot_path: Render the charts to this file (plots stage is skipped without it)
+    :param pool_address: Uniswap V2 pair address
+    :param symbol: Binance symbol pricing the pool's volatile token
+    :param cache: Stage cache (default: one rooted at STAGE_CACHE_DIR)
+    :param store: Local partitioned store used by the fetch stage
+    :param timeframe: Price granularity from the local candle pyramid (default: 15m candles fetched directly)
+    :param save_inputs: Also save the fetched candles and swaps as data/eth_candles and data/uniswap_pool_data,
+        like simulate_backtest, whether or not the fetch stage hit the cache
+    :return: (results frame with the same columns as the vectorized backtest of the merged data, metrics)
+    """
+    if cache is None:
+        cache = StageCache()
+
+    def fetch(_):
+        fetch_store = store or PartitionedStore()
+        since, end_time = int(start_dt.timestamp() * 1000), int(end_dt.timestamp() * 1000)
+        if timeframe is None:
+            df_eth = fetch_binance_candles(symbol=symbol, since=since, end_time=end_time, store=fetch_store)
+        else:
+            df_eth = load_candles(symbol, timeframe, since, end_time, store=fetch_store)
+        df_pool = fetch_uniswap_pool_data_sharded(pool_address, int(start_dt.timestamp()),
+                                                  int(end_dt.timestamp()), store=fetch_store)
+        return {'candles': df_eth, 'swaps': df_pool}
+
+    def align(_):
+        return {'merged': merge_price_data(fetched.frame('swaps'), fetched.frame('candles'))}
+
+    def valuation(_):
+        prices = aligned.frame('merged', ['eth_price'])['eth_price'].to_numpy(dtype=np.float64)
+        v_lp, v_hold, il_pct, lp_eth, _ = calc_position_metrics(prices, eth_amount, usdc_amount)
+        return {'valuation': pd.DataFrame({'V_LP': v_lp, 'V_hold': v_hold, 'IL_pct': il_pct, 'lp_eth': lp_eth})}
+
+    def hedge(_):
+        df_val = valued.frame('valuation')
+        columns = compute_backtest_arrays(
+            aligned.frame('merged', ['eth_price'])['eth_price'].to_numpy(dtype=np.float64),
+            alpha=alpha,
+            il_threshold=il_threshold,
+            fee_rate=fee_rate,
+            eth_amount=eth_amount,
+            usdc_amount=usdc_amount,
+            position_metrics=tuple(df_val[c].to_numpy() for c in ('V_LP', 'V_hold', 'IL_pct', 'lp_eth')),
+        )
+        return {'hedge': pd.DataFrame({name: columns[name] for name in HEDGE_COLUMNS})}
+
+    def metrics(_):
+        df_hedge = hedged.frame('hedge', ['investor_portfolio', 'hedge_position', 'cumulative_hedge_cost',
+                                          'cumulative_hedge_pnl'])
+        df_merged = aligned.frame('merged', ['timestamp', 'eth_price'])
+        df_hedge = df_hedge.assign(V_hold=valued.frame('valuation', ['V_hold'])['V_hold'].to_numpy(),
+                                   eth_price=df_merged['eth_price'].to_numpy(),
+                                   timestamp=df_merged['timestamp'].to_numpy())
+        return {'metrics': pd.DataFrame([compute_metrics(df_hedge)])}
+
+    # Entries of this run are read lazily by later stages, so none of them may be evicted meanwhile
+    used = set()
+
+    def run(name, params, inputs, compute, rows_in=None):
+        with profile_stage(name, rows_in=rows_in) as record:
+            result = cache.run(name, params, inputs, compute, keep=used)
+            used.add(result.path)
+            record['cache'] = 'hit' if result.cached else 'miss'
+            if not result.cached:
+                record['rows_out'] = sum(len(df) for df in result.frames.values())
+        return result
+
+    fetched = run('fetch', {'pool': pool_address, 'symbol': symbol, 'timeframe': timeframe,
+                            'start': start_dt.isoformat(), 'end': end_dt.isoformat()}, [], fetch)
+    if save_inputs:
+        for name, dataset in (('candles', 'eth_candles'), ('swaps', 'uniswap_pool_data')):
+            df = fetched.frame(name)
+            with profile_stage(f'save_{name}', rows_in=len(df)):
+                save_output(df, dataset)
+    aligned = run('align', {}, [fetched], align)
+    valued = run('valuation', {'eth_amount': eth_amount, 'usdc_amount': usdc_amount}, [aligned], valuation)
+    hedged = run('hedge', {'alpha': alpha, 'il_threshold': il_threshold, 'fee_rate': fee_rate},
+                 [aligned, valued], hedge)
+    measured = run('metrics', {}, [aligned, valued, hedged], metrics)
+
+    df_val = valued.frame('valuation').drop(columns='lp_eth')
+    df_results = pd.concat([aligned.frame('merged'), df_val, hedged.frame('hedge')], axis=1)
+    add_normalized_columns(df_results)
+
+    if plot_path is not None:
+        def plots(workdir):
+            plot_results(df_results, os.path.join(workdir, 'plot' + os.path.splitext(plot_path)[1]),
+                         il_threshold=il_threshold)
+            return {}
+
+        plotted = run('plots', {'max_points': PLOT_MAX_POINTS, 'il_threshold': il_threshold,
+                                'format': os.path.splitext(plot_path)[1]}, [aligned, valued, hedged], plots)
+        directory = os.path.dirname(plot_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        shutil.copyfile(plotted.file('plot' + os.path.splitext(plot_path)[1]), plot_path)
+    return df_results, measured.frame('metrics').iloc[0].to_dict()
+
+def simulate_backtest_cached(plot_path: Optional[str] = None, timeframe: Optional[str] = None) -> None:
+    """
+    simulate_backtest on top of the stage cache: same period, outputs and plots.
+
+    :param plot_path: Render the charts headless to this PNG/SVG file instead of showing them
+    :param timeframe: Price granularity from the local candle pyramid (default: 15m candles fetched directly)
+    """
+    df_results, metrics = run_pipeline(datetime(2024, 1, 1), datetime(2025, 1, 1), plot_path=plot_path,
+                                       timeframe=timeframe, save_inputs=True)
+    logging.info("Backtest complete.")
+    log_metrics(metrics)
+    if plot_path is None:
+        with profile_stage('plot', rows_in=len(df_results)):
+            plot_results(df_results)
+    with profile_stage('save_results', rows_in=len(df_results)):
+        save_output(df_results, 'backtest_results')
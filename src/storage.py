@@ -0,0 +1,257 @@
+import itertools
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import pandas as pd
+from src.config import CACHE_DIR
+
+SECONDS_PER_DAY = 86400
+
+def current_day_start() -> int:
+    """
+    :return: Unix timestamp (seconds) of the start of the current UTC day
+    """
+    now = int(time.time())
+    return now - now % SECONDS_PER_DAY
+
+class PartitionedStore:
+    """
+    Local time-partitioned store with one file per UTC day and dataset key.
+
+    Keys are slash-separated paths such as 'candles/binance/ETH-USDC/15m' or
+    'swaps/<pool address>'. A partition file is only written for days that
+    are fully in the past, so its presence means the day is complete.
+    """
+
+    def __init__(self, root: str = CACHE_DIR):
+        """
+        :param root: Root directory of the store
+        """
+        self.root = root
+
+    def partition_path(self, key: str, day_start: int) -> str:
+        """
+        :param key: Dataset key
+        :param day_start: Unix timestamp (seconds) of the UTC day start
+        :return: Path of the partition file for that day
+        """
+        day = datetime.fromtimestamp(day_start, tz=timezone.utc).strftime('%Y-%m-%d')
+        return os.path.join(self.root, key, f"{day}.csv")
+
+    def has_day(self, key: str, day_start: int) -> bool:
+        return os.path.exists(self.partition_path(key, day_start))
+
+    def missing_ranges(self, key: str, start: int, end: int) -> List[Tuple[int, int]]:
+        """
+        Find the day-aligned time ranges in [start, end] that are not stored yet.
+
+        :param key: Dataset key
+        :param start: Start Unix timestamp in seconds
+        :param end: End Unix timestamp in seconds (inclusive)
+        :return: List of (range_start, range_end) pairs, end exclusive, merged when adjacent
+        """
+        ranges = []
+        day = start - start % SECONDS_PER_DAY
+        while day <= end:
+            if not self.has_day(key, day):
+                if ranges and ranges[-1][1] == day:
+                    ranges[-1] = (ranges[-1][0], day + SECONDS_PER_DAY)
+                else:
+                    ranges.append((day, day + SECONDS_PER_DAY))
+            day += SECONDS_PER_DAY
+        return ranges
+
+    def _write_partition(self, key: str, day: int, df: pd.DataFrame) -> None:
+        path = self.partition_path(key, day)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        df.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, path)
+
+    def write_stream(
+        self,
+        key: str,
+        chunks: Iterable[pd.DataFrame],
+        range_start: int,
+        range_end: int,
+        columns: Sequence[str],
+    ) -> pd.DataFrame:
+        """
+        Write time-ordered chunks into daily partitions as soon as each day is complete.
+
+        Only the rows of the day currently being filled are buffered, so memory
+        does not grow with the length of the range. Days with no rows before
+        the last fetched row are written as header-only files so they are not
+        fetched again; empty days after it are not, since a fetch that stopped
+        early looks the same as a quiet tail. Days that have not finished yet
+        are not persisted.
+
+        :param key: Dataset key
+        :param chunks: Frames covering [range_start, range_end) in timestamp order,
+            each with a datetime 'timestamp' column
+        :param range_start: Day-aligned start of the fetched range (seconds)
+        :param range_end: Day-aligned exclusive end of the fetched range (seconds)
+        :param columns: Column layout of the dataset
+        :return: Rows of unfinished days, which were not written
+        """
+        complete_before = current_day_start()
+        columns = list(columns)
+        next_day = range_start
+        last_day = None
+        pending = pd.DataFrame(columns=columns)
+
+        def flush(until_day: int) -> None:
+            nonlocal next_day, pending
+            if pending.empty:
+                day_of_row = pd.Series([], dtype='int64')
+            else:
+                seconds = pending['timestamp'].astype('datetime64[s]').astype('int64')
+                day_of_row = seconds - seconds % SECONDS_PER_DAY
+            while next_day < min(until_day, complete_before, range_end):
+                self._write_partition(key, next_day, pending.loc[(day_of_row == next_day).to_numpy(), columns])
+                next_day += SECONDS_PER_DAY
+            pending = pending.loc[(day_of_row >= next_day).to_numpy()]
+
+        for chunk in chunks:
+            if chunk.empty:
+                continue
+            frames = [frame for frame in (pending, chunk[columns]) if not frame.empty]
+            pending = pd.concat(frames, ignore_index=True)
+            last_second = int(pending['timestamp'].iloc[-1].timestamp())
+            last_day = last_second - last_second % SECONDS_PER_DAY
+            # Rows arrive in time order, so every day before the last row's day is complete
+            flush(last_day)
+        if last_day is not None:
+            # Days after the last row's day were not provably covered by the fetch
+            flush(last_day + SECONDS_PER_DAY)
+        return pending
+
+    def iter_days(
+        self, key: str, start: int, end: int, dtype: Optional[Dict[str, str]] = None
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Yield the stored partitions overlapping [start, end] one day at a time.
+
+        :param key: Dataset key
+        :param start: Start Unix timestamp in seconds
+        :param end: End Unix timestamp in seconds (inclusive)
+        :param dtype: Optional column dtypes passed to the CSV reader
+        :return: Iterator of non-empty daily frames in day order (not filtered to the exact range)
+        """
+        day = start - start % SECONDS_PER_DAY
+        while day <= end:
+            path = self.partition_path(key, day)
+            if os.path.exists(path):
+                frame = pd.read_csv(path, dtype=dtype, parse_dates=['timestamp'], float_precision='round_trip')
+                # Days without rows are stored as header-only files; concatenating them would make every column object
+                if not frame.empty:
+                    yield frame
+            day += SECONDS_PER_DAY
+
+    def read(self, key: str, start: int, end: int, dtype: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+        """
+        Load all stored partitions overlapping [start, end].
+
+        :param key: Dataset key
+        :param start: Start Unix timestamp in seconds
+        :param end: End Unix timestamp in seconds (inclusive)
+        :param dtype: Optional column dtypes passed to the CSV reader
+        :return: Concatenated DataFrame (not filtered to the exact range)
+        """
+        frames = list(self.iter_days(key, start, end, dtype=dtype))
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
+
+    def iter_through(
+        self,
+        key: str,
+        start: int,
+        end: int,
+        iter_range: Callable[[int, int], Iterable[pd.DataFrame]],
+        columns: Sequence[str],
+        dtype: Optional[Dict[str, str]] = None,
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Yield [start, end] day by day from the store, streaming only the missing days into it first.
+
+        Missing days are fetched on the first next(). Only one stored day and
+        the rows of unfinished days (which are not persisted) are held at a
+        time, so the range can be longer than what fits in memory.
+
+        :param key: Dataset key
+        :param start: Start Unix timestamp in seconds
+        :param end: End Unix timestamp in seconds (inclusive)
+        :param iter_range: Callable(range_start, range_end) yielding time-ordered chunks
+            of the rows in [range_start, range_end)
+        :param columns: Column layout of the dataset
+        :param dtype: Optional column dtypes passed to the CSV reader
+        :return: Iterator of non-empty frames with the rows in [start, end], in time order
+        """
+        unfinished = []
+        for range_start, range_end in self.missing_ranges(key, start, end):
+            logging.info("Cache miss for %s: fetching %s to %s.", key,
+                         datetime.fromtimestamp(range_start, tz=timezone.utc),
+                         datetime.fromtimestamp(range_end, tz=timezone.utc))
+            # Rows of the current day are not persisted, keep them from this fetch
+            unfinished.append(self.write_stream(key, iter_range(range_start, range_end),
+                                                range_start, range_end, columns))
+
+        lower, upper = pd.to_datetime(start, unit='s'), pd.to_datetime(end, unit='s')
+        for frame in itertools.chain(self.iter_days(key, start, end, dtype=dtype), unfinished):
+            frame = frame[(frame['timestamp'] >= lower) & (frame['timestamp'] <= upper)]
+            if not frame.empty:
+                yield frame.reset_index(drop=True)
+
+    def stream_through(
+        self,
+        key: str,
+        start: int,
+        end: int,
+        iter_range: Callable[[int, int], Iterable[pd.DataFrame]],
+        columns: Sequence[str],
+        dtype: Optional[Dict[str, str]] = None,
+    ) -> pd.DataFrame:
+        """
+        iter_through collected into one DataFrame.
+
+        :param key: Dataset key
+        :param start: Start Unix timestamp in seconds
+        :param end: End Unix timestamp in seconds (inclusive)
+        :param iter_range: Callable(range_start, range_end) yielding time-ordered chunks
+            of the rows in [range_start, range_end)
+        :param columns: Column layout of the dataset
+        :param dtype: Optional column dtypes passed to the CSV reader
+        :return: DataFrame with the rows in [start, end]
+        """
+        frames = list(self.iter_through(key, start, end, iter_range, columns, dtype=dtype))
+        if not frames:
+            return pd.DataFrame(columns=list(columns))
+        return pd.concat(frames, ignore_index=True)
+
+    def fetch_through(
+        self,
+        key: str,
+        start: int,
+        end: int,
+        fetch_range: Callable[[int, int], pd.DataFrame],
+        columns: Sequence[str],
+        dtype: Optional[Dict[str, str]] = None,
+    ) -> pd.DataFrame:
+        """
+        Read [start, end] from the store, fetching only the days that are missing.
+
+        :param key: Dataset key
+        :param start: Start Unix timestamp in seconds
+        :param end: End Unix timestamp in seconds (inclusive)
+        :param fetch_range: Callable(range_start, range_end) returning rows in [range_start, range_end)
+        :param columns: Column layout of the dataset
+        :param dtype: Optional column dtypes passed to the CSV reader
+        :return: DataFrame with the rows in [start, end]
+        """
+        return self.stream_through(
+            key, start, end, lambda range_start, range_end: [fetch_range(range_start, range_end)],
+            columns, dtype=dtype,
+        )
@@ -0,0 +1,93 @@
+import logging
+from typing import Iterator, Optional
+import numpy as np
+import pandas as pd
+from src.alignment import PriceIndex
+from src.columnar import DatasetWriter, iter_dataset
+from src.engine import BacktestState, compute_backtest_arrays, add_normalized_columns
+from src.metrics import MetricsAccumulator
+from src.config import FEE_RATE, IL_THRESHOLD, ALPHA, INITIAL_ETH, INITIAL_USDC
+
+# Default number of swaps processed per chunk
+STREAM_CHUNK_ROWS = 250_000
+
+def iter_merged_chunks(
+    swaps_path: str,
+    df_eth: pd.DataFrame,
+    chunk_rows: int = STREAM_CHUNK_ROWS,
+    index: Optional[PriceIndex] = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Read a swap dataset in fixed-size chunks and attach the latest ETH close to each swap.
+
+    The swap dataset must be sorted by timestamp. Every chunk is looked up
+    in the same PriceIndex, so the chunks concatenate to the same frame
+    src.simulation.merge_price_data builds in memory.
+
+    :param swaps_path: Columnar dataset of swaps (e.g. data/uniswap_pool_data)
+    :param df_eth: Binance candles with 'timestamp' and 'close' columns
+    :param chunk_rows: Swaps per chunk
+    :param index: Prebuilt PriceIndex of the candles, reused instead of building one from df_eth
+    :return: Iterator of merged DataFrames with an 'eth_price' column
+    """
+    if index is None:
+        index = PriceIndex.from_candles(df_eth)
+    for df_chunk in iter_dataset(swaps_path, chunk_rows=chunk_rows):
+        df_merged = df_chunk.sort_values('timestamp', kind='stable', ignore_index=True)
+        df_merged['eth_price'] = index.lookup(df_merged['timestamp'])
+        yield df_merged
+
+def run_streaming_backtest(
+    chunks: Iterator[pd.DataFrame],
+    output_path: str,
+    alpha: float = ALPHA,
+    il_threshold: float = IL_THRESHOLD,
+    fee_rate: float = FEE_RATE,
+    eth_amount: float = INITIAL_ETH,
+    usdc_amount: float = INITIAL_USDC,
+    compress: bool = False,
+    metrics: Optional[MetricsAccumulator] = None,
+) -> Optional[BacktestState]:
+    """
+    Run the backtest chunk by chunk, writing each chunk's results as it is produced.
+
+    Only the current chunk and a BacktestState (current hedge, last price,
+    cumulative cost and PnL, initial holding value) are kept in memory, so
+    peak memory depends on the chunk size rather than on the history length.
+    The written dataset is identical to src.engine.run_backtest_vectorized
+    on the concatenated input.
+
+    :param chunks: Merged frames with an 'eth_price' column, in time order
+    :param output_path: Columnar dataset to write the results to
+    :param alpha: Hedge fraction of the LP's ETH exposure
+    :param il_threshold: Impermanent loss threshold (percentage) that triggers the hedge
+    :param fee_rate: Fee rate applied to the notional of each hedge adjustment
+    :param eth_amount: Initial ETH amount of the LP position
+    :param usdc_amount: Initial USDC amount of the LP position
+    :param compress: Write compressed parts
+    :param metrics: Accumulator to feed each result chunk to, for metrics without rereading the output
+    :return: Final state of the run (None if there were no rows)
+    """
+    state = BacktestState()
+    rows = 0
+    with DatasetWriter(output_path, compress=compress) as writer:
+        for df_chunk in chunks:
+            if df_chunk.empty:
+                continue
+            columns = compute_backtest_arrays(
+                df_chunk['eth_price'].to_numpy(dtype=np.float64),
+                alpha=alpha,
+                il_threshold=il_threshold,
+                fee_rate=fee_rate,
+                eth_amount=eth_amount,
+                usdc_amount=usdc_amount,
+                state=state,
+            )
+            for name, values in columns.items():
+                df_chunk[name] = values
+            writer.append(add_normalized_columns(df_chunk, state.initial_hold))
+            if metrics is not None:
+                metrics.update(df_chunk)
+            rows += len(df_chunk)
+            logging.info("Streamed %d rows.", rows)
+    return state if rows else None
@@ -0,0 +1,186 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from multiprocessing import shared_memory
+from multiprocessing.util import Finalize
+from typing import Optional, Sequence
+import numpy as np
+import pandas as pd
+from src.calculations import calc_position_metrics
+from src.incremental import unit_hedge_paths
+from src.metrics import RunningMoments
+from src.config import INITIAL_ETH, INITIAL_USDC
+
+# Memory budget for one block of combinations including all temporaries
+SWEEP_BLOCK_BYTES = 64 * 1024 * 1024
+# float64 (combinations x events) arrays alive at once while a block is evaluated
+SWEEP_TEMPORARIES = 4
+
+# Price array attached from shared memory in each worker process
+_worker_shm = None
+_worker_prices = None
+
+def attach_prices(shm_name: str, length: int) -> None:
+    """
+    Process pool initializer: map the parent's price array without copying it.
+
+    Pools of other modules (e.g. src.walk_forward) use it too and read the
+    array back with worker_prices().
+
+    :param shm_name: Name of the shared memory block holding the prices
+    :param length: Number of float64 prices in the block
+    """
+    global _worker_shm, _worker_prices
+    _worker_shm = shared_memory.SharedMemory(name=shm_name)
+    _worker_prices = np.ndarray((length,), dtype=np.float64, buffer=_worker_shm.buf)
+    # Pool workers leave through os._exit, which skips atexit; multiprocessing finalizers still run
+    Finalize(None, _detach_prices, exitpriority=10)
+
+def _detach_prices() -> None:
+    global _worker_shm, _worker_prices
+    # The view must go first: a mapping with exported buffers cannot be closed
+    _worker_prices = None
+    if _worker_shm is not None:
+        _worker_shm.close()
+        _worker_shm = None
+
+def worker_prices() -> np.ndarray:
+    """
+    :return: Price array mapped by attach_prices in this worker process
+    """
+    if _worker_prices is None:
+        raise RuntimeError("No price array attached; use attach_prices as the pool initializer")
+    return _worker_prices
+
+def sweep_threshold(
+    prices: np.ndarray,
+    il_threshold: float,
+    alphas: Sequence[float],
+    fee_rates: Sequence[float],
+    eth_amount: float,
+    usdc_amount: float,
+) -> list:
+    """
+    Evaluate every (alpha, fee_rate) pair for a single IL threshold.
+
+    Final values, fees and PnL follow from the unit-alpha paths
+    (see src.incremental); only the volatility needs a full pass per
+    combination, which is done in broadcast blocks.
+
+    :param prices: 1-D array of ETH prices
+    :param il_threshold: Impermanent loss threshold (percentage)
+    :param alphas: Hedge fractions to evaluate
+    :param fee_rates: Fee rates to evaluate
+    :param eth_amount: Initial ETH amount of the LP position
+    :param usdc_amount: Initial USDC amount of the LP position
+    :return: List of result rows (dicts)
+    """
+    v_lp, v_hold, il_pct, lp_eth, _ = calc_position_metrics(prices, eth_amount, usdc_amount)
+    initial_hold = v_hold[0]
+
+    unit_pnl, unit_turnover = unit_hedge_paths(prices, il_pct, lp_eth, il_threshold)
+
+    combos = list(product(alphas, fee_rates))
+    block = max(1, SWEEP_BLOCK_BYTES // (8 * SWEEP_TEMPORARIES * len(prices)))
+    rows = []
+    for start in range(0, len(combos), block):
+        chunk = combos[start:start + block]
+        alpha = np.array([c[0] for c in chunk])[:, None]
+        fee = np.array([c[1] for c in chunk])[:, None]
+        portfolio = v_lp + alpha * unit_pnl - (alpha * fee) * unit_turnover
+        # Same per-path moments as MetricsAccumulator, one row per combination
+        moments = RunningMoments()
+        moments.update(portfolio[:, 1:] / portfolio[:, :-1] - 1)
+        volatility = moments.std() if moments.n > 1 else np.full(len(chunk), np.nan)
+        for j, (a, f) in enumerate(chunk):
+            rows.append({
+                'alpha': a,
+                'il_threshold': il_threshold,
+                'fee_rate': f,
+                'final_value_norm': portfolio[j, -1] / initial_hold,
+                'total_hedge_cost': a * f * unit_turnover[-1],
+                'hedge_pnl': a * unit_pnl[-1],
+                'volatility': volatility[j],
+            })
+    return rows
+
+def _sweep_task(
+    il_threshold: float,
+    alphas: Sequence[float],
+    fee_rates: Sequence[float],
+    eth_amount: float,
+    usdc_amount: float,
+) -> list:
+    """
+    Worker entry point: evaluate one threshold against the shared price array.
+    """
+    return sweep_threshold(worker_prices(), il_threshold, alphas, fee_rates, eth_amount, usdc_amount)
+
+def run_parameter_sweep(
+    prices: np.ndarray,
+    alphas: Sequence[float],
+    il_thresholds: Sequence[float],
+    fee_rates: Sequence[float],
+    eth_amount: float = INITIAL_ETH,
+    usdc_amount: float = INITIAL_USDC,
+    max_workers: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Evaluate a full ALPHA x IL_THRESHOLD x FEE_RATE grid over one merged price series.
+
+    Thresholds (split further by alpha when there are fewer thresholds than
+    workers) are distributed across a process pool. The price array is placed
+    in shared memory once and mapped by every worker instead of being pickled.
+
+    :param prices: 1-D array of ETH prices (e.g. df_merged['eth_price'])
+    :param alphas: Hedge fractions to evaluate
+    :param il_thresholds: Impermanent loss thresholds (percentage) to evaluate
+    :param fee_rates: Fee rates to evaluate
+    :param eth_amount: Initial ETH amount of the LP position
+    :param usdc_amount: Initial USDC amount of the LP position
+    :param max_workers: Number of worker processes (default: all cores, 1 runs in-process)
+    :return: Tidy DataFrame with one row per parameter combination
+    """
+    prices = np.ascontiguousarray(prices, dtype=np.float64)
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+
+    alpha_splits = max(1, min(len(alphas), max_workers // max(1, len(il_thresholds))))
+    tasks = [
+        (threshold, list(alpha_chunk))
+        for threshold in il_thresholds
+        for alpha_chunk in np.array_split(np.asarray(alphas, dtype=float), alpha_splits)
+        if len(alpha_chunk)
+    ]
+    logging.info("Sweeping %d combinations in %d tasks over %d prices.",
+                 len(alphas) * len(il_thresholds) * len(fee_rates), len(tasks), len(prices))
+
+    rows = []
+    if max_workers <= 1 or len(tasks) <= 1:
+        for threshold, alpha_chunk in tasks:
+            rows.extend(sweep_threshold(prices, threshold, alpha_chunk, fee_rates, eth_amount, usdc_amount))
+    else:
+        shm = shared_memory.SharedMemory(create=True, size=prices.nbytes)
+        try:
+            np.ndarray(prices.shape, dtype=np.float64, buffer=shm.buf)[:] = prices
+            with ProcessPoolExecutor(
+                max_workers=max_workers,
+                initializer=attach_prices,
+                initargs=(shm.name, len(prices)),
+            ) as pool:
+                futures = [
+                    pool.submit(_sweep_task, threshold, alpha_chunk, fee_rates, eth_amount, usdc_amount)
+                    for threshold, alpha_chunk in tasks
+                ]
+                for future in futures:
+                    rows.extend(future.result())
+        finally:
+            shm.close()
+            shm.unlink()
+
+    df = pd.DataFrame(rows, columns=[
+        'alpha', 'il_threshold', 'fee_rate', 'final_value_norm',
+        'total_hedge_cost', 'hedge_pnl', 'volatility',
+    ])
+    return df.sort_values(['alpha', 'il_threshold', 'fee_rate'], ignore_index=True)
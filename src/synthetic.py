@@ -0,0 +1,185 @@
+from typing import Optional
+import numpy as np
+import pandas as pd
+from src.data_fetcher import CANDLE_COLUMNS, SWAP_COLUMNS
+
+# Default synthetic market: ETH around 2024 levels, ~65% annualized volatility
+SYNTHETIC_START = '2024-01-01'
+SYNTHETIC_PRICE = 2300.0
+SYNTHETIC_ANNUAL_VOL = 0.65
+SECONDS_PER_YEAR = 365 * 24 * 3600
+
+def gbm_log_returns(
+    n_steps: int,
+    n_paths: int = 1,
+    dt_seconds: float = 900.0,
+    annual_vol: float = SYNTHETIC_ANNUAL_VOL,
+    annual_drift: float = 0.0,
+    rng: Optional[np.random.Generator] = None,
+) -> np.ndarray:
+    """
+    Draw log returns of a geometric Brownian motion.
+
+    :param n_steps: Steps per path
+    :param n_paths: Number of paths
+    :param dt_seconds: Step length in seconds
+    :param annual_vol: Annualized volatility
+    :param annual_drift: Annualized drift
+    :param rng: Random generator (default: unseeded)
+    :return: Array of shape (n_paths, n_steps)
+    """
+    rng = rng or np.random.default_rng()
+    dt = dt_seconds / SECONDS_PER_YEAR
+    drift = (annual_drift - 0.5 * annual_vol ** 2) * dt
+    return drift + annual_vol * np.sqrt(dt) * rng.standard_normal((n_paths, n_steps))
+
+def jump_diffusion_log_returns(
+    n_steps: int,
+    n_paths: int = 1,
+    dt_seconds: float = 900.0,
+    annual_vol: float = SYNTHETIC_ANNUAL_VOL,
+    annual_drift: float = 0.0,
+    jump_intensity: float = 12.0,
+    jump_mean: float = -0.05,
+    jump_vol: float = 0.08,
+    rng: Optional[np.random.Generator] = None,
+) -> np.ndarray:
+    """
+    Draw log returns of a Merton jump-diffusion.
+
+    A GBM whose steps also carry a Poisson number of normally distributed
+    log jumps; the drift is compensated so the expected price growth still
+    equals annual_drift.
+
+    :param n_steps: Steps per path
+    :param n_paths: Number of paths
+    :param dt_seconds: Step length in seconds
+    :param annual_vol: Annualized diffusion volatility
+    :param annual_drift: Annualized drift
+    :param jump_intensity: Expected jumps per year
+    :param jump_mean: Mean log jump size
+    :param jump_vol: Standard deviation of the log jump size
+    :param rng: Random generator (default: unseeded)
+    :return: Array of shape (n_paths, n_steps)
+    """
+    rng = rng or np.random.default_rng()
+    dt = dt_seconds / SECONDS_PER_YEAR
+    compensator = jump_intensity * (np.exp(jump_mean + 0.5 * jump_vol ** 2) - 1)
+    log_returns = gbm_log_returns(n_steps, n_paths, dt_seconds, annual_vol, annual_drift - compensator, rng)
+    jumps = rng.poisson(jump_intensity * dt, size=log_returns.shape)
+    hit = jumps > 0
+    counts = jumps[hit]
+    log_returns[hit] += counts * jump_mean + np.sqrt(counts) * jump_vol * rng.standard_normal(len(counts))
+    return log_returns
+
+def bootstrap_log_returns(
+    returns: np.ndarray,
+    n_steps: int,
+    n_paths: int = 1,
+    block: int = 96,
+    rng: Optional[np.random.Generator] = None,
+) -> np.ndarray:
+    """
+    Resample historical log returns in contiguous blocks (moving block bootstrap).
+
+    Blocks keep short-range structure such as volatility clustering.
+
+    :param returns: Historical log returns (1-D)
+    :param n_steps: Steps per path
+    :param n_paths: Number of paths
+    :param block: Block length in steps
+    :param rng: Random generator (default: unseeded)
+    :return: Array of shape (n_paths, n_steps)
+    """
+    rng = rng or np.random.default_rng()
+    returns = np.asarray(returns, dtype=np.float64)
+    block = max(1, min(block, len(returns)))
+    n_blocks = -(-n_steps // block)
+    starts = rng.integers(0, len(returns) - block + 1, size=(n_paths, n_blocks))
+    idx = (starts[:, :, None] + np.arange(block)).reshape(n_paths, -1)[:, :n_steps]
+    return returns[idx]
+
+def generate_candles(
+    n: int,
+    seed: int = 0,
+    timeframe_seconds: int = 900,
+    start: str = SYNTHETIC_START,
+    start_price: float = SYNTHETIC_PRICE,
+    returns: Optional[np.ndarray] = None,
+) -> pd.DataFrame:
+    """
+    Generate OHLCV candles with the schema of fetch_binance_candles.
+
+    Closes follow a GBM, or a block bootstrap of `returns` when given.
+    Opens are the previous close; highs and lows bracket open and close.
+
+    :param n: Number of candles
+    :param seed: Random seed
+    :param timeframe_seconds: Candle length in seconds (default 15m)
+    :param start: First candle timestamp
+    :param start_price: Price before the first candle
+    :param returns: Historical log returns to bootstrap instead of using GBM
+    :return: DataFrame with timestamp, open, high, low, close, volume
+    """
+    rng = np.random.default_rng(seed)
+    if returns is None:
+        log_returns = gbm_log_returns(n, dt_seconds=timeframe_seconds, rng=rng)[0]
+    else:
+        log_returns = bootstrap_log_returns(returns, n, rng=rng)[0]
+    close = start_price * np.exp(np.cumsum(log_returns))
+    open_ = np.r_[start_price, close[:-1]]
+    wick = np.abs(rng.standard_normal(n)) * np.abs(log_returns).mean() * close
+    timestamps = pd.Timestamp(start) + pd.to_timedelta(np.arange(n, dtype=np.int64) * timeframe_seconds, unit='s')
+    return pd.DataFrame({
+        'timestamp': timestamps,
+        'open': open_,
+        'high': np.maximum(open_, close) + wick,
+        'low': np.minimum(open_, close) - wick,
+        'close': close,
+        'volume': rng.gamma(2.0, 50.0, n),
+    }, columns=CANDLE_COLUMNS)
+
+def generate_swaps(
+    n: int,
+    candles: pd.DataFrame,
+    seed: int = 0,
+    as_strings: bool = True,
+) -> pd.DataFrame:
+    """
+    Generate swap events with the schema of fetch_uniswap_pool_data_paginated.
+
+    Swaps fall uniformly at random inside the candles' time span (sorted),
+    trade either direction at roughly the candle close, and carry amounts
+    as decimal strings like The Graph returns them.
+
+    :param n: Number of swaps
+    :param candles: Candles defining the time span and reference prices
+    :param seed: Random seed
+    :param as_strings: Format ids and amounts as strings; when False they stay
+        int64/float64, which is much faster and smaller beyond ~1e6 rows
+    :return: DataFrame with id, timestamp, amount0In, amount1In, amount0Out, amount1Out
+    """
+    rng = np.random.default_rng(seed)
+    first = candles['timestamp'].iloc[0].value // 10 ** 9
+    last = candles['timestamp'].iloc[-1].value // 10 ** 9
+    seconds = np.sort(rng.integers(first, last + 1, size=n))
+    price_idx = np.searchsorted(candles['timestamp'].to_numpy().astype('datetime64[s]').astype(np.int64),
+                                seconds, side='right') - 1
+    price = candles['close'].to_numpy()[np.maximum(price_idx, 0)]
+
+    usdc = rng.lognormal(7.0, 1.5, n)
+    eth = usdc / price * (1 - 0.003)
+    buy_eth = rng.random(n) < 0.5
+    zero = np.zeros(n)
+    amounts = {
+        'amount0In': np.where(buy_eth, usdc, zero),
+        'amount1In': np.where(buy_eth, zero, eth),
+        'amount0Out': np.where(buy_eth, zero, usdc),
+        'amount1Out': np.where(buy_eth, eth, zero),
+    }
+    ids = np.arange(n, dtype=np.int64)
+    if as_strings:
+        ids = np.char.add(np.char.add('0x', np.char.mod('%064x', ids)), '-0')
+        amounts = {name: values.astype(str) for name, values in amounts.items()}
+    df = pd.DataFrame({'id': ids, 'timestamp': pd.to_datetime(seconds, unit='s'), **amounts})
+    return df[SWAP_COLUMNS]
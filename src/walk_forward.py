@@ -0,0 +1,220 @@
+import argparse
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from src.alignment import to_epoch_ns
+from src.columnar import read_dataset, write_dataset
+from src.engine import BacktestState, compute_backtest_arrays, add_normalized_columns
+from src.sweep import attach_prices, sweep_threshold, worker_prices
+from src.config import FEE_RATE, IL_THRESHOLD, ALPHA, INITIAL_ETH, INITIAL_USDC
+
+# Sweep result columns a fold can be optimized for, and those where lower is better
+OBJECTIVES = ('final_value_norm', 'total_hedge_cost', 'hedge_pnl', 'volatility')
+MINIMIZE_OBJECTIVES = {'total_hedge_cost', 'volatility'}
+
+def make_folds(
+    timestamps: np.ndarray,
+    train_window: pd.Timedelta,
+    test_window: pd.Timedelta,
+    anchored: bool = False,
+) -> List[Tuple[int, int, int, int]]:
+    """
+    Split a sorted event history into consecutive train/test windows.
+
+    Test windows tile the history after the first train window without
+    gaps or overlap; each train window ends where its test window starts.
+
+    :param timestamps: Sorted int64 epoch-ns event timestamps
+    :param train_window: Length of each train window
+    :param test_window: Length of each test window (also the step between folds)
+    :param anchored: Grow train windows from the start of the history instead of rolling them
+    :return: List of (train_start, train_stop, test_start, test_stop) row positions
+    """
+    if not len(timestamps):
+        return []
+    train_ns, test_ns = pd.Timedelta(train_window).value, pd.Timedelta(test_window).value
+    first, last = int(timestamps[0]), int(timestamps[-1])
+    folds = []
+    boundary = first + train_ns
+    while boundary <= last:
+        train_start, test_start, test_stop = np.searchsorted(
+            timestamps, [first if anchored else boundary - train_ns, boundary, boundary + test_ns])
+        if test_start > train_start and test_stop > test_start:
+            folds.append((int(train_start), int(test_start), int(test_start), int(test_stop)))
+        boundary += test_ns
+    return folds
+
+def _fit_window(
+    prices: np.ndarray,
+    alphas: Sequence[float],
+    il_thresholds: Sequence[float],
+    fee_rate: float,
+    eth_amount: float,
+    usdc_amount: float,
+    objective: str,
+) -> dict:
+    """
+    Grid-search one train window and return its best row.
+
+    The LP position is the one opened at the start of the whole history, so
+    IL, and therefore the hedge trigger, depends on the price alone and the
+    window can be evaluated on its own.
+    """
+    rows = []
+    for threshold in il_thresholds:
+        rows.extend(sweep_threshold(prices, threshold, alphas, [fee_rate], eth_amount, usdc_amount))
+    scores = np.array([row[objective] for row in rows], dtype=np.float64)
+    scores = np.where(np.isnan(scores), np.inf if objective in MINIMIZE_OBJECTIVES else -np.inf, scores)
+    best = int(np.argmin(scores) if objective in MINIMIZE_OBJECTIVES else np.argmax(scores))
+    return rows[best]
+
+def _fit_task(start: int, stop: int, *args) -> dict:
+    """
+    Worker entry point: fit one train window of the shared price array.
+    """
+    return _fit_window(worker_prices()[start:stop], *args)
+
+def run_walk_forward(
+    timestamps: np.ndarray,
+    prices: np.ndarray,
+    alphas: Sequence[float],
+    il_thresholds: Sequence[float],
+    train_window: pd.Timedelta = pd.Timedelta(weeks=4),
+    test_window: pd.Timedelta = pd.Timedelta(weeks=1),
+    anchored: bool = False,
+    objective: str = 'final_value_norm',
+    fee_rate: float = FEE_RATE,
+    eth_amount: float = INITIAL_ETH,
+    usdc_amount: float = INITIAL_USDC,
+    max_workers: Optional[int] = None,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Walk-forward optimization of ALPHA and IL_THRESHOLD.
+
+    Every train window is grid-searched with the sweep kernels; folds are
+    independent and are fitted concurrently on a process pool that maps the
+    price array from shared memory. The chosen parameters are then applied
+    out of sample on each following test window, carrying the hedge across
+    fold boundaries, which gives one stitched out-of-sample equity curve.
+
+    :param timestamps: Event timestamps (datetime64 or int64 epoch ns), sorted
+    :param prices: ETH price per event
+    :param alphas: Hedge fractions to search
+    :param il_thresholds: Impermanent loss thresholds (percentage) to search
+    :param train_window: Length of each train window
+    :param test_window: Length of each test window (also the step between folds)
+    :param anchored: Grow train windows from the start instead of rolling them
+    :param objective: Sweep column to optimize (lower is better for cost and volatility)
+    :param fee_rate: Fee rate applied to hedge adjustments
+    :param eth_amount: Initial ETH amount of the LP position
+    :param usdc_amount: Initial USDC amount of the LP position
+    :param max_workers: Number of worker processes (default: all cores, 1 runs in-process)
+    :return: (folds, out_of_sample): one row per fold with its windows, parameters and
+        scores, and the stitched test-window backtest with 'fold', 'alpha' and 'il_threshold'
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Unknown objective {objective!r}, expected one of {OBJECTIVES}")
+    ts = to_epoch_ns(timestamps)
+    prices = np.ascontiguousarray(prices, dtype=np.float64)
+    folds = make_folds(ts, train_window, test_window, anchored)
+    if not folds:
+        raise ValueError("History is shorter than one train window plus one test event")
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    fit_args = (list(alphas), list(il_thresholds), fee_rate, eth_amount, usdc_amount, objective)
+    logging.info("Walk-forward: %d folds, %d combinations per fold, %d prices.",
+                 len(folds), len(alphas) * len(il_thresholds), len(prices))
+
+    if max_workers <= 1 or len(folds) <= 1:
+        fits = [_fit_window(prices[start:stop], *fit_args) for start, stop, _, _ in folds]
+    else:
+        shm = shared_memory.SharedMemory(create=True, size=prices.nbytes)
+        try:
+            np.ndarray(prices.shape, dtype=np.float64, buffer=shm.buf)[:] = prices
+            with ProcessPoolExecutor(
+                max_workers=min(max_workers, len(folds)),
+                initializer=attach_prices,
+                initargs=(shm.name, len(prices)),
+            ) as pool:
+                futures = [pool.submit(_fit_task, start, stop, *fit_args) for start, stop, _, _ in folds]
+                fits = [future.result() for future in futures]
+        finally:
+            shm.close()
+            shm.unlink()
+
+    # Out of sample: one pass over the test windows, hedge state carried between them
+    state = BacktestState()
+    fold_rows, segments = [], []
+    for i, ((train_start, train_stop, test_start, test_stop), fit) in enumerate(zip(folds, fits)):
+        start_cost, start_pnl = state.cumulative_cost, state.cumulative_pnl
+        columns = compute_backtest_arrays(
+            prices[test_start:test_stop],
+            alpha=fit['alpha'],
+            il_threshold=fit['il_threshold'],
+            fee_rate=fee_rate,
+            eth_amount=eth_amount,
+            usdc_amount=usdc_amount,
+            state=state,
+        )
+        portfolio = columns['investor_portfolio']
+        segment = pd.DataFrame({
+            'timestamp': ts[test_start:test_stop].view('datetime64[ns]'),
+            'eth_price': prices[test_start:test_stop],
+            'fold': i,
+            'alpha': fit['alpha'],
+            'il_threshold': fit['il_threshold'],
+        })
+        segments.append(segment.assign(**columns))
+        fold_rows.append({
+            'fold': i,
+            'train_start': pd.Timestamp(int(ts[train_start])),
+            'train_end': pd.Timestamp(int(ts[train_stop - 1])),
+            'test_start': pd.Timestamp(int(ts[test_start])),
+            'test_end': pd.Timestamp(int(ts[test_stop - 1])),
+            'alpha': fit['alpha'],
+            'il_threshold': fit['il_threshold'],
+            'train_objective': fit[objective],
+            'test_hedge_pnl': state.cumulative_pnl - start_pnl,
+            'test_hedge_cost': state.cumulative_cost - start_cost,
+            'test_return': portfolio[-1] / portfolio[0] - 1,
+        })
+
+    df_oos = add_normalized_columns(pd.concat(segments, ignore_index=True), state.initial_hold)
+    return pd.DataFrame(fold_rows), df_oos
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Walk-forward optimization of ALPHA and IL_THRESHOLD.")
+    parser.add_argument('path', nargs='?', default='data/backtest_results',
+                        help="Columnar dataset with 'timestamp' and the price column")
+    parser.add_argument('--price-column', default='eth_price')
+    parser.add_argument('--alphas', type=float, nargs='+', default=[0.0, 0.25, ALPHA, 0.75, 1.0])
+    parser.add_argument('--il-thresholds', type=float, nargs='+', default=[1.0, 2.0, IL_THRESHOLD, 5.0, 8.0])
+    parser.add_argument('--train', default='4W', help="Train window, e.g. 4W or 30D")
+    parser.add_argument('--test', default='1W', help="Test window and step, e.g. 1W")
+    parser.add_argument('--anchored', action='store_true', help="Expanding instead of rolling train windows")
+    parser.add_argument('--objective', choices=OBJECTIVES, default='final_value_norm')
+    parser.add_argument('--fee-rate', type=float, default=FEE_RATE)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--output', default='data/walk_forward', help="Dataset for the out-of-sample curve")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
+
+    df = read_dataset(args.path, columns=['timestamp', args.price_column])
+    df_folds, df_oos = run_walk_forward(
+        df['timestamp'], df[args.price_column].to_numpy(), args.alphas, args.il_thresholds,
+        train_window=pd.Timedelta(args.train), test_window=pd.Timedelta(args.test),
+        anchored=args.anchored, objective=args.objective, fee_rate=args.fee_rate,
+        max_workers=args.workers,
+    )
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(df_folds.to_string(index=False))
+    write_dataset(args.output, df_oos)
+    logging.info("Out-of-sample portfolio (normalized): %.4f over %d folds; saved to %s",
+                 df_oos['investor_portfolio_norm'].iloc[-1], len(df_folds), args.output)
+
+if __name__ == '__main__':
+    main()
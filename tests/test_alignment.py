@@ -0,0 +1,16 @@
+import numpy as np
+import pandas as pd
+from src.alignment import PriceIndex
+
+def test_nan_closes_take_the_latest_valid_candle():
+    candles = pd.DataFrame({'timestamp': pd.date_range('2024-01-01', periods=4, freq='15min'),
+                            'close': [1.0, 2.0, np.nan, np.nan]})
+    swaps = pd.to_datetime(['2024-01-01 00:20', '2024-01-01 00:35', '2024-01-01 00:50'])
+    np.testing.assert_array_equal(PriceIndex.from_candles(candles).lookup(swaps), [2.0, 2.0, 2.0])
+
+    # The former merge_asof + ffill join fills from the previous swap, so a leading NaN close stays NaN
+    candles.loc[1, 'close'] = np.nan
+    swaps = pd.to_datetime(['2024-01-01 00:20', '2024-01-01 00:35'])
+    merged = pd.merge_asof(pd.DataFrame({'timestamp': swaps}), candles, on='timestamp')
+    np.testing.assert_array_equal(merged['close'].ffill(), [np.nan, np.nan])
+    np.testing.assert_array_equal(PriceIndex.from_candles(candles).lookup(swaps), [1.0, 1.0])
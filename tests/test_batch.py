@@ -0,0 +1,25 @@
+import json
+import pandas as pd
+from src import main as main_module
+from src.batch import BatchJob, load_source, run_jobs
+
+SYNTHETIC = {'type': 'synthetic', 'candles': 2000, 'swaps': 5000, 'seed': 3}
+
+def test_synthetic_source_honours_the_time_range():
+    whole = load_source(BatchJob('all', SYNTHETIC))
+    clipped = load_source(BatchJob('range', SYNTHETIC, start='2024-01-05', end='2024-01-10'))
+    assert 0 < len(clipped) < len(whole)
+    assert clipped['timestamp'].min() >= pd.Timestamp('2024-01-05')
+    assert clipped['timestamp'].max() <= pd.Timestamp('2024-01-10')
+
+    summary = run_jobs([BatchJob('all', SYNTHETIC),
+                        BatchJob('range', SYNTHETIC, start='2024-01-05', end='2024-01-10')])
+    assert list(summary['rows']) == [len(whole), len(clipped)]
+
+def test_main_jobs_exit_status_reports_failed_jobs(tmp_path):
+    ok = {'name': 'ok', 'source': SYNTHETIC}
+    missing = {'name': 'missing', 'source': {'type': 'dataset', 'path': str(tmp_path / 'missing')}}
+    for jobs, status in (([ok], 0), ([ok, missing], 1)):
+        job_file = tmp_path / 'jobs.json'
+        job_file.write_text(json.dumps({'jobs': jobs}))
+        assert main_module.main(['--jobs', str(job_file)]) == status
@@ -0,0 +1,23 @@
+import os
+import pandas as pd
+import pytest
+from src.columnar import iter_dataset, read_dataset, write_dataset
+
+def open_files(directory):
+    fds = '/proc/self/fd'
+    targets = (os.path.realpath(os.path.join(fds, fd)) for fd in os.listdir(fds))
+    return [target for target in targets if target.startswith(os.path.realpath(directory))]
+
+@pytest.mark.skipif(not os.path.isdir('/proc/self/fd'), reason="needs /proc to list open files")
+def test_compressed_parts_are_closed_before_they_are_yielded(tmp_path):
+    df = pd.DataFrame({'timestamp': pd.date_range('2024-01-01', periods=100, freq='15min'),
+                       'close': range(100), 'id': [f'0x{i:x}' for i in range(100)]})
+    path = str(tmp_path / 'dataset')
+    write_dataset(path, df, compress=True, part_rows=30)
+    parts = iter_dataset(path, columns=['timestamp', 'close'], start='2024-01-01 03:00')
+    first = next(parts)
+    assert open_files(path) == []
+    assert first['timestamp'].iloc[0] == pd.Timestamp('2024-01-01 03:00')
+    rest = list(parts)
+    assert sum(map(len, [first, *rest])) == 88
+    pd.testing.assert_frame_equal(read_dataset(path), df, check_dtype=False)
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.engine import BacktestState, compute_backtest_arrays, run_backtest_vectorized
+from src.simulation import run_backtest_loop
+from src.synthetic import generate_candles
+
+BACKTEST_COLUMNS = ['V_LP', 'V_hold', 'IL_pct', 'hedge_desired', 'hedge_position', 'hedge_cost',
+                    'cumulative_hedge_cost', 'cumulative_hedge_pnl', 'investor_portfolio',
+                    'V_LP_norm', 'V_hold_norm', 'investor_portfolio_norm']
+
+def merged_prices(n: int = 3000, seed: int = 7) -> pd.DataFrame:
+    candles = generate_candles(n, seed=seed)
+    return pd.DataFrame({'timestamp': candles['timestamp'], 'eth_price': candles['close']})
+
+@pytest.mark.parametrize('params, hedges', [
+    ({}, False),
+    ({'alpha': 1.0, 'il_threshold': 0.5, 'fee_rate': 0.002}, True),
+    ({'alpha': 0.3, 'il_threshold': 0.2, 'eth_amount': 2.0, 'usdc_amount': 7000.0}, True),
+])
+def test_loop_and_vectorized_engines_agree(params, hedges):
+    df = merged_prices()
+    loop = run_backtest_loop(df.copy(), **params)
+    vectorized = run_backtest_vectorized(df.copy(), **params)
+    assert (vectorized['hedge_position'] != 0).any() == hedges
+    for column in BACKTEST_COLUMNS:
+        np.testing.assert_allclose(vectorized[column], loop[column], rtol=1e-12, atol=1e-9, err_msg=column)
+
+@pytest.mark.parametrize('chunk_rows', [1, 7, 250, 2999])
+def test_chunked_state_matches_one_pass(chunk_rows):
+    prices = merged_prices()['eth_price'].to_numpy()
+    whole = compute_backtest_arrays(prices, il_threshold=0.5)
+    state = BacktestState()
+    chunks = [compute_backtest_arrays(prices[i:i + chunk_rows], il_threshold=0.5, state=state)
+              for i in range(0, len(prices), chunk_rows)]
+    for column, values in whole.items():
+        np.testing.assert_allclose(np.concatenate([chunk[column] for chunk in chunks]), values,
+                                   rtol=1e-12, atol=1e-9, err_msg=column)
+    assert state.initial_hold == whole['V_hold'][0]
+    assert state.cumulative_pnl == whole['cumulative_hedge_pnl'][-1]
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+from src.columnar import write_dataset
+from src.engine import run_backtest_vectorized
+from src.hedge_engine import HedgeEngine, replay
+from tests.test_engine import merged_prices
+
+SERIES = ['hedge_position', 'cumulative_hedge_cost', 'cumulative_hedge_pnl', 'investor_portfolio']
+PARAMS = {'alpha': 0.8, 'il_threshold': 0.5, 'fee_rate': 0.002}
+
+def assert_matches_batch(series: dict, expected) -> None:
+    assert (expected['hedge_position'] != 0).any()
+    for name in SERIES:
+        np.testing.assert_allclose(series[name], expected[name], rtol=1e-12, atol=1e-9, err_msg=name)
+
+def test_on_price_matches_the_batch_engine():
+    df = merged_prices()
+    engine = HedgeEngine(**PARAMS)
+    series = {name: [] for name in SERIES}
+    deltas = []
+    for ts, price in zip(df['timestamp'], df['eth_price']):
+        deltas.append(engine.on_price(ts, price))
+        for name, value in zip(SERIES, (engine.current_hedge, engine.cumulative_cost, engine.cumulative_pnl,
+                                        engine.portfolio)):
+            series[name].append(value)
+    expected = run_backtest_vectorized(df.copy(), **PARAMS)
+    assert_matches_batch(series, expected)
+    np.testing.assert_allclose(np.cumsum(deltas), expected['hedge_position'], atol=1e-9)
+
+@pytest.mark.parametrize('chunk_rows', [1000, 100_000])
+def test_replay_matches_the_batch_engine(tmp_path, chunk_rows):
+    df = merged_prices()
+    path = str(tmp_path / 'prices')
+    write_dataset(path, df)
+    report = replay(path, HedgeEngine(**PARAMS), chunk_rows=chunk_rows, record=True)
+    expected = run_backtest_vectorized(df.copy(), **PARAMS)
+    assert report['ticks'] == len(df)
+    assert_matches_batch(report['series'], expected)
+    assert report['investor_portfolio'] == report['series']['investor_portfolio'][-1]
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+from src.engine import run_backtest_vectorized
+from src.incremental import IncrementalEvaluator
+from tests.test_engine import merged_prices
+
+SCENARIOS = [(0.5, 0.5, 0.001), (1.0, 0.2, 0.002), (0.3, 0.3, 0.0), (0.5, 3.0, 0.001)]
+
+@pytest.fixture(scope='module')
+def prices():
+    return merged_prices()
+
+@pytest.mark.parametrize('alpha, il_threshold, fee_rate', SCENARIOS)
+def test_evaluate_and_curve_match_the_engine(prices, alpha, il_threshold, fee_rate):
+    evaluator = IncrementalEvaluator(prices['eth_price'].to_numpy(), keep_series=True)
+    expected = run_backtest_vectorized(prices.copy(), alpha=alpha, il_threshold=il_threshold, fee_rate=fee_rate)
+    result = evaluator.evaluate(alpha, il_threshold, fee_rate)
+    np.testing.assert_allclose(result['final_value_norm'], expected['investor_portfolio_norm'].iloc[-1], rtol=1e-12)
+    np.testing.assert_allclose(result['total_hedge_cost'], expected['cumulative_hedge_cost'].iloc[-1],
+                               rtol=1e-9, atol=1e-9)
+    np.testing.assert_allclose(result['hedge_pnl'], expected['cumulative_hedge_pnl'].iloc[-1], rtol=1e-9, atol=1e-9)
+    np.testing.assert_allclose(evaluator.curve(alpha, il_threshold, fee_rate), expected['investor_portfolio'],
+                               rtol=1e-12)
+
+def test_grid_and_saved_totals_match_evaluate(prices, tmp_path):
+    evaluator = IncrementalEvaluator(prices['eth_price'].to_numpy())
+    grid = evaluator.evaluate_grid([0.5, 1.0], [0.2, 0.5, 3.0], [0.0, 0.002])
+    path = str(tmp_path / 'totals.json')
+    evaluator.save(path)
+    loaded = IncrementalEvaluator.load(path)
+    for row in grid.itertuples():
+        for source in (evaluator, loaded):
+            result = source.evaluate(row.alpha, row.il_threshold, row.fee_rate)
+            np.testing.assert_allclose([result['final_value_norm'], result['total_hedge_cost'], result['hedge_pnl']],
+                                       [row.final_value_norm, row.total_hedge_cost, row.hedge_pnl], rtol=1e-12)
@@ -0,0 +1,24 @@
+import pytest
+from src.main import cprofile_path, parse_args
+
+@pytest.mark.parametrize('report_path, expected', [
+    ('data/profile_report.json', 'data/profile_report.simulate.prof'),
+    ('./report', './report.simulate.prof'),
+    ('out.d/report', 'out.d/report.simulate.prof'),
+    ('out.d/report.json', 'out.d/report.simulate.prof'),
+])
+def test_cprofile_path_keeps_directories_and_extensionless_names(report_path, expected):
+    assert cprofile_path(report_path, 'simulate') == expected
+
+@pytest.mark.parametrize('flags', [['--timeframe', '1h'], ['--stage-cache'], ['--plot-path', 'out.png'],
+                                   ['--engine', 'loop'], ['--fee-income']])
+def test_per_run_flags_are_rejected_with_jobs(flags):
+    with pytest.raises(SystemExit) as excinfo:
+        parse_args(['--jobs', 'jobs.json', *flags])
+    assert excinfo.value.code == 2
+
+@pytest.mark.parametrize('flags', [['--engine', 'loop'], ['--fee-income']])
+def test_unsupported_flags_are_rejected_with_the_stage_cache(flags):
+    with pytest.raises(SystemExit):
+        parse_args(['--stage-cache', *flags])
+    assert parse_args(['--stage-cache', '--engine', 'vectorized']).stage_cache
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.metrics import MetricsAccumulator, RollingWindow, RunningMoments, compute_metrics
+from src.engine import run_backtest_vectorized
+from tests.test_engine import merged_prices
+
+def split(values, sizes):
+    bounds = np.cumsum(sizes)[:-1]
+    return np.split(values, bounds[bounds < len(values)])
+
+@pytest.mark.parametrize('sizes', [[5000], [1] * 50 + [4950], [7, 1000, 3, 3990]])
+def test_running_moments_match_pandas(sizes):
+    # Large offset: a naive sum of squares would lose most digits here
+    values = 1e6 + np.random.default_rng(0).normal(size=5000)
+    moments = RunningMoments()
+    for chunk in split(values, sizes):
+        moments.update(chunk)
+    series = pd.Series(values)
+    assert moments.n == len(values)
+    np.testing.assert_allclose(moments.mean, series.mean(), rtol=1e-15)
+    np.testing.assert_allclose(moments.variance(), series.var(), rtol=1e-9)
+
+def test_running_moments_per_path():
+    values = np.random.default_rng(1).normal(size=(4, 300))
+    moments = RunningMoments()
+    for chunk in np.array_split(values, 7, axis=1):
+        moments.update(chunk)
+    np.testing.assert_allclose(moments.std(), pd.DataFrame(values.T).std().to_numpy(), rtol=1e-12)
+
+@pytest.mark.parametrize('window', [2, 30])
+@pytest.mark.parametrize('sizes', [[2000], [1, 1, 5, 993, 1000], [29, 31, 1940]])
+def test_rolling_window_matches_pandas(window, sizes):
+    values = 3000 + np.cumsum(np.random.default_rng(2).normal(size=2000))
+    rolling = RollingWindow(window)
+    parts = [rolling.update(chunk) for chunk in split(values, sizes)]
+    mean, std = (np.concatenate([part[i] for part in parts]) for i in (0, 1))
+    windows = np.lib.stride_tricks.sliding_window_view(values, window)
+    np.testing.assert_allclose(mean[window - 1:], windows.mean(axis=1), rtol=1e-12)
+    np.testing.assert_allclose(std[window - 1:], windows.std(axis=1, ddof=1), rtol=1e-9, atol=1e-6)
+    # pandas' online update drifts by ~1e-6 on near-equal neighbours, so compare absolutely
+    expected = pd.Series(values).rolling(window)
+    np.testing.assert_allclose(mean, expected.mean(), rtol=1e-12, equal_nan=True)
+    np.testing.assert_allclose(std, expected.std(), rtol=1e-9, atol=2e-6, equal_nan=True)
+    assert np.isnan(std[:window - 1]).all()
+
+def test_accumulator_rolling_output_matches_pandas():
+    df = run_backtest_vectorized(merged_prices(), il_threshold=0.3)
+    accumulator = MetricsAccumulator(rolling_window=96)
+    parts = [accumulator.update(df.iloc[i:i + 500]) for i in range(0, len(df), 500)]
+    returns = df['investor_portfolio'].pct_change()
+    np.testing.assert_allclose(np.concatenate([part['rolling_volatility'] for part in parts]),
+                               returns.rolling(96).std(), rtol=1e-6, atol=1e-12, equal_nan=True)
+    result = accumulator.result()
+    np.testing.assert_allclose(result['volatility'], returns.std(), rtol=1e-9)
+    for name, value in compute_metrics(df).items():
+        np.testing.assert_allclose(result[name], value, rtol=1e-12, err_msg=name)
@@ -0,0 +1,19 @@
+from src import profiling
+from src.profiling import StageProfiler
+
+def test_report_without_the_resource_module(monkeypatch):
+    # Windows has no resource module; the report must still be produced
+    monkeypatch.setattr(profiling, 'resource', None)
+    profiler = StageProfiler()
+    with profiler.stage('merge', rows_in=3) as record:
+        record['rows_out'] = 3
+    report = profiler.report()
+    assert report['total']['peak_rss_mb'] is None
+    assert report['stages'][0]['peak_rss_mb'] is None and report['stages'][0]['peak_rss_growth_mb'] is None
+    assert report['stages'][0]['rows_out'] == 3
+
+def test_report_has_peak_rss_on_posix():
+    profiler = StageProfiler()
+    with profiler.stage('merge'):
+        pass
+    assert profiler.stages[0]['peak_rss_mb'] > 0 and profiler.stages[0]['peak_rss_growth_mb'] >= 0
@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+from src.engine import run_backtest_vectorized
+from src.reserves import ReserveTracker, accrue_fee_income, add_fee_income
+from src.simulation import merge_price_data
+from src.synthetic import generate_candles, generate_swaps
+
+def market():
+    candles = generate_candles(500, seed=5)
+    swaps = generate_swaps(3000, candles, seed=5, as_strings=False)
+    # Hourly reserve snapshots from the second hour on: earlier swaps have no reserves
+    hours = candles['timestamp'].iloc[4::4].reset_index(drop=True)
+    anchors = pd.DataFrame({'timestamp': hours, 'usdc_reserve': 2e7,
+                            'eth_reserve': 2e7 / candles['close'].iloc[4::4].to_numpy()})
+    return candles, swaps, anchors
+
+def test_anchor_only_fee_income_stays_finite():
+    candles, swaps, anchors = market()
+    tracker = ReserveTracker(anchors=anchors)
+    chunks = (swaps.iloc[i:i + 700] for i in range(0, len(swaps), 700))
+    df_fees = accrue_fee_income(chunks, candles['timestamp'], tracker)
+    unpriced = int((swaps['timestamp'] < anchors['timestamp'].iloc[0]).sum())
+    assert unpriced > 0 and tracker.unpriced == unpriced
+    assert df_fees['unpriced_swaps'].sum() == unpriced
+    assert np.isfinite(df_fees['cumulative_lp_fee_value']).all()
+    assert df_fees['cumulative_lp_fee_value'].iloc[-1] > 0
+    assert df_fees['swaps'].sum() == len(swaps)
+
+def test_fee_income_is_added_to_the_lp_side_only():
+    candles, swaps, anchors = market()
+    plain = run_backtest_vectorized(merge_price_data(swaps.copy(), candles))
+    with_fees = add_fee_income(run_backtest_vectorized(merge_price_data(swaps.copy(), candles)),
+                               ReserveTracker(anchors=anchors))
+    fees = with_fees['cumulative_lp_fee_value'].to_numpy()
+    assert np.isfinite(fees).all() and fees[-1] > 0 and np.all(np.diff(fees) >= 0)
+    np.testing.assert_allclose(with_fees['investor_portfolio'], plain['investor_portfolio'] + fees, rtol=1e-12)
+    np.testing.assert_allclose(with_fees['V_LP'], plain['V_LP'] + fees, rtol=1e-12)
+    np.testing.assert_array_equal(with_fees['hedge_position'], plain['hedge_position'])
+    assert with_fees['investor_portfolio_norm'].iloc[-1] > plain['investor_portfolio_norm'].iloc[-1]
@@ -0,0 +1,58 @@
+from datetime import datetime
+import numpy as np
+import pytest
+from src import stages
+from src.engine import run_backtest_vectorized
+from src.metrics import compute_metrics
+from src.simulation import merge_price_data
+from src.stages import StageCache, run_pipeline
+from src.synthetic import generate_candles, generate_swaps
+
+@pytest.fixture
+def market(monkeypatch):
+    candles = generate_candles(2000, seed=1)
+    swaps = generate_swaps(5000, candles, seed=1)
+    monkeypatch.setattr(stages, 'fetch_binance_candles', lambda **kwargs: candles.copy())
+    monkeypatch.setattr(stages, 'fetch_uniswap_pool_data_sharded', lambda *args, **kwargs: swaps.copy())
+    return candles, swaps
+
+def test_pipeline_survives_a_cache_smaller_than_one_run(market, tmp_path):
+    candles, swaps = market
+    cache = StageCache(str(tmp_path), max_bytes=1)
+    for alpha in (0.5, 0.8):
+        df_results, metrics = run_pipeline(datetime(2024, 1, 1), datetime(2024, 2, 1), alpha=alpha,
+                                           cache=cache, store=object())
+        expected = run_backtest_vectorized(merge_price_data(swaps.copy(), candles.copy()), alpha=alpha)
+        np.testing.assert_array_equal(df_results['investor_portfolio'], expected['investor_portfolio'])
+        assert metrics['final_value_norm'] == expected['investor_portfolio_norm'].iloc[-1]
+        for name, value in compute_metrics(expected).items():
+            np.testing.assert_allclose(metrics[name], value, rtol=1e-12, err_msg=name)
+    # Only what the last run used may survive; older entries are evicted once nothing reads them
+    assert len(cache.entries()) == 5
+
+def test_timeframe_prices_the_pipeline_from_the_candle_pyramid(market, monkeypatch, tmp_path):
+    candles, swaps = market
+    calls = []
+
+    def load_candles(symbol, timeframe, since, end_time, store=None):
+        calls.append(timeframe)
+        return candles.iloc[::4].reset_index(drop=True)
+
+    monkeypatch.setattr(stages, 'load_candles', load_candles)
+    cache = StageCache(str(tmp_path))
+    default, _ = run_pipeline(datetime(2024, 1, 1), datetime(2024, 2, 1), cache=cache, store=object())
+    hourly, _ = run_pipeline(datetime(2024, 1, 1), datetime(2024, 2, 1), cache=cache, store=object(),
+                             timeframe='1h')
+    assert calls == ['1h']
+    expected = merge_price_data(swaps.copy(), candles.iloc[::4].reset_index(drop=True))
+    np.testing.assert_array_equal(hourly['eth_price'], expected['eth_price'])
+    assert not np.array_equal(hourly['eth_price'], default['eth_price'])
+
+def test_save_inputs_writes_the_fetched_datasets_on_every_run(market, monkeypatch, tmp_path):
+    candles, swaps = market
+    saved = []
+    monkeypatch.setattr(stages, 'save_output', lambda df, name: saved.append((name, len(df))))
+    cache = StageCache(str(tmp_path))
+    for _ in range(2):
+        run_pipeline(datetime(2024, 1, 1), datetime(2024, 2, 1), cache=cache, store=object(), save_inputs=True)
+    assert saved == [('eth_candles', len(candles)), ('uniswap_pool_data', len(swaps))] * 2
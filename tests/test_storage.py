@@ -0,0 +1,158 @@
+import os
+import re
+import numpy as np
+import pandas as pd
+import pytest
+from src import storage
+from src.data_fetcher import (SWAP_COLUMNS, fetch_binance_candles, fetch_uniswap_pool_data_paginated,
+                              fetch_uniswap_pool_data_sharded, swap_cache_key)
+from src.engine import run_backtest_vectorized
+from src.http_client import RateLimiter
+from src.simulation import merge_price_data
+from src.storage import SECONDS_PER_DAY, PartitionedStore
+from src.synthetic import generate_candles
+
+DAY0 = int(pd.Timestamp('2024-03-01').timestamp())
+POOL = '0xpool'
+
+class StubExchange:
+    """fetch_ohlcv over 15m candles covering DAY0 and the following 6 days."""
+
+    def __init__(self):
+        ts = (DAY0 + np.arange(7 * 96) * 900) * 1000
+        self.rows = [[int(t), 1.0 + i, 2.0 + i, 0.5 + i, 1.5 + i, 10.0] for i, t in enumerate(ts)]
+        self.calls = []
+
+    def fetch_ohlcv(self, symbol, timeframe, since, limit):
+        self.calls.append(since)
+        return [row for row in self.rows if row[0] >= since][:limit]
+
+class StubResponse:
+    def __init__(self, payload):
+        self.payload = payload
+        self.content = b'x'
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+class StubGraph:
+    """Graph endpoint with one swap per hour on DAY0..DAY0+2 and none afterwards."""
+
+    def __init__(self, stop_after=None):
+        self.swaps = [{'id': f'0x{t:x}', 'timestamp': str(t), 'amount0In': '1', 'amount1In': '0',
+                       'amount0Out': '0', 'amount1Out': '0.0005'}
+                      for t in range(DAY0, DAY0 + 3 * SECONDS_PER_DAY, 3600)]
+        self.stop_after = stop_after
+        self.calls = []
+
+    def post(self, url, json, timeout):
+        gte = int(re.search(r'timestamp_gte: (\d+)', json['query']).group(1))
+        lte = int(re.search(r'timestamp_lte: (\d+)', json['query']).group(1))
+        self.calls.append((gte, lte))
+        rows = [s for s in self.swaps if gte <= int(s['timestamp']) <= lte]
+        if self.stop_after is not None:
+            rows = [s for s in rows if int(s['timestamp']) <= self.stop_after]
+        return StubResponse({'data': {'swaps': rows[:1000]}})
+
+@pytest.fixture(autouse=True)
+def today(monkeypatch):
+    # DAY0 + 5 is "today": earlier days are complete, it and later days are not
+    monkeypatch.setattr(storage, 'current_day_start', lambda: DAY0 + 5 * SECONDS_PER_DAY)
+
+def fetch_candles(store, exchange, days):
+    return fetch_binance_candles(since=DAY0 * 1000, end_time=(DAY0 + days * SECONDS_PER_DAY) * 1000 - 1,
+                                 exchange=exchange, store=store, journal_dir=None)
+
+def list_dir(store, key):
+    path = os.path.join(store.root, key)
+    return os.listdir(path) if os.path.isdir(path) else []
+
+def test_cold_fetch_then_warm_reread_makes_no_calls(tmp_path):
+    store, exchange = PartitionedStore(str(tmp_path)), StubExchange()
+    cold = fetch_candles(store, exchange, 3)
+    assert len(cold) == 3 * 96 and exchange.calls
+    assert len(list_dir(store, 'candles/binance/ETH-USDC/15m')) == 3
+
+    exchange.calls.clear()
+    warm = fetch_candles(store, exchange, 3)
+    assert exchange.calls == []
+    pd.testing.assert_frame_equal(warm, cold, check_dtype=False)
+
+def test_partial_range_tops_up_only_missing_days(tmp_path):
+    store, exchange = PartitionedStore(str(tmp_path)), StubExchange()
+    fetch_candles(store, exchange, 2)
+    exchange.calls.clear()
+    df = fetch_candles(store, exchange, 4)
+    assert len(df) == 4 * 96
+    assert min(exchange.calls) == (DAY0 + 2 * SECONDS_PER_DAY) * 1000
+    assert df['timestamp'].is_monotonic_increasing and df['timestamp'].is_unique
+
+def test_current_day_is_returned_but_not_persisted(tmp_path):
+    store, exchange = PartitionedStore(str(tmp_path)), StubExchange()
+    df = fetch_candles(store, exchange, 7)
+    assert len(df) == 7 * 96
+    assert sorted(list_dir(store, 'candles/binance/ETH-USDC/15m')) == [
+        f'2024-03-0{day}.csv' for day in range(1, 6)]
+    exchange.calls.clear()
+    fetch_candles(store, exchange, 7)
+    assert min(exchange.calls) == (DAY0 + 5 * SECONDS_PER_DAY) * 1000
+
+def fetch_swaps(store, graph, days):
+    return fetch_uniswap_pool_data_paginated(POOL, DAY0, DAY0 + days * SECONDS_PER_DAY - 1, session=graph,
+                                             store=store, rate_limiter=RateLimiter(0), journal_dir=None)
+
+def test_graph_cold_and_warm_fetch(tmp_path):
+    store, graph = PartitionedStore(str(tmp_path)), StubGraph()
+    cold = fetch_swaps(store, graph, 3)
+    assert len(cold) == 72 and graph.calls
+    graph.calls.clear()
+    warm = fetch_swaps(store, graph, 3)
+    assert graph.calls == []
+    assert list(warm['id']) == list(cold['id'])
+
+def test_empty_days_after_the_last_swap_are_not_cached(tmp_path):
+    # The endpoint stops returning rows after the first day, as if pagination had ended early
+    store = PartitionedStore(str(tmp_path))
+    graph = StubGraph(stop_after=DAY0 + 23 * 3600)
+    assert len(fetch_swaps(store, graph, 4)) == 24
+    assert list_dir(store, swap_cache_key(POOL)) == ['2024-03-01.csv']
+
+    graph = StubGraph()
+    df = fetch_swaps(store, graph, 4)
+    assert len(df) == 72
+    assert all(gte >= DAY0 + SECONDS_PER_DAY for gte, _ in graph.calls)
+
+def test_iter_through_yields_one_frame_per_day(tmp_path):
+    store, exchange = PartitionedStore(str(tmp_path)), StubExchange()
+    key = 'candles/binance/ETH-USDC/15m'
+    columns = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+    def iter_range(range_start, range_end):
+        frame = pd.DataFrame([row for row in exchange.rows if range_start * 1000 <= row[0] < range_end * 1000],
+                             columns=columns)
+        frame['timestamp'] = pd.to_datetime(frame['timestamp'], unit='ms')
+        yield frame
+
+    # From mid DAY0 into "today", whose rows come from the fetch rather than the store
+    start, end = DAY0 + 12 * 3600, DAY0 + 5 * SECONDS_PER_DAY + 6 * 3600
+    days = list(store.iter_through(key, start, end, iter_range, columns))
+    assert [len(day) for day in days] == [48, 96, 96, 96, 96, 25]
+    assert days[0]['timestamp'].iloc[0] == pd.to_datetime(start, unit='s')
+    pd.testing.assert_frame_equal(store.stream_through(key, start, end, iter_range, columns),
+                                  pd.concat(days, ignore_index=True), check_dtype=False)
+
+@pytest.mark.parametrize('with_store', [False, True])
+def test_empty_period_gives_an_empty_backtest(tmp_path, with_store):
+    store = PartitionedStore(str(tmp_path)) if with_store else None
+    graph = StubGraph()
+    # Days 3 and 4 have no swaps
+    df_pool = fetch_uniswap_pool_data_sharded(POOL, DAY0 + 3 * SECONDS_PER_DAY, DAY0 + 5 * SECONDS_PER_DAY - 1,
+                                              shards=2, max_workers=2, rate_limit=0, session=graph, store=store,
+                                              journal_dir=None)
+    assert graph.calls and df_pool.empty and list(df_pool.columns) == SWAP_COLUMNS
+    candles = generate_candles(10)
+    df = run_backtest_vectorized(merge_price_data(df_pool, candles))
+    assert df.empty and {'eth_price', 'investor_portfolio', 'investor_portfolio_norm'} <= set(df.columns)
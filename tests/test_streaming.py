@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.columnar import read_dataset, write_dataset
+from src.engine import run_backtest_vectorized
+from src.metrics import MetricsAccumulator, compute_metrics
+from src.simulation import merge_price_data
+from src.streaming import iter_merged_chunks, run_streaming_backtest
+from src.synthetic import generate_candles, generate_swaps
+from tests.test_engine import BACKTEST_COLUMNS
+
+PARAMS = {'alpha': 0.8, 'il_threshold': 0.3, 'fee_rate': 0.002}
+
+@pytest.mark.parametrize('chunk_rows', [333, 5000])
+def test_streaming_backtest_matches_the_in_memory_run(tmp_path, chunk_rows):
+    candles = generate_candles(2000, seed=3)
+    swaps = generate_swaps(4000, candles, seed=3, as_strings=False)
+    swaps_path, output_path = str(tmp_path / 'swaps'), str(tmp_path / 'results')
+    write_dataset(swaps_path, swaps, part_rows=1500)
+
+    metrics = MetricsAccumulator()
+    state = run_streaming_backtest(iter_merged_chunks(swaps_path, candles, chunk_rows=chunk_rows), output_path,
+                                   metrics=metrics, **PARAMS)
+    expected = run_backtest_vectorized(merge_price_data(swaps.copy(), candles), **PARAMS)
+    streamed = read_dataset(output_path)
+
+    assert len(streamed) == len(expected) and (expected['hedge_position'] != 0).any()
+    pd.testing.assert_series_equal(streamed['timestamp'], expected['timestamp'], check_dtype=False)
+    for column in BACKTEST_COLUMNS + ['eth_price']:
+        np.testing.assert_allclose(streamed[column], expected[column], rtol=1e-12, atol=1e-9, err_msg=column)
+    assert state.cumulative_pnl == pytest.approx(expected['cumulative_hedge_pnl'].iloc[-1], rel=1e-12)
+    for name, value in compute_metrics(expected).items():
+        np.testing.assert_allclose(metrics.result()[name], value, rtol=1e-9, err_msg=name)
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+from src import sweep
+from src.engine import run_backtest_vectorized
+from src.metrics import compute_metrics
+from tests.test_engine import merged_prices
+
+ALPHAS = [0.25, 0.5, 1.0]
+FEE_RATES = [0.0, 0.002]
+
+@pytest.mark.parametrize('block_bytes', [1, sweep.SWEEP_BLOCK_BYTES])
+def test_sweep_threshold_matches_the_engine(monkeypatch, block_bytes):
+    # One byte forces one combination per block
+    monkeypatch.setattr(sweep, 'SWEEP_BLOCK_BYTES', block_bytes)
+    df = merged_prices()
+    rows = sweep.sweep_threshold(df['eth_price'].to_numpy(), 0.5, ALPHAS, FEE_RATES, 5.0, 10000.0)
+    assert len(rows) == len(ALPHAS) * len(FEE_RATES)
+    for row in rows:
+        expected = run_backtest_vectorized(df.copy(), alpha=row['alpha'], il_threshold=0.5, fee_rate=row['fee_rate'])
+        metrics = compute_metrics(expected)
+        np.testing.assert_allclose(
+            [row['final_value_norm'], row['total_hedge_cost'], row['hedge_pnl'], row['volatility']],
+            [expected['investor_portfolio_norm'].iloc[-1], expected['cumulative_hedge_cost'].iloc[-1],
+             expected['cumulative_hedge_pnl'].iloc[-1], metrics['volatility']],
+            rtol=1e-9, atol=1e-9)
+
+def test_run_parameter_sweep_covers_the_grid_in_order():
+    prices = merged_prices()['eth_price'].to_numpy()
+    df = sweep.run_parameter_sweep(prices, ALPHAS, [0.5, 1.0], FEE_RATES, max_workers=1)
+    assert len(df) == len(ALPHAS) * 2 * len(FEE_RATES)
+    assert df[['alpha', 'il_threshold', 'fee_rate']].equals(
+        df[['alpha', 'il_threshold', 'fee_rate']].sort_values(['alpha', 'il_threshold', 'fee_rate'],
+                                                              ignore_index=True))
+    row = df[(df['alpha'] == 1.0) & (df['il_threshold'] == 1.0) & (df['fee_rate'] == 0.002)].iloc[0]
+    expected = run_backtest_vectorized(merged_prices(), alpha=1.0, il_threshold=1.0, fee_rate=0.002)
+    np.testing.assert_allclose(row['final_value_norm'], expected['investor_portfolio_norm'].iloc[-1], rtol=1e-9)
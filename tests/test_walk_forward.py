@@ -0,0 +1,18 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src import walk_forward
+from src.sweep import sweep_threshold
+from src.walk_forward import OBJECTIVES, run_walk_forward
+from tests.test_engine import merged_prices
+
+def test_objectives_are_sweep_columns():
+    row = sweep_threshold(np.linspace(2000.0, 2100.0, 10), 3.0, [0.5], [0.001], 5.0, 10000.0)[0]
+    assert set(OBJECTIVES) <= set(row)
+
+def test_unknown_objective_fails_before_any_fold_is_fitted(monkeypatch):
+    monkeypatch.setattr(walk_forward, '_fit_window', lambda *args: pytest.fail("a fold was fitted"))
+    df = merged_prices()
+    with pytest.raises(ValueError, match='objective'):
+        run_walk_forward(df['timestamp'], df['eth_price'].to_numpy(), [0.5], [0.5], train_window=pd.Timedelta(days=7),
+                         test_window=pd.Timedelta(days=2), objective='final_value', max_workers=1)